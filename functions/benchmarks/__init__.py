@@ -0,0 +1,3 @@
+# functions/benchmarks
+# Ferramentas para testar e medir os serviços sem Pinecone/OpenAI reais.
+# Execute a partir de functions/, ex: python -m benchmarks.pinecone_standin_server --port 8765
@@ -0,0 +1,159 @@
+# functions/benchmarks/fake_openai_server.py
+"""
+Servidor HTTP local que imita os endpoints da OpenAI usados pelos serviços
+(/v1/embeddings e /v1/chat/completions), com embeddings determinísticos e latência injetada.
+
+Os embeddings são derivados do hash do texto normalizado: o mesmo texto sempre gera o mesmo
+vetor (unitário, 1536 dimensões), então os índices do stand-in do Pinecone podem ser populados
+com vetores que têm vizinhos reais para as queries do benchmark.
+
+Aponte o SDK para ele com OPENAI_BASE_URL=http://127.0.0.1:<porta>/v1.
+"""
+import json
+import re
+import time
+import base64
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from embedding_cache import normalize_text
+
+EMBEDDING_DIMENSIONS = 1536
+FAKE_CHAT_RESPONSE = (
+    "Este trecho mostra a fidelidade de Deus em meio às dificuldades. "
+    "O contexto aponta para a graça que sustenta o crente e para a esperança que não decepciona."
+)
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> np.ndarray:
+    """Vetor unitário float32 determinístico para o texto (mesma normalização do cache de embeddings)."""
+    seed = int.from_bytes(hashlib.sha256(normalize_text(text).encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _fake_chat_content(body: dict) -> str:
+    prompt_text = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+    if "search_new_sermons" in prompt_text and "answer_from_history" in prompt_text:
+        return "search_new_sermons"
+    if "Standalone question" in prompt_text:
+        return "Qual é a visão de Spurgeon sobre este assunto?"
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        # Justificativas em lote (book_search_service): um item por bloco "--- LIVRO n ---"
+        book_count = len(re.findall(r"--- LIVRO \d+ ---", prompt_text))
+        justifications = [{"livro": position, "justificativa": FAKE_CHAT_RESPONSE} for position in range(1, book_count + 1)]
+        return json.dumps({"verses": [], "justifications": justifications})
+    return FAKE_CHAT_RESPONSE
+
+
+class FakeOpenAIState:
+    def __init__(self, embedding_latency_ms: float = 0.0, chat_latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.embedding_latency_ms = embedding_latency_ms
+        self.chat_latency_ms = chat_latency_ms
+        self.jitter_ms = jitter_ms
+        self.counters = {"embedding_requests": 0, "embedding_inputs": 0, "chat_requests": 0}
+        self._lock = threading.Lock()
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += amount
+
+    def sleep(self, latency_ms: float) -> None:
+        delay_ms = latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+
+class FakeOpenAIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas: com Nagle ativo, cada requisição keep-alive
+    # esperaria o ACK atrasado do cliente (~40 ms), encobrindo a latência injetada.
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> FakeOpenAIState:
+        return self.server.fake_openai_state
+
+    def log_message(self, format, *args):  # noqa: A002 - assinatura do BaseHTTPRequestHandler
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        content_length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(content_length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path.endswith("/embeddings"):
+            self._handle_embeddings(body)
+        elif path.endswith("/chat/completions"):
+            self._handle_chat(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Rota não suportada: {path}", "type": "invalid_request_error"}})
+
+    def _handle_embeddings(self, body: dict) -> None:
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = int(body.get("dimensions") or EMBEDDING_DIMENSIONS)
+        self.state.count("embedding_requests")
+        self.state.count("embedding_inputs", len(inputs))
+        self.state.sleep(self.state.embedding_latency_ms)
+
+        data = []
+        for position, text in enumerate(inputs):
+            vector = fake_embedding(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": position, "embedding": embedding})
+
+        prompt_tokens = sum(len(text.split()) for text in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+
+    def _handle_chat(self, body: dict) -> None:
+        self.state.count("chat_requests")
+        self.state.sleep(self.state.chat_latency_ms)
+        content = _fake_chat_content(body)
+        self._send_json(200, {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4.1-nano"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": len(content.split()), "total_tokens": 100 + len(content.split())},
+        })
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, embedding_latency_ms: float = 0.0, chat_latency_ms: float = 0.0, jitter_ms: float = 0.0) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    """Inicia o servidor numa thread daemon (port=0 escolhe uma porta livre). Retorna (servidor, thread)."""
+    server = ThreadingHTTPServer((host, port), FakeOpenAIRequestHandler)
+    server.daemon_threads = True
+    server.fake_openai_state = FakeOpenAIState(embedding_latency_ms, chat_latency_ms, jitter_ms)
+    thread = threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
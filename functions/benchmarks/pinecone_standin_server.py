@@ -0,0 +1,224 @@
+# functions/benchmarks/pinecone_standin_server.py
+"""
+Servidor HTTP local compatível com o subconjunto da API do Pinecone usado pelos serviços
+(/query, /vectors/upsert e /vectors/delete), com suporte a filtros de metadados e latência injetada.
+
+Cada índice é servido sob um prefixo de caminho: http://127.0.0.1:8765/<indice>/query.
+Com PINECONE_STANDIN_URL=http://127.0.0.1:8765 o vector_search_client redireciona todos os
+endpoints (biblia, livros, septima-quotes, community-rooms, spurgeonsermoes) para cá.
+
+Uso (a partir de functions/):
+    python -m benchmarks.pinecone_standin_server --port 8765 --latency-ms 40 --jitter-ms 10
+    python -m benchmarks.pinecone_standin_server --snapshot livros --snapshot frases
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import local_vector_index
+
+# Nome do snapshot local (export_vector_snapshot.py) -> nome do índice no Pinecone
+SNAPSHOT_INDEX_NAMES = {
+    "livros": "livros",
+    "frases": "septima-quotes",
+}
+
+
+class StandinIndex:
+    """Índice em memória e mutável. A matriz de busca é reconstruída apenas após upserts/deletes."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._records: dict[str, tuple[np.ndarray, dict]] = {}
+        self._lock = threading.Lock()
+        self._search_index: local_vector_index.LocalVectorIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def upsert(self, vectors: list[dict]) -> int:
+        with self._lock:
+            for vector_data in vectors:
+                values = np.asarray(vector_data["values"], dtype=np.float32)
+                dimension = self._dimension()
+                if dimension is not None and values.shape[0] != dimension:
+                    raise ValueError(f"Vector dimension {values.shape[0]} does not match the dimension of the index {dimension}")
+                values = values / max(float(np.linalg.norm(values)), 1e-12)
+                self._records[str(vector_data["id"])] = (values, vector_data.get("metadata") or {})
+            self._search_index = None
+        return len(vectors)
+
+    def delete(self, ids: list[str] | None = None, delete_all: bool = False) -> None:
+        with self._lock:
+            if delete_all:
+                self._records.clear()
+            for vector_id in ids or []:
+                self._records.pop(str(vector_id), None)
+            self._search_index = None
+
+    def _dimension(self) -> int | None:
+        for values, _ in self._records.values():
+            return values.shape[0]
+        return None
+
+    def _get_search_index(self) -> local_vector_index.LocalVectorIndex | None:
+        with self._lock:
+            if self._search_index is None and self._records:
+                ids = list(self._records)
+                matrix = np.stack([self._records[vector_id][0] for vector_id in ids])
+                metadata = [self._records[vector_id][1] for vector_id in ids]
+                self._search_index = local_vector_index.LocalVectorIndex(matrix, ids, metadata, metric="cosine")
+            return self._search_index
+
+    def query(self, vector: list[float], top_k: int, filters: dict | None, include_metadata: bool, include_values: bool) -> list[dict]:
+        search_index = self._get_search_index()
+        if search_index is None:
+            return []
+        matches = search_index.query(vector, top_k, filters, include_metadata)
+        if include_values:
+            for match in matches:
+                match["values"] = self._records[match["id"]][0].tolist()
+        return matches
+
+
+class StandinState:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.indexes: dict[str, StandinIndex] = {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def get_index(self, name: str) -> StandinIndex:
+        with self._lock:
+            index = self.indexes.get(name)
+            if index is None:
+                index = StandinIndex(name)
+                self.indexes[name] = index
+            return index
+
+    def sleep_injected_latency(self) -> None:
+        delay_ms = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PineconeStandin/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive, como o Pinecone real
+    # Cabeçalhos e corpo saem em escritas separadas: com Nagle ativo, cada requisição keep-alive
+    # esperaria o ACK atrasado do cliente (~40 ms), encobrindo a latência injetada.
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.standin_state
+
+    def log_message(self, format, *args):  # noqa: A002 - assinatura do BaseHTTPRequestHandler
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        content_length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(content_length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"code": 3, "message": "Invalid JSON body"})
+            return
+
+        path_parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if len(path_parts) < 2:
+            self._send_json(404, {"code": 5, "message": "Use /<indice>/query, /<indice>/vectors/upsert ou /<indice>/vectors/delete"})
+            return
+        index_name, operation = path_parts[0], "/".join(path_parts[1:])
+
+        with self.state._lock:
+            self.state.request_count += 1
+        self.state.sleep_injected_latency()
+        index = self.state.get_index(index_name)
+
+        try:
+            if operation == "query":
+                vector = body.get("vector")
+                if not isinstance(vector, list) or not vector:
+                    raise ValueError("Missing required field 'vector'")
+                matches = index.query(
+                    vector,
+                    int(body.get("topK", 10)),
+                    body.get("filter"),
+                    bool(body.get("includeMetadata", False)),
+                    bool(body.get("includeValues", False)),
+                )
+                self._send_json(200, {"matches": matches, "namespace": body.get("namespace", "")})
+            elif operation == "vectors/upsert":
+                upserted_count = index.upsert(body.get("vectors") or [])
+                self._send_json(200, {"upsertedCount": upserted_count})
+            elif operation == "vectors/delete":
+                index.delete(body.get("ids"), bool(body.get("deleteAll", False)))
+                self._send_json(200, {})
+            else:
+                self._send_json(404, {"code": 5, "message": f"Operação não suportada: {operation}"})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"code": 3, "message": str(e)})
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    """Inicia o servidor numa thread daemon (port=0 escolhe uma porta livre). Retorna (servidor, thread)."""
+    server = ThreadingHTTPServer((host, port), StandinRequestHandler)
+    server.daemon_threads = True
+    server.standin_state = StandinState(latency_ms, jitter_ms)
+    thread = threading.Thread(target=server.serve_forever, name="pinecone-standin", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def load_snapshot_into(server: ThreadingHTTPServer, snapshot_name: str) -> int:
+    """Carrega um snapshot de local_vector_index no índice correspondente do servidor."""
+    snapshot = local_vector_index.LocalVectorIndex.load(snapshot_name)
+    index = server.standin_state.get_index(SNAPSHOT_INDEX_NAMES.get(snapshot_name, snapshot_name))
+    index.upsert([
+        {"id": vector_id, "values": snapshot.vectors[row], "metadata": snapshot.metadata[row]}
+        for row, vector_id in enumerate(snapshot.ids)
+    ])
+    return len(snapshot)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor local compatível com a API de dados do Pinecone.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência injetada em cada requisição.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variação uniforme (+/-) da latência injetada.")
+    parser.add_argument("--snapshot", action="append", default=[], help="Snapshot local a pré-carregar (pode repetir).")
+    args = parser.parse_args(argv)
+
+    server, thread = start_server(args.host, args.port, args.latency_ms, args.jitter_ms)
+    for snapshot_name in args.snapshot:
+        print(f"Snapshot '{snapshot_name}' carregado: {load_snapshot_into(server, snapshot_name)} vetores.")
+    print(f"Pinecone stand-in ouvindo em {server_url(server)} (latência {args.latency_ms}ms +/- {args.jitter_ms}ms).")
+    print(f"Aponte os serviços para ele com PINECONE_STANDIN_URL={server_url(server)}")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
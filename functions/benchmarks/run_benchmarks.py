@@ -0,0 +1,429 @@
+# functions/benchmarks/run_benchmarks.py
+"""
+Benchmark offline da camada de serviços de busca e chat.
+
+OpenAI e Pinecone são simulados na camada HTTP (fake_openai_server e pinecone_standin_server,
+num processo separado para não disputar o GIL nem poluir a medição de memória), com embeddings
+determinísticos e latência configurável. Os serviços rodam sem alterações, com seus clientes reais.
+
+Para cada cenário e nível de concorrência são reportados vazão, latência p50/p95/p99 e,
+numa passada sequencial com tracemalloc, a memória Python alocada por chamada (pico e retida).
+
+Uso (a partir de functions/):
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --compare            # falha (exit 1) se houver regressão
+    python -m benchmarks.run_benchmarks --scenarios bible_search,sermon_search --concurrency 1,16,64
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import asyncio
+import platform
+import tracemalloc
+import contextlib
+import multiprocessing
+from datetime import datetime, timezone
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_OUTPUT_PATH = os.path.join(RESULTS_DIR, "latest.json")
+DEFAULT_BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+ALL_SCENARIOS = ["bible_search", "sermon_search", "book_recommendations", "rag_chat", "bible_chat"]
+
+QUERY_TOPICS = [
+    "ansiedade e preocupação com o futuro",
+    "perdão entre irmãos",
+    "a graça de Deus na salvação",
+    "como orar em tempos difíceis",
+    "fé em meio ao sofrimento",
+    "o amor de Cristo pela igreja",
+    "esperança na ressurreição",
+    "sabedoria para decisões",
+    "santificação e vida cristã",
+    "a soberania de Deus",
+]
+BIBLE_BOOKS = ["gn", "ex", "sl", "pv", "is", "mt", "jo", "rm", "ef", "hb"]
+
+
+# --- Processo dos servidores falsos ---
+
+def _seed_standin_indexes(standin_server, fake_embedding, vectors_per_index: int) -> None:
+    """Popula os índices do stand-in com metadados no mesmo formato dos índices reais."""
+    state = standin_server.standin_state
+
+    state.get_index("biblia").upsert([
+        {
+            "id": f"biblia_{i}",
+            "values": fake_embedding(f"versículo {i}"),
+            "metadata": {
+                "tipo": "biblia_versiculos" if i % 4 else "biblia_comentario_secao",
+                "livro_curto": BIBLE_BOOKS[i % len(BIBLE_BOOKS)],
+                "livro_completo": BIBLE_BOOKS[i % len(BIBLE_BOOKS)].upper(),
+                "capitulo": (i // len(BIBLE_BOOKS)) % 50 + 1,
+                "versiculos": f"{i % 30 + 1}-{i % 30 + 4}",
+                "titulo_comentario": f"Seção {i}",
+            },
+        }
+        for i in range(vectors_per_index)
+    ])
+    state.get_index("spurgeonsermoes").upsert([
+        {
+            "id": f"sermon_{i // 10}_p{i % 10}",
+            "values": fake_embedding(f"parágrafo de sermão {i}"),
+            "metadata": {
+                "sermon_id_base": f"sermon_{i // 10}",
+                "text_preview": f"Parágrafo {i % 10} do sermão {i // 10}. " * 8,
+                "paragraph_order_in_sermon": i % 10,
+                "sermon_title_translated": f"Sermão {i // 10}",
+                "sermon_title_original": f"Sermon {i // 10}",
+                "main_scripture_passage_abbreviated": "Jo 3:16",
+                "preacher": "C. H. Spurgeon",
+            },
+        }
+        for i in range(vectors_per_index)
+    ])
+    state.get_index("livros").upsert([
+        {
+            "id": f"livro_{i}",
+            "values": fake_embedding(f"livro {i}"),
+            "metadata": {
+                "titulo": f"Livro {i}",
+                "autor": f"Autor {i % 97}",
+                "resumo": "Um estudo sobre a vida cristã e a graça de Deus. " * 6,
+                "aplicacoes": "Oração, comunhão e serviço. " * 3,
+                "perfil_leitor": "Cristãos que desejam crescer na fé.",
+                "cover_principal": f"https://example.com/capas/{i}.jpg",
+            },
+        }
+        for i in range(max(50, vectors_per_index // 10))
+    ])
+
+
+def _serve_fakes(conn, options: dict) -> None:
+    from benchmarks import fake_openai_server, pinecone_standin_server
+
+    openai_server, _ = fake_openai_server.start_server(
+        embedding_latency_ms=options["embedding_latency_ms"],
+        chat_latency_ms=options["chat_latency_ms"],
+        jitter_ms=options["jitter_ms"],
+    )
+    standin_server, _ = pinecone_standin_server.start_server(
+        latency_ms=options["pinecone_latency_ms"],
+        jitter_ms=options["jitter_ms"],
+    )
+    _seed_standin_indexes(standin_server, fake_openai_server.fake_embedding, options["vectors_per_index"])
+    conn.send({
+        "openai_url": fake_openai_server.server_url(openai_server),
+        "pinecone_url": pinecone_standin_server.server_url(standin_server),
+    })
+
+    while True:
+        try:
+            command = conn.recv()
+        except EOFError:
+            break
+        if command == "stats":
+            conn.send({
+                **openai_server.fake_openai_state.counters,
+                "pinecone_requests": standin_server.standin_state.request_count,
+            })
+        elif command == "stop":
+            break
+    openai_server.shutdown()
+    standin_server.shutdown()
+
+
+# --- Cenários ---
+
+class _InMemoryFirestore:
+    """Firestore mínimo em memória para o chat da Bíblia (apenas collection().document().get())."""
+
+    class _Document:
+        def __init__(self, data):
+            self.exists = data is not None
+            self._data = data
+
+        def to_dict(self):
+            return self._data
+
+    class _DocumentRef:
+        def __init__(self, data):
+            self._data = data
+
+        def get(self):
+            return _InMemoryFirestore._Document(self._data)
+
+    class _Collection:
+        def __init__(self, name):
+            self._name = name
+
+        def document(self, doc_id):
+            if self._name == "commentary_sections":
+                return _InMemoryFirestore._DocumentRef({"commentary": [{"traducao": f"Comentário de {doc_id}. " * 20}]})
+            return _InMemoryFirestore._DocumentRef(None)
+
+    def collection(self, name):
+        return _InMemoryFirestore._Collection(name)
+
+
+def _build_scenarios(selected: list[str]) -> dict:
+    """Importa os serviços sob demanda (depois que as variáveis de ambiente apontam para os fakes)."""
+    scenarios = {}
+    for name in selected:
+        try:
+            if name == "bible_search":
+                import bible_search_service
+                scenarios[name] = lambda query: bible_search_service.perform_semantic_search(query, {"tipo": "biblia_versiculos"}, 10)
+            elif name == "sermon_search":
+                import sermons_service
+                scenarios[name] = lambda query: sermons_service.perform_sermon_semantic_search(query, 20, 5)
+            elif name == "book_recommendations":
+                import book_search_service
+                scenarios[name] = lambda query: book_search_service.get_book_recommendations(query, 5)
+            elif name == "rag_chat":
+                import chat_service
+                scenarios[name] = lambda query: chat_service.get_rag_chat_response(query, [])
+            elif name == "bible_chat":
+                import bible_chat_service
+                fake_db = _InMemoryFirestore()
+                scenarios[name] = lambda query: bible_chat_service.get_bible_chat_response(fake_db, query, [], "jo", 3, "16-18", True)
+            else:
+                print(f"AVISO: Cenário desconhecido '{name}', ignorando.")
+        except ImportError as e:
+            print(f"AVISO: Cenário '{name}' indisponível neste ambiente ({e}).")
+    return scenarios
+
+
+class _QueryGenerator:
+    """'unique' gera uma query inédita por chamada (mede o caminho sem cache); 'repeated' reusa 10 queries."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self._counter = 0
+
+    def next(self) -> str:
+        self._counter += 1
+        topic = QUERY_TOPICS[self._counter % len(QUERY_TOPICS)]
+        return topic if self.mode == "repeated" else f"{topic} (variação {self._counter})"
+
+
+async def _run_level(call, queries: _QueryGenerator, concurrency: int, total_requests: int) -> dict:
+    latencies_ms = []
+    errors = 0
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                await call(queries.next())
+            except Exception:
+                errors += 1
+            latencies_ms.append((time.perf_counter() - started) * 1000.0)
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - wall_started
+
+    latencies = np.asarray(latencies_ms)
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": total_requests / wall_seconds if wall_seconds else 0.0,
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+async def _measure_allocations(call, queries: _QueryGenerator, samples: int) -> dict:
+    """Memória Python por chamada (sequencial): pico alocado durante a chamada e o que ficou retido."""
+    peak_kib, retained_kib = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            try:
+                await call(queries.next())
+            except Exception:
+                pass
+            current, peak = tracemalloc.get_traced_memory()
+            peak_kib.append((peak - before) / 1024.0)
+            retained_kib.append((current - before) / 1024.0)
+    finally:
+        tracemalloc.stop()
+    return {
+        "samples": samples,
+        "peak_kib_per_call": float(np.mean(peak_kib)) if peak_kib else 0.0,
+        "retained_kib_per_call": float(np.mean(retained_kib)) if retained_kib else 0.0,
+    }
+
+
+async def _run_all(scenarios: dict, args) -> dict:
+    queries = _QueryGenerator(args.query_mode)
+    results = {}
+    for name, call in scenarios.items():
+        print(f"Cenário '{name}'...", file=sys.__stdout__, flush=True)
+        for _ in range(args.warmup):
+            with contextlib.suppress(Exception):
+                await call(queries.next())
+        levels = {}
+        for concurrency in args.concurrency:
+            levels[str(concurrency)] = await _run_level(call, queries, concurrency, args.requests)
+        allocations = await _measure_allocations(call, queries, args.alloc_samples) if args.alloc_samples else None
+        results[name] = {"levels": levels, "allocations": allocations}
+    return results
+
+
+# --- Relatório, baseline e comparação ---
+
+def _print_report(report: dict) -> None:
+    print(f"\n{'cenário':<22}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>7}{'pico KiB':>10}")
+    for name, scenario in report["results"].items():
+        allocations = scenario.get("allocations") or {}
+        for concurrency, level in scenario["levels"].items():
+            print(
+                f"{name:<22}{concurrency:>6}{level['throughput_rps']:>10.1f}{level['p50_ms']:>10.1f}"
+                f"{level['p95_ms']:>10.1f}{level['p99_ms']:>10.1f}{level['errors']:>7}"
+                f"{allocations.get('peak_kib_per_call', 0.0):>10.1f}"
+            )
+    print(f"\nChamadas aos fakes: {report['meta'].get('fake_counters')}")
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lista as regressões (p95 maior ou vazão menor que a baseline além da tolerância relativa)."""
+    regressions = []
+    for name, scenario in current["results"].items():
+        baseline_scenario = baseline.get("results", {}).get(name)
+        if not baseline_scenario:
+            continue
+        for concurrency, level in scenario["levels"].items():
+            baseline_level = baseline_scenario["levels"].get(concurrency)
+            if not baseline_level:
+                continue
+            if baseline_level["p95_ms"] and level["p95_ms"] > baseline_level["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} @{concurrency}: p95 {baseline_level['p95_ms']:.1f}ms -> {level['p95_ms']:.1f}ms")
+            if baseline_level["throughput_rps"] and level["throughput_rps"] < baseline_level["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{name} @{concurrency}: vazão {baseline_level['throughput_rps']:.1f} -> {level['throughput_rps']:.1f} req/s")
+        current_alloc = scenario.get("allocations") or {}
+        baseline_alloc = baseline_scenario.get("allocations") or {}
+        if baseline_alloc.get("peak_kib_per_call") and current_alloc.get("peak_kib_per_call", 0.0) > baseline_alloc["peak_kib_per_call"] * (1 + tolerance):
+            regressions.append(f"{name}: memória por chamada {baseline_alloc['peak_kib_per_call']:.1f} -> {current_alloc['peak_kib_per_call']:.1f} KiB")
+    return regressions
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark offline dos serviços de busca e chat.")
+    parser.add_argument("--scenarios", default=",".join(ALL_SCENARIOS), help=f"Lista separada por vírgulas ({', '.join(ALL_SCENARIOS)}).")
+    parser.add_argument("--concurrency", default="1,8,32", help="Níveis de concorrência, ex: 1,8,32.")
+    parser.add_argument("--requests", type=int, default=100, help="Requisições por nível de concorrência.")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Chamadas medidas com tracemalloc (0 desativa).")
+    parser.add_argument("--query-mode", choices=["unique", "repeated"], default="unique")
+    parser.add_argument("--embedding-latency-ms", type=float, default=30.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=150.0)
+    parser.add_argument("--pinecone-latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--vectors-per-index", type=int, default=5000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado também como baseline.")
+    parser.add_argument("--compare", action="store_true", help="Compara com a baseline e sai com código 1 se houver regressão.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Variação relativa tolerada na comparação.")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs dos serviços na saída.")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    server_options = {
+        "embedding_latency_ms": args.embedding_latency_ms,
+        "chat_latency_ms": args.chat_latency_ms,
+        "pinecone_latency_ms": args.pinecone_latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "vectors_per_index": args.vectors_per_index,
+    }
+
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    server_process = context.Process(target=_serve_fakes, args=(child_conn, server_options), daemon=True)
+    server_process.start()
+    urls = parent_conn.recv()
+
+    # Precisa acontecer antes de importar os serviços (as configurações são lidas na importação)
+    os.environ["OPENAI_BASE_URL"] = urls["openai_url"]
+    os.environ["openai-api-key"] = "benchmark"
+    os.environ["PINECONE_STANDIN_URL"] = urls["pinecone_url"]
+    os.environ["EMBEDDING_CACHE_PERSISTENT"] = "0"
+    os.environ["OPENAI_MAX_RETRIES"] = "0"
+
+    try:
+        scenarios = _build_scenarios(args.scenarios)
+        if not scenarios:
+            print("Nenhum cenário disponível para executar.")
+            return 1
+        with open(os.devnull, "w") as devnull:
+            quiet = contextlib.ExitStack()
+            if not args.verbose:
+                quiet.enter_context(contextlib.redirect_stdout(devnull))
+                quiet.enter_context(contextlib.redirect_stderr(devnull))
+            with quiet:
+                results = asyncio.run(_run_all(scenarios, args))
+        parent_conn.send("stats")
+        fake_counters = parent_conn.recv()
+    finally:
+        with contextlib.suppress(Exception):
+            parent_conn.send("stop")
+        server_process.join(timeout=5)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "verbose")},
+            "fake_counters": fake_counters,
+        },
+        "results": results,
+    }
+    _print_report(report)
+    _write_json(args.output, report)
+    print(f"Resultado gravado em {args.output}")
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Baseline gravada em {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"Baseline não encontrada em {args.baseline}. Rode com --save-baseline primeiro.")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSÕES (tolerância {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nSem regressões em relação à baseline (tolerância {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
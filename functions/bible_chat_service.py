@@ -3,37 +3,64 @@ import os
 import traceback
 import asyncio
 import json
-from openai import OpenAI
+from functools import lru_cache
+import openai_clients
+import bible_data
+import scripture_reference_parser
+import strongs_lexicon
 from firebase_admin import firestore
 
 # --- Configurações ---
 CHAT_MODEL = "gpt-4.1-nano"
-
-_openai_client = None
+BIBLE_TEXT_TRANSLATION = "nvi"  # Tradução usada no CONTEXTO 1 do prompt
+MAX_STRONGS_ENTRIES = 30  # Palavras distintas no CONTEXTO 3 (seções longas são truncadas)
+MAX_OCCURRENCES_PER_STRONG = 3
+# Artigo e conjunções muito frequentes que só ocupariam espaço no prompt
+STRONGS_STOPWORDS = {"G3588", "G2532", "G1161", "H853", "H834"}
+STRONGS_VERSIFICATION_NOTICE = (
+    "Análise do Léxico de Strong omitida: a numeração dos versículos deste capítulo no texto original "
+    "difere da tradução, e as palavras não corresponderiam aos versículos da seção."
+)
 
 def _initialize_clients():
-    """Inicializa o cliente OpenAI de forma preguiçosa (lazy)."""
-    global _openai_client
-    if _openai_client is None:
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            raise ValueError("Secret 'openai-api-key' não encontrado.")
-        _openai_client = OpenAI(api_key=openai_api_key)
-        print("BibleChatService: Cliente OpenAI inicializado.")
+    """Retorna o cliente AsyncOpenAI do módulo openai_clients."""
+    return openai_clients.get_async_client()
 
 # --- Funções de Coleta de Contexto ---
 
+@lru_cache(maxsize=1024)
+def _format_bible_verses(book_abbrev: str, chapter_number: int, verses_range_str: str, translation: str = BIBLE_TEXT_TRANSLATION) -> str | None:
+    """
+    Monta o texto da seção a partir do corpus bíblico empacotado (mmap), sem leitura no Firestore.
+    Aceita "16", "1-5" e listas como "1,3,5-7". Retorna None se a referência não existir.
+    """
+    resolved_abbrev = bible_data.resolve_book_abbrev(book_abbrev)
+    if resolved_abbrev is None:
+        return None
+    chapter_verses = bible_data.get_chapter_verses(translation, resolved_abbrev, int(chapter_number))
+    if not chapter_verses:
+        return None
+
+    verse_numbers = scripture_reference_parser.parse_verse_selection(verses_range_str, max_verse=len(chapter_verses))
+    if not verse_numbers:
+        return None
+
+    book_name = bible_data.ABBREV_TO_FULL_NAME_MAP.get(resolved_abbrev, resolved_abbrev.upper())
+    verse_lines = [f"{number} {chapter_verses[number - 1]}" for number in verse_numbers]
+    return f"{book_name} {chapter_number}:{verses_range_str} ({translation.upper()})\n" + "\n".join(verse_lines)
+
+
 async def _get_bible_verses_text(db, book_abbrev, chapter_number, verses_range_str):
-    """Busca o texto dos versículos da NVI a partir do Firestore."""
-    # Esta função é um placeholder. O ideal é que o texto seja enviado do cliente
-    # para evitar uma leitura extra no DB. Mas se for necessário, a lógica seria:
-    # 1. Montar o caminho para a coleção/documento dos versículos.
-    # 2. Ler os versículos.
-    # Por simplicidade, vamos assumir que o texto virá no payload da função no futuro.
-    # Por enquanto, retornamos uma string indicando o que foi solicitado.
+    """Busca o texto dos versículos da NVI no corpus bíblico local (o parâmetro 'db' não é usado)."""
     print(f"Buscando texto para {book_abbrev} {chapter_number}:{verses_range_str}...")
-    # Lógica de busca real no Firestore iria aqui.
-    return f"Texto dos versículos de {book_abbrev} {chapter_number}:{verses_range_str}."
+    try:
+        verses_text = _format_bible_verses(book_abbrev, int(chapter_number), str(verses_range_str).replace(" ", ""))
+    except Exception as e:
+        print(f"Erro ao buscar o texto dos versículos: {e}")
+        verses_text = None
+    if verses_text is None:
+        return f"Texto dos versículos de {book_abbrev} {chapter_number}:{verses_range_str} não disponível."
+    return verses_text
 
 
 async def _get_matthew_henry_commentary(db, book_abbrev, chapter_number, verses_range_str):
@@ -56,22 +83,64 @@ async def _get_matthew_henry_commentary(db, book_abbrev, chapter_number, verses_
         return "Erro ao carregar o comentário."
 
 
-async def _get_strongs_knowledge(db, book_abbrev, chapter_number, verses_range_str):
+@lru_cache(maxsize=512)
+def _format_strongs_knowledge(book_abbrev: str, chapter_number: int, verses_range_str: str) -> str | None:
     """
-    Busca os dados do interlinear e do léxico para a seção.
-    Esta é a parte mais complexa.
+    Junta as palavras do interlinear (grego no NT, hebraico no AT) dos versículos da seção com o
+    índice do léxico de Strong. Uma linha por número de Strong, na ordem em que aparece no texto,
+    com as ocorrências (versículo, palavra, morfologia). Retorna None se não houver interlinear e
+    STRONGS_VERSIFICATION_NOTICE se a versificação do capítulo no original diferir da tradução.
     """
-    # Placeholder para a lógica complexa
-    # 1. Determinar se é AT (Hebraico) ou NT (Grego)
-    # 2. Construir o caminho para o arquivo JSON do interlinear do capítulo.
-    # 3. Ler o arquivo (precisaria estar acessível para a Cloud Function, ex: no GCS).
-    # 4. Filtrar os versículos relevantes da seção.
-    # 5. Para cada palavra, pegar o número de Strong.
-    # 6. Buscar a definição de cada número de Strong no Firestore (coleção do léxico).
-    # 7. Formatar tudo em uma string legível.
-    print("Buscando conhecimento de Strong (simulação)...")
-    await asyncio.sleep(0.5) # Simula latência
-    return "Análise do Léxico de Strong:\n- logos (G3056): Palavra, Verbo, algo dito.\n- agape (G26): Amor incondicional, benevolência."
+    resolved_abbrev = bible_data.resolve_book_abbrev(book_abbrev)
+    if resolved_abbrev is None:
+        return None
+    interlinear_verses = bible_data.get_interlinear_chapter(resolved_abbrev, int(chapter_number))
+    if not interlinear_verses:
+        return None
+    # Ex: títulos dos Salmos no hebraico. O mesmo número apontaria para outro versículo que o do CONTEXTO 1
+    chapter_verses = bible_data.get_chapter_verses(BIBLE_TEXT_TRANSLATION, resolved_abbrev, int(chapter_number))
+    if chapter_verses and bible_data.get_interlinear_translation_verse_count(resolved_abbrev, int(chapter_number)) != len(chapter_verses):
+        return STRONGS_VERSIFICATION_NOTICE
+
+    occurrences_by_strong: dict[str, list[tuple[int, str, str]]] = {}
+    # Versículos por número: onde o original omite um versículo (ex: Jo 5:4) ele simplesmente não existe
+    for verse_number in scripture_reference_parser.parse_verse_selection(verses_range_str, max_verse=max(interlinear_verses)):
+        for word_text, strong_value, morph in interlinear_verses.get(verse_number, ()):
+            for strong in strongs_lexicon.split_strongs(strong_value):
+                if strong not in STRONGS_STOPWORDS:
+                    occurrences_by_strong.setdefault(strong, []).append((verse_number, word_text, morph))
+    if not occurrences_by_strong:
+        return None
+
+    lines = ["Análise do Léxico de Strong:"]
+    for strong, occurrences in list(occurrences_by_strong.items())[:MAX_STRONGS_ENTRIES]:
+        entry = strongs_lexicon.lookup(strong)
+        if entry:
+            lemma, transliteration, definition = entry
+            header = f"- {transliteration or lemma} ({strong}) {lemma}: {definition or 'sem definição'}"
+        else:
+            header = f"- {strong}"
+        occurrences_text = "; ".join(
+            f"v.{verse_number} {word_text.replace('/', '')}" + (f" [{morph}]" if morph else "")
+            for verse_number, word_text, morph in occurrences[:MAX_OCCURRENCES_PER_STRONG]
+        )
+        lines.append(f"{header}\n  Ocorrências: {occurrences_text}")
+    if len(occurrences_by_strong) > MAX_STRONGS_ENTRIES:
+        lines.append(f"(+{len(occurrences_by_strong) - MAX_STRONGS_ENTRIES} palavras omitidas)")
+    if not strongs_lexicon.load_lexicon_index():
+        lines.append("(Léxico indisponível: apenas números de Strong e morfologia.)")
+    return "\n".join(lines)
+
+
+async def _get_strongs_knowledge(db, book_abbrev, chapter_number, verses_range_str):
+    """Busca os dados do interlinear e do léxico de Strong para a seção (local, sem Firestore)."""
+    print(f"Buscando conhecimento de Strong para {book_abbrev} {chapter_number}:{verses_range_str}...")
+    try:
+        strongs_text = _format_strongs_knowledge(book_abbrev, int(chapter_number), str(verses_range_str).replace(" ", ""))
+    except Exception as e:
+        print(f"Erro ao montar a análise de Strong: {e}")
+        strongs_text = None
+    return strongs_text or "Análise do Léxico de Strong indisponível para esta seção."
 
 def _build_bible_chat_prompt(
     user_query: str,
@@ -133,7 +202,7 @@ async def get_bible_chat_response(
     verses_range_str: str, 
     use_strongs: bool
 ) -> str:
-    _initialize_clients()
+    openai_client = _initialize_clients()
     
     # 1. Coleta de Contexto em Paralelo (sem alterações)
     print("Iniciando coleta de contexto...")
@@ -163,8 +232,7 @@ async def get_bible_chat_response(
     # 3. Chamada à API da OpenAI (sem alterações)
     print("Enviando prompt completo para a OpenAI...")
     try:
-        chat_completion = await asyncio.to_thread(
-            _openai_client.chat.completions.create,
+        chat_completion = await openai_client.chat.completions.create(
             model=CHAT_MODEL,
             messages=prompt_messages,
             temperature=0.5,
@@ -0,0 +1,226 @@
+# functions/bible_corpus_store.py
+import os
+import json
+import mmap
+import struct
+import bisect
+import threading
+
+# Corpus bíblico empacotado: todas as traduções de assets/Biblia/completa_traducoes num único
+# arquivo binário, aberto com mmap. Em vez de abrir e parsear ~1.189 JSONs por tradução, uma
+# busca de versículo é um acesso direto ao índice de offsets + um slice do blob UTF-8 — sem parse,
+# e as páginas do arquivo são compartilhadas entre processos pelo cache do sistema operacional.
+#
+# Layout do arquivo (little-endian):
+#   MAGIC (8 bytes) | tamanho do cabeçalho (uint32) | cabeçalho JSON (UTF-8)
+#   offsets: uint64[total_de_versículos + 1] (posição de cada versículo no blob; alinhado a 8 bytes)
+#   blob: texto UTF-8 de todos os versículos, concatenado
+# O cabeçalho guarda, por tradução, a quantidade de versículos de cada capítulo de cada livro e o
+# primeiro índice global da tradução; o (livro, capítulo, versículo) -> índice é calculado na carga.
+# Os originais (grego/hebraico) são gravados como o texto das palavras separado por espaço.
+
+MAGIC = b"SBCORP01"
+CORPUS_FILE_NAME = "bible_corpus.bin"
+ORIGINAL_LANGUAGE_TRANSLATIONS = ["greek_original", "hebrew_original"]
+CORPUS_TRANSLATIONS = ["nvi", "aa", "acf", "kja", "kjf"] + ORIGINAL_LANGUAGE_TRANSLATIONS
+
+
+def _verse_to_text(verse) -> str:
+    if isinstance(verse, list):
+        # Original: lista de palavras {text, strong, morph}
+        return " ".join(word.get("text", "") for word in verse if isinstance(word, dict) and word.get("text"))
+    return verse if isinstance(verse, str) else ""
+
+
+def build_corpus(source_dir: str, output_path: str, translations: list[str] | None = None) -> dict:
+    """
+    Compila <source_dir>/<tradução>/<livro>/<capítulo>.json (source_dir = .../completa_traducoes)
+    num único arquivo. Retorna o cabeçalho gravado.
+    """
+    with open(os.path.join(source_dir, "abbrev_map.json"), "r", encoding="utf-8") as f:
+        book_order = list(json.load(f).keys())
+
+    header = {"version": 1, "book_order": book_order, "translations": {}}
+    offsets = [0]
+    blob_parts = []
+    blob_size = 0
+
+    for translation in translations or CORPUS_TRANSLATIONS:
+        translation_dir = os.path.join(source_dir, translation)
+        if not os.path.isdir(translation_dir):
+            print(f"AVISO (BibleCorpus): Tradução '{translation}' não encontrada em {source_dir}, ignorando.")
+            continue
+        translation_info = {"first_verse": len(offsets) - 1, "books": {}}
+        for book_abbrev in book_order:
+            book_dir = os.path.join(translation_dir, book_abbrev)
+            if not os.path.isdir(book_dir):
+                continue
+            chapter_numbers = sorted(int(name[:-5]) for name in os.listdir(book_dir) if name.endswith(".json"))
+            verse_counts = []
+            for chapter in range(1, (chapter_numbers[-1] if chapter_numbers else 0) + 1):
+                chapter_path = os.path.join(book_dir, f"{chapter}.json")
+                chapter_verses = []
+                if os.path.exists(chapter_path):
+                    with open(chapter_path, "r", encoding="utf-8") as f:
+                        chapter_verses = json.load(f)
+                for verse in chapter_verses:
+                    encoded = _verse_to_text(verse).encode("utf-8")
+                    blob_parts.append(encoded)
+                    blob_size += len(encoded)
+                    offsets.append(blob_size)
+                verse_counts.append(len(chapter_verses))
+            translation_info["books"][book_abbrev] = verse_counts
+        translation_info["verse_count"] = len(offsets) - 1 - translation_info["first_verse"]
+        header["translations"][translation] = translation_info
+        print(f"BibleCorpus: '{translation}' compilada ({translation_info['verse_count']} versículos).")
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix_size = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_size) % 8
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes) + padding))
+        f.write(header_bytes + b" " * padding)  # espaços no fim não alteram o JSON
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for part in blob_parts:
+            f.write(part)
+    os.replace(temp_path, output_path)
+    return header
+
+
+class BibleCorpus:
+    """Leitor do corpus empacotado (somente leitura, seguro para uso entre threads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Arquivo de corpus inválido: {path}")
+        (header_size,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(bytes(self._mmap[header_start:header_start + header_size]).decode("utf-8"))
+
+        offsets_start = header_start + header_size
+        total_verses = sum(info["verse_count"] for info in self.header["translations"].values())
+        offsets_end = offsets_start + (total_verses + 1) * 8
+        self._offsets = memoryview(self._mmap)[offsets_start:offsets_end].cast("Q")
+        self._blob_start = offsets_end
+
+        # (tradução, livro) -> lista com o índice global do primeiro versículo de cada capítulo (+ sentinela)
+        self._chapter_starts: dict[tuple[str, str], list[int]] = {}
+        # Caminho inverso (índice global -> referência): início de cada capítulo não vazio, em ordem
+        self._chapter_index_starts: list[int] = []
+        self._chapter_index_refs: list[tuple[str, str, int]] = []
+        for translation, info in self.header["translations"].items():
+            position = info["first_verse"]
+            for book_abbrev, verse_counts in info["books"].items():
+                starts = []
+                for chapter_index, verse_count in enumerate(verse_counts):
+                    starts.append(position)
+                    if verse_count:
+                        self._chapter_index_starts.append(position)
+                        self._chapter_index_refs.append((translation, book_abbrev, chapter_index + 1))
+                    position += verse_count
+                starts.append(position)
+                self._chapter_starts[(translation, book_abbrev)] = starts
+
+    @property
+    def translations(self) -> list[str]:
+        return list(self.header["translations"])
+
+    @property
+    def book_order(self) -> list[str]:
+        return self.header["book_order"]
+
+    def _chapter_bounds(self, translation: str, book_abbrev: str, chapter: int) -> tuple[int, int] | None:
+        starts = self._chapter_starts.get((translation, book_abbrev))
+        if starts is None or not 1 <= chapter < len(starts):
+            return None
+        return starts[chapter - 1], starts[chapter]
+
+    def _verse_text(self, global_index: int) -> str:
+        start = self._blob_start + self._offsets[global_index]
+        end = self._blob_start + self._offsets[global_index + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def chapter_count(self, translation: str, book_abbrev: str) -> int:
+        starts = self._chapter_starts.get((translation, book_abbrev))
+        return len(starts) - 1 if starts else 0
+
+    def verse_count(self, translation: str, book_abbrev: str, chapter: int) -> int:
+        bounds = self._chapter_bounds(translation, book_abbrev, chapter)
+        return bounds[1] - bounds[0] if bounds else 0
+
+    def verse_index(self, translation: str, book_abbrev: str, chapter: int, verse: int) -> int | None:
+        """Índice global do versículo no corpus (útil como id de linha para índices derivados)."""
+        bounds = self._chapter_bounds(translation, book_abbrev, chapter)
+        if bounds is None or not 1 <= verse <= bounds[1] - bounds[0]:
+            return None
+        return bounds[0] + verse - 1
+
+    def verse_ref(self, global_index: int) -> tuple[str, str, int, int]:
+        """(tradução, livro, capítulo, versículo) de um índice global (inverso de verse_index)."""
+        position = bisect.bisect_right(self._chapter_index_starts, global_index) - 1
+        translation, book_abbrev, chapter = self._chapter_index_refs[position]
+        return translation, book_abbrev, chapter, global_index - self._chapter_index_starts[position] + 1
+
+    def translation_range(self, translation: str) -> tuple[int, int] | None:
+        """Intervalo [início, fim) dos índices globais de uma tradução."""
+        info = self.header["translations"].get(translation)
+        return (info["first_verse"], info["first_verse"] + info["verse_count"]) if info else None
+
+    def book_range(self, translation: str, book_abbrev: str) -> tuple[int, int] | None:
+        """Intervalo [início, fim) dos índices globais de um livro numa tradução."""
+        starts = self._chapter_starts.get((translation, book_abbrev))
+        return (starts[0], starts[-1]) if starts else None
+
+    def verse_text(self, global_index: int) -> str:
+        return self._verse_text(global_index)
+
+    def get_verse(self, translation: str, book_abbrev: str, chapter: int, verse: int) -> str | None:
+        global_index = self.verse_index(translation, book_abbrev, chapter, verse)
+        return None if global_index is None else self._verse_text(global_index)
+
+    def get_range(self, translation: str, book_abbrev: str, chapter: int, first_verse: int, last_verse: int) -> list[str]:
+        """Versículos first_verse..last_verse (inclusive), limitados ao tamanho do capítulo."""
+        bounds = self._chapter_bounds(translation, book_abbrev, chapter)
+        if bounds is None:
+            return []
+        start = bounds[0] + max(first_verse, 1) - 1
+        end = min(bounds[0] + last_verse, bounds[1])
+        return [self._verse_text(global_index) for global_index in range(start, end)]
+
+    def get_chapter(self, translation: str, book_abbrev: str, chapter: int) -> list[str] | None:
+        bounds = self._chapter_bounds(translation, book_abbrev, chapter)
+        if bounds is None:
+            return None
+        return [self._verse_text(global_index) for global_index in range(bounds[0], bounds[1])]
+
+    def iter_verses(self, translation: str):
+        """Gera (livro, capítulo, versículo, texto) de uma tradução, na ordem canônica."""
+        for book_abbrev in self.header["translations"][translation]["books"]:
+            starts = self._chapter_starts[(translation, book_abbrev)]
+            for chapter_index in range(len(starts) - 1):
+                for global_index in range(starts[chapter_index], starts[chapter_index + 1]):
+                    yield book_abbrev, chapter_index + 1, global_index - starts[chapter_index] + 1, self._verse_text(global_index)
+
+
+_corpus_by_path: dict[str, BibleCorpus] = {}
+_corpus_lock = threading.Lock()
+
+
+def open_corpus(path: str) -> BibleCorpus:
+    """Abre (uma vez por instância) o corpus do caminho informado."""
+    corpus = _corpus_by_path.get(path)
+    if corpus is None:
+        with _corpus_lock:
+            corpus = _corpus_by_path.get(path)
+            if corpus is None:
+                corpus = BibleCorpus(path)
+                _corpus_by_path[path] = corpus
+                print(f"BibleCorpus: Corpus carregado de {path} (traduções: {', '.join(corpus.translations)}).")
+    return corpus
@@ -0,0 +1,204 @@
+# functions/bible_data.py
+import os
+import json
+from functools import lru_cache
+import bible_corpus_store
+import interlinear_store
+import bible_text_index
+
+# Acesso aos dados bíblicos empacotados com as Functions (texto das traduções e mapas de livros).
+# O deploy envia apenas a pasta functions/, então o build_bible_data.py gera functions/bible_data/
+# (predeploy no firebase.json): os mapas de livros, o corpus empacotado (bible_corpus_store) com
+# todas as traduções, o interlinear colunar (interlinear_store) e o índice textual (bible_text_index).
+# Em desenvolvimento local, se functions/bible_data/ ainda não existir, os arquivos são lidos direto
+# de assets/Biblia (JSON por capítulo).
+
+_FUNCTIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+BIBLE_DATA_DIR = os.environ.get("BIBLE_DATA_DIR", os.path.join(_FUNCTIONS_DIR, "bible_data"))
+REPO_ASSETS_DIR = os.path.join(os.path.dirname(_FUNCTIONS_DIR), "assets", "Biblia")
+
+TRANSLATIONS = ["nvi", "aa", "acf", "kja", "kjf"]
+DEFAULT_TRANSLATION = "nvi"
+# Texto original (interlinear) por testamento do abbrev_map.json
+ORIGINAL_LANGUAGE_BY_TESTAMENT = {"Antigo": "hebrew_original", "Novo": "greek_original"}
+
+ABBREV_TO_FULL_NAME_MAP = {
+    "gn": "Gênesis", "ex": "Êxodo", "lv": "Levítico", "nm": "Números", "dt": "Deuteronômio",
+    "js": "Josué", "jz": "Juízes", "rt": "Rute", "1sm": "1 Samuel", "2sm": "2 Samuel",
+    "1rs": "1 Reis", "2rs": "2 Reis", "1cr": "1 Crônicas", "2cr": "2 Crônicas",
+    "ed": "Esdras", "ne": "Neemias", "et": "Ester", "job": "Jó", "sl": "Salmos",
+    "pv": "Provérbios", "ec": "Eclesiastes", "ct": "Cantares de Salomão", "is": "Isaías",
+    "jr": "Jeremias", "lm": "Lamentações", "ez": "Ezequiel", "dn": "Daniel",
+    "os": "Oseias", "jl": "Joel", "am": "Amós", "ob": "Obadias", "jn": "Jonas",
+    "mq": "Miqueias", "na": "Naum", "hc": "Habacuque", "sf": "Sofonias",
+    "ag": "Ageu", "zc": "Zacarias", "ml": "Malaquias", "mt": "Mateus", "mc": "Marcos",
+    "lc": "Lucas", "jo": "João", "at": "Atos", "rm": "Romanos", "1co": "1 Coríntios",
+    "2co": "2 Coríntios", "gl": "Gálatas", "ef": "Efésios", "fp": "Filipenses",
+    "cl": "Colossenses", "1ts": "1 Tessalonicenses", "2ts": "2 Tessalonicenses",
+    "1tm": "1 Timóteo", "2tm": "2 Timóteo", "tt": "Tito", "fm": "Filemom",
+    "hb": "Hebreus", "tg": "Tiago", "1pe": "1 Pedro", "2pe": "2 Pedro",
+    "1jo": "1 João", "2jo": "2 João", "3jo": "3 João", "jd": "Judas", "ap": "Apocalipse"
+}
+
+
+def resolve_data_path(*relative_parts: str) -> str | None:
+    """Caminho do arquivo em functions/bible_data/ (ou em assets/Biblia/, no desenvolvimento local)."""
+    for base_dir in (BIBLE_DATA_DIR, REPO_ASSETS_DIR):
+        candidate = os.path.join(base_dir, *relative_parts)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _load_json(*relative_parts: str):
+    path = resolve_data_path(*relative_parts)
+    if path is None:
+        raise FileNotFoundError(f"Arquivo de dados bíblicos não encontrado: {os.path.join(*relative_parts)}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def load_book_aliases() -> dict[str, str]:
+    """Variações de nomes de livros -> abreviação (ex: 'primeiro reis' -> '1rs')."""
+    return _load_json("book_variations_map_search.json")
+
+
+@lru_cache(maxsize=1)
+def load_abbrev_map() -> dict[str, dict]:
+    """Abreviação -> {nome, capitulos, slug, testament}, na ordem canônica dos 66 livros."""
+    return _load_json("completa_traducoes", "abbrev_map.json")
+
+
+def resolve_book_abbrev(book: str) -> str | None:
+    """Aceita a abreviação canônica ('jo', 'job') ou uma variação conhecida ('jó', 'João') e retorna a abreviação."""
+    if not book or not isinstance(book, str):
+        return None
+    normalized_book = " ".join(book.strip().lower().split())
+    if normalized_book in load_abbrev_map():
+        return normalized_book
+    return load_book_aliases().get(normalized_book)
+
+
+def get_chapter_count(book_abbrev: str) -> int | None:
+    book_info = load_abbrev_map().get(book_abbrev)
+    return book_info.get("capitulos") if book_info else None
+
+
+def get_original_language(book_abbrev: str) -> str | None:
+    """'hebrew_original' (AT) ou 'greek_original' (NT)."""
+    book_info = load_abbrev_map().get(book_abbrev)
+    return ORIGINAL_LANGUAGE_BY_TESTAMENT.get(book_info.get("testament")) if book_info else None
+
+
+_corpus_missing_logged = False
+
+
+def get_corpus() -> bible_corpus_store.BibleCorpus | None:
+    """Corpus empacotado (mmap), ou None se o build_bible_data.py ainda não tiver sido executado."""
+    global _corpus_missing_logged
+    corpus_path = os.path.join(BIBLE_DATA_DIR, bible_corpus_store.CORPUS_FILE_NAME)
+    if not os.path.exists(corpus_path):
+        if not _corpus_missing_logged:
+            print(f"AVISO (bible_data): Corpus empacotado não encontrado em {corpus_path}; usando os JSONs de assets/Biblia.")
+            _corpus_missing_logged = True
+        return None
+    return bible_corpus_store.open_corpus(corpus_path)
+
+
+@lru_cache(maxsize=512)
+def get_chapter_verses(translation: str, book_abbrev: str, chapter: int) -> tuple[str, ...] | None:
+    """Versículos de um capítulo (índice 0 = versículo 1), ou None se o capítulo não existir."""
+    if translation not in TRANSLATIONS:
+        raise ValueError(f"Tradução não suportada: {translation}")
+    corpus = get_corpus()
+    if corpus is not None:
+        chapter_verses = corpus.get_chapter(translation, book_abbrev, int(chapter))
+        return tuple(chapter_verses) if chapter_verses else None
+    try:
+        return tuple(_load_json("completa_traducoes", translation, book_abbrev, f"{int(chapter)}.json"))
+    except FileNotFoundError:
+        return None
+
+
+_text_index_missing_logged = False
+
+
+def get_text_index() -> bible_text_index.BibleTextIndex | None:
+    """Índice textual (busca exata/BM25), ou None se o build_bible_data.py ainda não tiver sido executado."""
+    global _text_index_missing_logged
+    index_path = os.path.join(BIBLE_DATA_DIR, bible_text_index.TEXT_INDEX_DIR_NAME)
+    if not os.path.exists(os.path.join(index_path, "terms.json")):
+        if not _text_index_missing_logged:
+            print(f"AVISO (bible_data): Índice textual não encontrado em {index_path}.")
+            _text_index_missing_logged = True
+        return None
+    return bible_text_index.open_index(index_path)
+
+
+_interlinear_missing_logged = False
+
+
+def get_interlinear_store(language: str) -> interlinear_store.InterlinearStore | None:
+    """Interlinear colunar ('greek' ou 'hebrew'), ou None se o build_bible_data.py ainda não tiver sido executado."""
+    global _interlinear_missing_logged
+    store_path = os.path.join(BIBLE_DATA_DIR, interlinear_store.INTERLINEAR_DIR_NAME, language)
+    if not os.path.exists(os.path.join(store_path, "meta.json")):
+        if not _interlinear_missing_logged:
+            print(f"AVISO (bible_data): Interlinear compilado não encontrado em {store_path}; usando os JSONs de assets/Biblia.")
+            _interlinear_missing_logged = True
+        return None
+    return interlinear_store.open_store(store_path)
+
+
+def get_interlinear_translation_verse_count(book_abbrev: str, chapter: int) -> int | None:
+    """Versículos do capítulo do interlinear na numeração das traduções (None se não existir)."""
+    language = get_original_language(book_abbrev)
+    if language is None:
+        return None
+    store = get_interlinear_store(interlinear_store.SOURCE_TO_LANGUAGE[language])
+    if store is not None:
+        return store.translation_verse_count(book_abbrev, int(chapter))
+    interlinear_verses = get_interlinear_chapter(book_abbrev, int(chapter))
+    if interlinear_verses is None:
+        return None
+    gaps = interlinear_store.VERSE_GAPS.get(interlinear_store.SOURCE_TO_LANGUAGE[language], {}).get((book_abbrev, int(chapter)), ())
+    return len(interlinear_verses) + len(gaps)
+
+
+def get_interlinear_verse_text(store: interlinear_store.InterlinearStore, translation: str, book_abbrev: str, chapter: int, verse: int) -> tuple[str | None, bool]:
+    """
+    (texto do versículo do interlinear na tradução, versificação divergente). Quando o capítulo tem
+    outra contagem de versículos no original (ex: títulos dos Salmos no hebraico), o mesmo número
+    não aponta para o mesmo texto: retorna (None, True) em vez de juntar o versículo errado.
+    """
+    chapter_verses = get_chapter_verses(translation, book_abbrev, chapter)
+    if not chapter_verses:
+        return None, False
+    if store.translation_verse_count(book_abbrev, chapter) != len(chapter_verses):
+        return None, True
+    return (chapter_verses[verse - 1] if verse <= len(chapter_verses) else None), False
+
+
+@lru_cache(maxsize=256)
+def get_interlinear_chapter(book_abbrev: str, chapter: int) -> dict[int, tuple[tuple[str, str, str], ...]] | None:
+    """
+    Palavras do texto original de um capítulo por número de versículo (na versificação das
+    traduções, ver interlinear_store.VERSE_GAPS), cada versículo com tuplas (texto, strong,
+    morfologia). Retorna None se o capítulo não existir no interlinear.
+    """
+    language = get_original_language(book_abbrev)
+    if language is None:
+        return None
+    store = get_interlinear_store(interlinear_store.SOURCE_TO_LANGUAGE[language])
+    if store is not None:
+        return store.get_chapter(book_abbrev, int(chapter))
+    try:
+        chapter_verses = _load_json("completa_traducoes", language, book_abbrev, f"{int(chapter)}.json")
+    except FileNotFoundError:
+        return None
+    verse_numbers = interlinear_store.chapter_verse_numbers(interlinear_store.SOURCE_TO_LANGUAGE[language], book_abbrev, int(chapter), len(chapter_verses))
+    return {
+        verse_number: tuple((word.get("text", ""), word.get("strong", ""), word.get("morph", "")) for word in verse if isinstance(word, dict))
+        for verse_number, verse in zip(verse_numbers, chapter_verses)
+    }
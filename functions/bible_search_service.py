@@ -1,93 +1,65 @@
 # functions/bible_search_service.py
 import os
 import traceback
-from openai import OpenAI # Garanta que 'openai>=1.0.0' está no seu requirements.txt
-import httpx # Usar httpx>=0.25.0 para requisições async mais robustas
-import asyncio # Para asyncio.to_thread
+import openai_clients # Cliente AsyncOpenAI compartilhado (openai>=1.0.0)
+import asyncio
+import vector_search_client
+import embedding_cache
+import embedding_batcher
+import search_result_cache
+import scripture_reference_parser
+import bible_text_search_service
+import local_vector_index
+import rank_fusion
 
 # Configuração - Chaves serão lidas de os.environ
 # PINECONE_ENDPOINT é o HOST mostrado na sua imagem do console Pinecone
 PINECONE_ENDPOINT = "https://biblia-hqija7a.svc.aped-4627-b74a.pinecone.io" # CONFIRME SE É ESTE
 EMBEDDING_MODEL = "text-embedding-3-small" # Ou text-embedding-3-large se usou para indexar
+PINECONE_TIMEOUT_SECONDS = 15.0
 
-# Variáveis globais para clientes (serão inicializadas uma vez por instância de função "quente")
-_openai_client = None
-_httpx_client = None
-_pinecone_api_key_loaded = None # Para armazenar a chave do Pinecone após carregá-la
+# Modos de busca (parâmetro 'mode' de semantic_bible_search):
+#   semantic         embedding + Pinecone (padrão, comportamento original)
+#   lexical          só o índice textual local (BM25), sem chamadas externas
+#   hybrid           vetorial e BM25 em paralelo, fundidos por Reciprocal Rank Fusion
+#   hybrid_weighted  idem, com soma ponderada das pontuações normalizadas
+SEARCH_MODES = ("semantic", "lexical", "hybrid", "hybrid_weighted")
+DEFAULT_SEARCH_MODE = "semantic"
+HYBRID_CANDIDATE_MULTIPLIER = 2  # Cada lado traz top_k * N candidatos para a fusão
+HYBRID_WEIGHTS = [1.0, 1.0]  # [vetorial, lexical]
 
 def _initialize_clients():
     """
-    Inicializa os clientes OpenAI e HTTPX se ainda não foram, e carrega a chave do Pinecone.
-    Esta função é chamada no início de cada função pública do serviço para garantir
-    que os clientes estejam prontos, mas a inicialização real só ocorre uma vez.
+    Garante que o cliente AsyncOpenAI compartilhado (openai_clients) está pronto para o event loop atual.
+    O acesso ao Pinecone (pool HTTP e chave) fica a cargo do módulo compartilhado vector_search_client.
     Levanta ValueError se as chaves API não estiverem configuradas/acessíveis como variáveis de ambiente
     (espera-se que sejam injetadas pelo Firebase Functions via parâmetro 'secrets' do decorator).
     """
-    global _openai_client, _httpx_client, _pinecone_api_key_loaded
-
-    # Inicializa cliente OpenAI
-    if _openai_client is None:
-        # O nome da variável de ambiente será o mesmo que você listou em 'secrets'
-        # no decorator da função chamadora em main.py (ex: "openai-api-key")
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            print("ERRO CRÍTICO (BibleSearchService): Variável de ambiente/secret 'openai-api-key' não configurada ou não acessível.")
-            raise ValueError("Configuração da API OpenAI ausente (secret 'openai-api-key').")
-        try:
-            _openai_client = OpenAI(api_key=openai_api_key)
-            print("Cliente OpenAI inicializado com sucesso para BibleSearchService.")
-        except Exception as e_openai_init:
-            print(f"ERRO CRÍTICO (BibleSearchService): Falha ao inicializar cliente OpenAI: {e_openai_init}")
-            _openai_client = None # Garante que não será usado se a inicialização falhar
-            raise # Relança a exceção para indicar falha na configuração
-
-    # Inicializa cliente HTTPX
-    if _httpx_client is None:
-        try:
-            _httpx_client = httpx.AsyncClient(timeout=30.0) # Timeout de 30s para requisições
-            print("Cliente HTTPX inicializado com sucesso para BibleSearchService.")
-        except Exception as e_httpx_init:
-            print(f"ERRO CRÍTICO (BibleSearchService): Falha ao inicializar cliente HTTPX: {e_httpx_init}")
-            _httpx_client = None
-            raise
-
-    # Carrega chave API do Pinecone
-    if _pinecone_api_key_loaded is None:
-        # O nome da variável de ambiente será o mesmo que você listou em 'secrets'
-        _pinecone_api_key_loaded = os.environ.get("pinecone-api-key")
-        if not _pinecone_api_key_loaded:
-            print("ERRO CRÍTICO (BibleSearchService): Variável de ambiente/secret 'pinecone-api-key' não configurada ou não acessível.")
-            raise ValueError("Configuração da API Pinecone ausente (secret 'pinecone-api-key').")
-        print("Chave API do Pinecone carregada com sucesso para BibleSearchService via Secret Manager.")
+    return openai_clients.get_async_client()
 
 
 async def generate_embedding_async(text_to_embed: str) -> list[float]:
     """Gera embedding para o texto usando OpenAI de forma assíncrona."""
     _initialize_clients() # Garante que os clientes estão inicializados antes de usar
 
-    if not _openai_client:
-        print("ERRO FATAL (generate_embedding_async): Cliente OpenAI não pôde ser inicializado.")
-        raise ConnectionError("Falha na inicialização do cliente OpenAI.")
-
     if not text_to_embed or not isinstance(text_to_embed, str):
         print(f"ERRO (generate_embedding_async): Texto para embedding inválido ou vazio. Tipo: {type(text_to_embed)}")
         raise ValueError("Texto para embedding inválido ou vazio.")
 
+    # Consultas repetidas ("ansiedade", "perdão"...) são atendidas pelo cache sem ir à OpenAI
+    return await embedding_cache.get_or_create_embedding_async(text_to_embed, EMBEDDING_MODEL, _create_embedding_async)
+
+async def _create_embedding_async(text_to_embed: str) -> list[float]:
+    """Chama a API de embeddings da OpenAI (usada apenas em caso de falha no cache)."""
     print(f"Gerando embedding para texto (primeiros 50 chars): '{text_to_embed[:50]}...'")
     try:
-        # Executa a chamada síncrona da biblioteca OpenAI em um thread separado
-        response = await asyncio.to_thread(
-            _openai_client.embeddings.create, # Função a ser chamada
-            model=EMBEDDING_MODEL,            # Argumentos nomeados para a função
-            input=text_to_embed
-        )
-        if response.data and len(response.data) > 0 and hasattr(response.data[0], 'embedding') and response.data[0].embedding:
-            embedding_vector = response.data[0].embedding
+        # Pedidos concorrentes são agrupados em uma única chamada 'embeddings.create'
+        embedding_vector = await embedding_batcher.embed_text_async(text_to_embed, EMBEDDING_MODEL)
+        if embedding_vector:
             print(f"Embedding gerado com sucesso (dimensões: {len(embedding_vector)}, primeiros 3 valores: {embedding_vector[:3]})")
             return embedding_vector
         else:
-            # Este log pode ser extenso, considere truncar 'response' se necessário
-            print(f"Resposta inesperada ou sem embedding da API OpenAI: {str(response)[:500]}")
+            print("Resposta inesperada ou sem embedding da API OpenAI.")
             raise ValueError("Resposta da API de embedding OpenAI não contém dados de embedding válidos.")
     except Exception as e:
         print(f"Erro durante a geração de embedding com OpenAI: {e}")
@@ -96,16 +68,7 @@ async def generate_embedding_async(text_to_embed: str) -> list[float]:
         raise # Relança a exceção para ser tratada pela função chamadora
 
 async def query_pinecone_async(vector: list[float], top_k: int, filters: dict | None = None) -> list[dict]:
-    """Consulta o Pinecone de forma assíncrona."""
-    _initialize_clients()
-
-    if not _httpx_client:
-        print("ERRO FATAL (query_pinecone_async): Cliente HTTPX não pôde ser inicializado.")
-        raise ConnectionError("Falha na inicialização do cliente HTTPX.")
-    if not _pinecone_api_key_loaded:
-        print("ERRO FATAL (query_pinecone_async): Chave API do Pinecone não pôde ser carregada.")
-        raise ConnectionError("Falha ao carregar configuração da API Pinecone.")
-
+    """Consulta o Pinecone de forma assíncrona através do pool compartilhado."""
     if not vector or not isinstance(vector, list) or not all(isinstance(n, (int, float)) for n in vector):
         print(f"ERRO (query_pinecone_async): Vetor de query inválido. Tipo: {type(vector)}")
         raise ValueError("Vetor de query inválido.")
@@ -114,24 +77,12 @@ async def query_pinecone_async(vector: list[float], top_k: int, filters: dict |
         top_k = 1
 
     request_url = f"{PINECONE_ENDPOINT}/query"
-    headers = {
-        "Api-Key": _pinecone_api_key_loaded,
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    payload: dict[str, any] = {
-        "vector": vector,
-        "topK": top_k,
-        "includeMetadata": True,
-        "includeValues": False
-    }
-
-    # --- AJUSTE PRINCIPAL AQUI ---
+    actual_pinecone_filter = None
+
     # O Pinecone espera que o filtro seja um dicionário onde as chaves são os campos
     # de metadados e os valores são os valores exatos para filtrar.
     # Se você tiver filtros como {"testamento": "Novo", "tipo": "biblia_versiculos"},
     # isso já deve estar no formato correto se 'filters' vier assim do Flutter.
-
     if filters and isinstance(filters, dict) and filters:
         # Garante que estamos passando apenas os filtros que têm valor (não nulos ou vazios)
         # Se o Flutter envia {"testamento": "Novo", "livro_curto": null},
@@ -139,59 +90,138 @@ async def query_pinecone_async(vector: list[float], top_k: int, filters: dict |
         # O Pinecone geralmente não lida bem com filtros `null` para igualdade,
         # a menos que seja uma sintaxe específica como {"campo": {"$exists": false}}.
         # Para filtros de igualdade simples, só passamos os que têm valor.
-        
         actual_pinecone_filter = {}
         for key, value in filters.items():
             if value is not None and value != "": # Só adiciona se tiver valor
                 actual_pinecone_filter[key] = value
-        
+
         if actual_pinecone_filter: # Se ainda houver filtros após remover os nulos/vazios
-            payload["filter"] = actual_pinecone_filter
             print(f"Consultando Pinecone em {request_url} com filtros: {actual_pinecone_filter}")
         else:
             print(f"Consultando Pinecone em {request_url} sem filtros (filtros recebidos eram nulos/vazios).")
     else:
         print(f"Consultando Pinecone em {request_url} sem filtros.")
-    # --- FIM DO AJUSTE PRINCIPAL ---
 
     try:
-        response = await _httpx_client.post(request_url, headers=headers, json=payload)
-        response.raise_for_status() 
-        result_data = response.json()
-        matches = result_data.get("matches", [])
-        if not isinstance(matches, list):
-            print(f"AVISO (query_pinecone_async): 'matches' não é uma lista na resposta do Pinecone. Recebido: {type(matches)}")
-            return []
+        matches = await vector_search_client.query_async(
+            PINECONE_ENDPOINT,
+            vector,
+            top_k,
+            filters=actual_pinecone_filter or None,
+            timeout=PINECONE_TIMEOUT_SECONDS,
+        )
         print(f"Consulta ao Pinecone bem-sucedida. Recebidos {len(matches)} resultados.")
-        # Adicionar log para ver os metadados dos resultados retornados
-        # for i, match in enumerate(matches[:3]): # Loga os 3 primeiros resultados
-        #     print(f"Resultado {i+1} - ID: {match.get('id')}, Score: {match.get('score')}, Metadata: {match.get('metadata')}")
         return matches
-    except httpx.HTTPStatusError as e_http:
-        error_message = f"Falha na comunicação com Pinecone (HTTP {e_http.response.status_code})."
-        print(f"Erro HTTP ao consultar Pinecone: Status {e_http.response.status_code}")
-        try:
-            error_body = e_http.response.json()
-            print(f"Corpo do erro do Pinecone (JSON): {error_body}")
-            if isinstance(error_body, dict) and "message" in error_body:
-                error_message += f" Detalhe: {error_body['message']}"
-        except Exception:
-            print(f"Corpo do erro do Pinecone (Texto): {e_http.response.text}")
-        traceback.print_exc()
-        raise ConnectionError(error_message) from e_http
-    except httpx.RequestError as e_req: 
-        print(f"Erro de requisição ao consultar Pinecone: {e_req}")
-        traceback.print_exc()
-        raise ConnectionError(f"Erro de rede ao conectar com Pinecone: {e_req}")
-    except Exception as e_generic: 
+    except (ValueError, ConnectionError):
+        raise
+    except Exception as e_generic:
         print(f"Erro inesperado durante a consulta ao Pinecone: {e_generic}")
         traceback.print_exc()
         raise Exception(f"Erro desconhecido ao consultar Pinecone: {e_generic}")
 
 
-async def perform_semantic_search(user_query: str, filters: dict | None, top_k: int = 10) -> list[dict]:
+def _resolve_direct_reference(user_query: str, top_k: int, filters: dict | None = None) -> list[dict] | None:
+    """
+    Resolve localmente queries que são referências diretas ("jo 3:16", "Romanos 8", "sl 23.1-4").
+    Retorna None (segue pela busca normal) se a referência contradiz os filtros (ex: livro_curto ou
+    testamento diferentes).
+    """
+    try:
+        reference = scripture_reference_parser.parse_reference(user_query)
+        if reference is None:
+            return None
+        results = scripture_reference_parser.resolve_reference_results(reference)
+    except Exception as e:
+        # Sem os dados bíblicos empacotados, segue pelo caminho semântico
+        print(f"AVISO (perform_semantic_search): Falha ao resolver referência direta '{user_query}': {e}")
+        return None
+    if results is None:
+        return None
+    active_filters = {key: value for key, value in (filters or {}).items() if value is not None and value != ""}
+    if not all(local_vector_index.matches_filter(result["metadata"], active_filters) for result in results):
+        print(f"Referência direta '{user_query}' não atende aos filtros {active_filters}; usando a busca normal.")
+        return None
+    print(f"Referência direta reconhecida ({reference['book_abbrev']} {reference['chapter']}): {len(results)} resultado(s), sem embedding/Pinecone.")
+    return results[:top_k]
+
+
+def _lexical_search(user_query: str, filters: dict | None, top_k: int) -> list[dict]:
+    """Busca BM25 no índice textual local, com os mesmos filtros de metadados da busca vetorial."""
+    active_filters = {key: value for key, value in (filters or {}).items() if value is not None and value != ""}
+    if active_filters.get("tipo", "biblia_versiculos") != "biblia_versiculos":
+        return []  # O índice textual só tem versículos (não as seções de comentário)
+    book_abbrev = active_filters.get("livro_curto") if isinstance(active_filters.get("livro_curto"), str) else None
+    testament = active_filters.get("testamento") if isinstance(active_filters.get("testamento"), str) else None
+    # Livro e testamento viram o intervalo de versículos do BM25; outros filtros são aplicados depois,
+    # então nesse caso busca mais candidatos para compensar
+    candidate_k = min(bible_text_search_service.MAX_TOP_K, top_k if set(active_filters) <= {"tipo", "livro_curto", "testamento"} else top_k * 5)
+    docs, scores = bible_text_search_service.rank_verses(user_query, top_k=max(candidate_k, 1), book_abbrev=book_abbrev, testament=testament)
+    results = [bible_text_search_service.format_verse_result(doc, score) for doc, score in zip(docs.tolist(), scores.tolist())]
+    return [result for result in results if local_vector_index.matches_filter(result["metadata"], active_filters)][:top_k]
+
+
+def _parse_verse_range(verses_label) -> tuple[int, int] | None:
+    try:
+        first, _, last = str(verses_label).partition("-")
+        return int(first), int(last or first)
+    except (TypeError, ValueError):
+        return None
+
+
+def _passage_key(match: dict) -> str:
+    metadata = match.get("metadata") or {}
+    if not metadata.get("livro_curto"):
+        return str(match.get("id"))
+    return f"{metadata.get('tipo')}|{metadata.get('livro_curto')}|{metadata.get('capitulo')}|{metadata.get('versiculos')}"
+
+
+def _fuse_results(vector_matches: list[dict], lexical_matches: list[dict], top_k: int, mode: str) -> list[dict]:
+    """
+    Funde os dois rankings. Um versículo do BM25 contido numa seção de versículos do Pinecone
+    (ex: jo 3:16 dentro de "16-18") conta como o mesmo candidato da seção.
+    """
+    sections_by_chapter: dict[tuple, list[tuple[int, int, str]]] = {}
+    for match in vector_matches:
+        metadata = match.get("metadata") or {}
+        verse_range = _parse_verse_range(metadata.get("versiculos"))
+        if metadata.get("tipo") == "biblia_versiculos" and verse_range:
+            sections_by_chapter.setdefault((metadata.get("livro_curto"), str(metadata.get("capitulo"))), []).append((*verse_range, _passage_key(match)))
+
+    match_by_key = {_passage_key(match): match for match in vector_matches}
+    lexical_keys = []
+    for match in lexical_matches:
+        metadata = match["metadata"]
+        verse = int(metadata["versiculos"])
+        key = next(
+            (section_key for first, last, section_key in sections_by_chapter.get((metadata["livro_curto"], str(metadata["capitulo"])), []) if first <= verse <= last),
+            _passage_key(match),
+        )
+        match_by_key.setdefault(key, match)
+        lexical_keys.append(key)
+
+    vector_keys = [_passage_key(match) for match in vector_matches]
+    if mode == "hybrid_weighted":
+        fused = rank_fusion.weighted_score_fusion(
+            [vector_keys, lexical_keys],
+            [[float(match.get("score") or 0.0) for match in vector_matches], [float(match["score"]) for match in lexical_matches]],
+            HYBRID_WEIGHTS,
+        )
+    else:
+        fused = rank_fusion.reciprocal_rank_fusion([vector_keys, lexical_keys], HYBRID_WEIGHTS)
+    return [{**match_by_key[key], "score": round(score, 6)} for key, score in fused[:top_k]]
+
+
+async def perform_semantic_search(
+    user_query: str,
+    filters: dict | None,
+    top_k: int = 10,
+    query_vector: list[float] | None = None,
+    mode: str = DEFAULT_SEARCH_MODE,
+) -> list[dict]:
     """
     Realiza a busca semântica: gera embedding da query e consulta o Pinecone.
+    'query_vector' permite reaproveitar um embedding já gerado para a mesma query (busca universal).
+    'mode' escolhe entre busca vetorial, textual (BM25 local) ou híbrida (ver SEARCH_MODES).
     Levanta ValueError para inputs inválidos, ConnectionError para problemas de rede/API,
     e Exception para outros erros internos.
     """
@@ -209,15 +239,59 @@ async def perform_semantic_search(user_query: str, filters: dict | None, top_k:
     if not isinstance(top_k, int) or top_k <= 0:
         print(f"AVISO (perform_semantic_search): top_k inválido ({top_k}), usando padrão 10.")
         top_k = 10
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Modo de busca inválido: '{mode}'. Use um de: {', '.join(SEARCH_MODES)}.")
 
-    print(f"Iniciando busca semântica para query (primeiros 100 chars): '{user_query[:100]}...' com filtros: {filters} e top_k: {top_k}")
+    # Caminho rápido: referências bíblicas explícitas não precisam de busca semântica
+    reference_results = _resolve_direct_reference(user_query, top_k, filters)
+    if reference_results is not None:
+        return reference_results
 
-    try:
-        # Passo 1: Gerar embedding para a query do usuário
-        query_vector = await generate_embedding_async(user_query)
+    if mode == "lexical":
+        try:
+            lexical_results = await asyncio.to_thread(_lexical_search, user_query, filters, top_k)
+            print(f"Busca textual (BM25) concluída: {len(lexical_results)} resultados, sem embedding/Pinecone.")
+            return lexical_results
+        except RuntimeError as e:
+            # Índice textual ainda não gerado: segue pela busca vetorial
+            print(f"AVISO (perform_semantic_search): {e} Usando a busca semântica.")
+            mode = DEFAULT_SEARCH_MODE
+
+    print(f"Iniciando busca ({mode}) para query (primeiros 100 chars): '{user_query[:100]}...' com filtros: {filters} e top_k: {top_k}")
+
+    async def _vector_search(vector_top_k: int) -> list[dict]:
+        # Passo 1: Gerar embedding para a query do usuário (se não veio pronto)
+        vector = query_vector if query_vector is not None else await generate_embedding_async(user_query)
         # Passo 2: Consultar o Pinecone com o vetor e filtros
-        search_results = await query_pinecone_async(query_vector, top_k, filters)
-        print(f"Busca semântica concluída com sucesso. {len(search_results)} resultados retornados do Pinecone.")
+        return await query_pinecone_async(vector, vector_top_k, filters)
+
+    async def _search_uncached() -> list[dict]:
+        if mode == DEFAULT_SEARCH_MODE:
+            return await _vector_search(top_k)
+        # Híbrido: Pinecone e BM25 em paralelo; se um dos lados falhar, segue com o outro
+        candidate_k = top_k * HYBRID_CANDIDATE_MULTIPLIER
+        vector_matches, lexical_matches = await asyncio.gather(
+            _vector_search(candidate_k),
+            asyncio.to_thread(_lexical_search, user_query, filters, candidate_k),
+            return_exceptions=True,
+        )
+        if isinstance(vector_matches, BaseException) and isinstance(lexical_matches, BaseException):
+            raise vector_matches
+        if isinstance(vector_matches, BaseException):
+            print(f"AVISO (busca híbrida): Busca vetorial falhou ({vector_matches}); usando só o BM25.")
+            # Falha transitória (OpenAI/Pinecone): o resultado só do BM25 não vai para o cache de 24 h
+            return search_result_cache.Uncacheable(_fuse_results([], lexical_matches, top_k, mode))
+        if isinstance(lexical_matches, BaseException):
+            print(f"AVISO (busca híbrida): Busca textual falhou ({lexical_matches}); usando só a vetorial.")
+            return search_result_cache.Uncacheable(_fuse_results(vector_matches, [], top_k, mode))
+        return _fuse_results(vector_matches, lexical_matches, top_k, mode)
+
+    try:
+        # Queries populares repetidas (mesmos filtros, topK e modo) saem do cache de resultados
+        mode_key = {} if mode == DEFAULT_SEARCH_MODE else {"mode": mode}
+        cache_key = search_result_cache.make_key(user_query, filters, top_k, **mode_key)
+        search_results = await search_result_cache.get_or_compute_async("biblia", cache_key, _search_uncached)
+        print(f"Busca ({mode}) concluída com sucesso. {len(search_results)} resultados retornados.")
         return search_results
     except ValueError as ve:
         print(f"Erro de valor (ValueError) durante a busca semântica: {ve}")
@@ -0,0 +1,186 @@
+# functions/bible_text_index.py
+import os
+import re
+import json
+import shutil
+import threading
+from array import array
+import numpy as np
+from unidecode import unidecode
+import bible_corpus_store
+
+# Índice invertido posicional de todas as traduções do corpus empacotado (bible_corpus_store), para
+# busca exata de palavras e frases ("graça e paz", "filho do homem") sem embedding nem Pinecone.
+# Os documentos são os versículos, identificados pelo índice global do corpus (as traduções ocupam
+# faixas contíguas, então filtrar por tradução/livro é recortar um intervalo de ids).
+# Termos: unidecode + minúsculas ('graça' e 'graca' são o mesmo termo).
+#
+# Arquivos em functions/bible_data/text_index/ (abertos com mmap):
+#   terms.json       lista de termos (posição = id do termo)
+#   term_ptr.npy     uint32  postings do termo t: [term_ptr[t], term_ptr[t + 1])
+#   docs.npy         uint32  versículo de cada posting (ordenado dentro de cada termo)
+#   pos_ptr.npy      uint32  posições do posting p: positions[pos_ptr[p]:pos_ptr[p + 1]] (tf = tamanho)
+#   positions.npy    uint16  posição do termo no versículo
+#   doc_lengths.npy  uint16  número de termos de cada versículo (BM25)
+
+TEXT_INDEX_DIR_NAME = "text_index"
+BM25_K1 = 1.2
+BM25_B = 0.75
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(unidecode(text or "").lower())
+
+
+def build_text_index(corpus_path: str, output_dir: str, translations: list[str]) -> dict:
+    """Indexa as traduções informadas do corpus em <output_dir>/text_index/. Retorna estatísticas."""
+    corpus = bible_corpus_store.BibleCorpus(corpus_path)
+    total_verses = sum(info["verse_count"] for info in corpus.header["translations"].values())
+    term_index: dict[str, int] = {}
+    token_terms, token_docs, token_positions = array("I"), array("I"), array("H")
+    doc_lengths = np.zeros(total_verses, dtype=np.uint16)
+
+    for translation in translations:
+        translation_range = corpus.translation_range(translation)
+        if translation_range is None:
+            print(f"AVISO (BibleTextIndex): Tradução '{translation}' não está no corpus, ignorando.")
+            continue
+        for global_index in range(*translation_range):
+            tokens = tokenize(corpus.verse_text(global_index))
+            for position, token in enumerate(tokens):
+                term_id = term_index.get(token)
+                if term_id is None:
+                    term_id = term_index[token] = len(term_index)
+                token_terms.append(term_id)
+                token_docs.append(global_index)
+                token_positions.append(position)
+            doc_lengths[global_index] = len(tokens)
+
+    terms = np.frombuffer(token_terms, dtype=np.uint32)
+    # Ordenação estável por termo: dentro de cada termo os tokens já estão em ordem de (versículo, posição)
+    order = np.argsort(terms, kind="stable")
+    sorted_terms = terms[order]
+    sorted_docs = np.frombuffer(token_docs, dtype=np.uint32)[order]
+    sorted_positions = np.frombuffer(token_positions, dtype=np.uint16)[order]
+
+    is_posting_start = np.ones(len(sorted_terms), dtype=bool)
+    is_posting_start[1:] = (sorted_terms[1:] != sorted_terms[:-1]) | (sorted_docs[1:] != sorted_docs[:-1])
+    posting_starts = np.flatnonzero(is_posting_start)
+    posting_terms = sorted_terms[posting_starts]
+    pos_ptr = np.append(posting_starts, len(sorted_positions)).astype(np.uint32)
+    term_ptr = np.searchsorted(posting_terms, np.arange(len(term_index) + 1)).astype(np.uint32)
+
+    final_dir = os.path.join(output_dir, TEXT_INDEX_DIR_NAME)
+    temp_dir = final_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    np.save(os.path.join(temp_dir, "term_ptr.npy"), term_ptr)
+    np.save(os.path.join(temp_dir, "docs.npy"), sorted_docs[posting_starts])
+    np.save(os.path.join(temp_dir, "pos_ptr.npy"), pos_ptr)
+    np.save(os.path.join(temp_dir, "positions.npy"), sorted_positions)
+    np.save(os.path.join(temp_dir, "doc_lengths.npy"), doc_lengths)
+    with open(os.path.join(temp_dir, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(list(term_index), f, ensure_ascii=False, separators=(",", ":"))
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(temp_dir, final_dir)
+
+    stats = {"terms": len(term_index), "postings": len(posting_starts), "tokens": len(sorted_positions)}
+    print(f"BibleTextIndex: {stats['terms']} termos, {stats['postings']} postings, {stats['tokens']} posições.")
+    return stats
+
+
+class BibleTextIndex:
+    """Leitor do índice textual (somente leitura, seguro para uso entre threads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "terms.json"), "r", encoding="utf-8") as f:
+            self._term_ids = {term: term_id for term_id, term in enumerate(json.load(f))}
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.term_ptr = load("term_ptr")
+        self.docs = load("docs")
+        self.pos_ptr = load("pos_ptr")
+        self.positions = load("positions")
+        self.doc_lengths = load("doc_lengths")
+        # Somas prefixadas para N e comprimento médio de qualquer faixa de versículos em O(1)
+        self._length_prefix = np.concatenate([[0], np.cumsum(self.doc_lengths, dtype=np.int64)])
+        self._doc_prefix = np.concatenate([[0], np.cumsum(self.doc_lengths > 0, dtype=np.int64)])
+
+    def term_id(self, term: str) -> int | None:
+        return self._term_ids.get(term)
+
+    def _posting_range(self, term_id: int, doc_range: tuple[int, int]) -> tuple[int, int]:
+        """Intervalo de postings do termo cujos versículos estão em [início, fim)."""
+        first, last = int(self.term_ptr[term_id]), int(self.term_ptr[term_id + 1])
+        term_docs = self.docs[first:last]
+        return first + int(np.searchsorted(term_docs, doc_range[0])), first + int(np.searchsorted(term_docs, doc_range[1]))
+
+    def bm25(self, term_ids: list[int], doc_range: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        """(versículos, pontuações) BM25 dos versículos da faixa que contêm algum dos termos."""
+        start, end = doc_range
+        doc_count = int(self._doc_prefix[end] - self._doc_prefix[start])
+        if doc_count == 0 or not term_ids:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64)
+        average_length = (self._length_prefix[end] - self._length_prefix[start]) / doc_count
+
+        all_docs, all_scores = [], []
+        for term_id in term_ids:
+            first, last = self._posting_range(term_id, doc_range)
+            if first == last:
+                continue
+            docs = np.asarray(self.docs[first:last])
+            term_frequencies = np.diff(np.asarray(self.pos_ptr[first:last + 1], dtype=np.int64)).astype(np.float64)
+            document_frequency = last - first
+            idf = np.log(1.0 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            lengths = np.asarray(self.doc_lengths[docs], dtype=np.float64)
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / average_length)
+            all_docs.append(docs)
+            all_scores.append(idf * term_frequencies * (BM25_K1 + 1.0) / (term_frequencies + norm))
+        if not all_docs:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64)
+        unique_docs, inverse = np.unique(np.concatenate(all_docs), return_inverse=True)
+        return unique_docs, np.bincount(inverse, weights=np.concatenate(all_scores))
+
+    def phrase_docs(self, term_ids: list[int], doc_range: tuple[int, int]) -> np.ndarray:
+        """Versículos da faixa em que os termos aparecem consecutivos, nessa ordem."""
+        candidates = None
+        for term_id in set(term_ids):
+            first, last = self._posting_range(term_id, doc_range)
+            term_docs = np.asarray(self.docs[first:last])
+            candidates = term_docs if candidates is None else np.intersect1d(candidates, term_docs, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+        if len(term_ids) == 1:
+            return candidates
+
+        # Chave (versículo, posição - deslocamento na frase): a frase casa onde todas as chaves coincidem
+        matching_keys = None
+        for offset, term_id in enumerate(term_ids):
+            first, last = self._posting_range(term_id, doc_range)
+            term_docs = np.asarray(self.docs[first:last])
+            term_frequencies = np.diff(np.asarray(self.pos_ptr[first:last + 1], dtype=np.int64))
+            term_positions = np.asarray(self.positions[int(self.pos_ptr[first]):int(self.pos_ptr[last])], dtype=np.int64)
+            keep = np.repeat(np.isin(term_docs, candidates, assume_unique=True), term_frequencies) & (term_positions >= offset)
+            keys = (np.repeat(term_docs.astype(np.int64), term_frequencies)[keep] << 16) | (term_positions[keep] - offset)
+            matching_keys = np.unique(keys) if matching_keys is None else np.intersect1d(matching_keys, keys)
+            if len(matching_keys) == 0:
+                break
+        return np.unique(matching_keys >> 16).astype(np.uint32)
+
+
+_index_by_path: dict[str, BibleTextIndex] = {}
+_index_lock = threading.Lock()
+
+
+def open_index(path: str) -> BibleTextIndex:
+    """Abre (uma vez por instância) o índice textual do diretório informado."""
+    index = _index_by_path.get(path)
+    if index is None:
+        with _index_lock:
+            index = _index_by_path.get(path)
+            if index is None:
+                index = BibleTextIndex(path)
+                _index_by_path[path] = index
+                print(f"BibleTextIndex: Índice carregado de {path} ({len(index._term_ids)} termos).")
+    return index
@@ -0,0 +1,128 @@
+# functions/bible_text_search_service.py
+import re
+import numpy as np
+import bible_data
+import bible_text_index
+
+# Busca textual exata nas traduções da Bíblia (índice invertido local, bible_text_index), sem
+# chamadas externas. Trechos entre aspas são frases obrigatórias ("filho do homem" só casa com as
+# palavras juntas e nessa ordem); o restante da query entra só na pontuação BM25.
+
+DEFAULT_TOP_K = 20
+MAX_TOP_K = 100
+_QUOTED_PHRASE_PATTERN = re.compile(r'"([^"]+)"|“([^”]+)”')
+
+
+def _parse_query(user_query: str, phrase: bool) -> tuple[list[str], list[list[str]]]:
+    """(termos para o BM25, frases obrigatórias). Com phrase=True, a query inteira é uma frase."""
+    terms = bible_text_index.tokenize(user_query)
+    if phrase:
+        return terms, [terms] if terms else []
+    phrases = []
+    for match in _QUOTED_PHRASE_PATTERN.finditer(user_query):
+        phrase_terms = bible_text_index.tokenize(match.group(1) or match.group(2))
+        if phrase_terms:
+            phrases.append(phrase_terms)
+    return terms, phrases
+
+
+def _testament_range(corpus, translation: str, testament: str) -> tuple[int, int] | None:
+    """Intervalo [início, fim) do testamento na tradução (os livros de cada testamento são contíguos no corpus)."""
+    abbrev_map = bible_data.load_abbrev_map()
+    book_ranges = [
+        corpus.book_range(translation, book_abbrev)
+        for book_abbrev in corpus.book_order
+        if (abbrev_map.get(book_abbrev) or {}).get("testament") == testament
+    ]
+    book_ranges = [book_range for book_range in book_ranges if book_range]
+    return (book_ranges[0][0], book_ranges[-1][1]) if book_ranges else None
+
+
+def rank_verses(
+    user_query: str,
+    translation: str = bible_data.DEFAULT_TRANSLATION,
+    top_k: int = DEFAULT_TOP_K,
+    book_abbrev: str | None = None,
+    phrase: bool = False,
+    testament: str | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (índices globais dos versículos no corpus, pontuações BM25), do mais relevante ao menos.
+    testament ('Antigo' ou 'Novo') restringe o ranking aos livros do testamento. Levanta ValueError para parâmetros inválidos e RuntimeError se o índice não estiver disponível.
+    """
+    if not user_query or not isinstance(user_query, str):
+        raise ValueError("A query de busca não pode ser vazia.")
+    if translation not in bible_data.TRANSLATIONS:
+        raise ValueError(f"Tradução não suportada: {translation}")
+    if not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"O parâmetro 'topK' deve estar entre 1 e {MAX_TOP_K}.")
+
+    text_index, corpus = bible_data.get_text_index(), bible_data.get_corpus()
+    if text_index is None or corpus is None:
+        raise RuntimeError("Índice textual da Bíblia indisponível (execute build_bible_data.py).")
+
+    if book_abbrev:
+        resolved_abbrev = bible_data.resolve_book_abbrev(book_abbrev)
+        doc_range = corpus.book_range(translation, resolved_abbrev) if resolved_abbrev else None
+        if doc_range is None:
+            raise ValueError(f"Livro desconhecido: '{book_abbrev}'.")
+    else:
+        doc_range = corpus.translation_range(translation)
+
+    empty = (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64))
+    if testament:
+        testament_range = _testament_range(corpus, translation, testament)
+        if testament_range is None:
+            return empty
+        doc_range = (max(doc_range[0], testament_range[0]), min(doc_range[1], testament_range[1]))
+        if doc_range[0] >= doc_range[1]:
+            return empty  # Livro de outro testamento
+    terms, phrases = _parse_query(user_query, phrase)
+    term_ids = [text_index.term_id(term) for term in dict.fromkeys(terms)]
+    docs, scores = text_index.bm25([term_id for term_id in term_ids if term_id is not None], doc_range)
+
+    for phrase_terms in phrases:
+        phrase_term_ids = [text_index.term_id(term) for term in phrase_terms]
+        if None in phrase_term_ids:
+            return empty
+        keep = np.isin(docs, text_index.phrase_docs(phrase_term_ids, doc_range))
+        docs, scores = docs[keep], scores[keep]
+    if len(docs) == 0:
+        return empty
+
+    if len(docs) > top_k:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        docs, scores = docs[top], scores[top]
+    order = np.lexsort((docs, -scores))  # empate: ordem canônica
+    return docs[order], scores[order]
+
+
+def format_verse_result(global_index: int, score: float) -> dict:
+    """Resultado no mesmo formato dos 'matches' da busca semântica (tipo 'biblia_versiculos')."""
+    corpus = bible_data.get_corpus()
+    translation, book_abbrev, chapter, verse = corpus.verse_ref(int(global_index))
+    return {
+        "id": f"{book_abbrev}_c{chapter}_v{verse}",
+        "score": round(float(score), 4),
+        "metadata": {
+            "tipo": "biblia_versiculos",
+            "livro_curto": book_abbrev,
+            "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(book_abbrev, book_abbrev.upper()),
+            "capitulo": chapter,
+            "versiculos": str(verse),
+            "testamento": (bible_data.load_abbrev_map().get(book_abbrev) or {}).get("testament"),
+            "texto": corpus.verse_text(int(global_index)),
+            "traducao": translation,
+        },
+    }
+
+
+def search_bible_text(
+    user_query: str,
+    translation: str = bible_data.DEFAULT_TRANSLATION,
+    top_k: int = DEFAULT_TOP_K,
+    book_abbrev: str | None = None,
+    phrase: bool = False,
+) -> list[dict]:
+    docs, scores = rank_verses(user_query, translation, top_k, book_abbrev, phrase)
+    return [format_verse_result(doc, score) for doc, score in zip(docs.tolist(), scores.tolist())]
@@ -1,9 +1,14 @@
 # functions/book_search_service.py
 import os
+import json
 import traceback
-from openai import OpenAI
-import httpx
+import openai_clients
 import asyncio
+import vector_search_client
+import embedding_cache
+import embedding_batcher
+import local_vector_index
+import justification_cache
 
 # --- Configurações ---
 # Use o mesmo endpoint do Pinecone que você usou para indexar os livros.
@@ -13,74 +18,61 @@ PINECONE_ENDPOINT_LIVROS = "https://livros-hqija7a.svc.aped-4627-b74a.pinecone.i
 EMBEDDING_MODEL = "text-embedding-3-small"
 # Usamos o modelo mais barato e rápido para a justificativa, pois é uma tarefa simples.
 CHAT_MODEL = "gpt-4.1-nano"
-
-# Clientes globais para reutilização em invocações "quentes"
-_openai_client_books = None
-_httpx_client_books = None
-_pinecone_api_key_books_loaded = None
-
+PINECONE_TIMEOUT_SECONDS = 10.0
+# Backend vetorial: "pinecone" (padrão) ou "local" (snapshot em memória gerado por export_vector_snapshot.py)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND_LIVROS", "pinecone")
+LOCAL_SNAPSHOT_NAME = "livros"
+# Justificativas: "batched" (uma única chamada JSON para todos os livros, com fallback por livro)
+# ou "per_book" (uma chamada por livro, comportamento original)
+JUSTIFICATION_MODE = os.environ.get("BOOK_JUSTIFICATION_MODE", "batched")
+JUSTIFICATION_MAX_TOKENS_PER_BOOK = 150
+DEFAULT_RECOMMENDATION_REASON = "Este livro é altamente recomendado por tratar de temas profundos e relevantes relacionados à sua busca."
 
 def _initialize_book_clients():
-    """Inicializa os clientes de forma preguiçosa (lazy)."""
-    global _openai_client_books, _httpx_client_books, _pinecone_api_key_books_loaded
-
-    if _openai_client_books and _httpx_client_books and _pinecone_api_key_books_loaded:
-        return  # Já inicializado
-
-    # Carrega a chave da OpenAI a partir dos secrets
-    if _openai_client_books is None:
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            raise ValueError("Secret 'openai-api-key' não configurado.")
-        _openai_client_books = OpenAI(api_key=openai_api_key)
-        print("BookSearchService: Cliente OpenAI inicializado.")
-
-    # Inicializa o cliente HTTP para chamadas ao Pinecone
-    if _httpx_client_books is None:
-        _httpx_client_books = httpx.AsyncClient(timeout=30.0)
-        print("BookSearchService: Cliente HTTPX inicializado.")
-    
-    # Carrega a chave do Pinecone a partir dos secrets
-    if _pinecone_api_key_books_loaded is None:
-        _pinecone_api_key_books_loaded = os.environ.get("pinecone-api-key")
-        if not _pinecone_api_key_books_loaded:
-            raise ValueError("Secret 'pinecone-api-key' não configurado.")
-        print("BookSearchService: Chave API do Pinecone carregada.")
+    """Cliente AsyncOpenAI compartilhado, usado no embedding da busca e nas justificativas."""
+    return openai_clients.get_async_client()
 
 
 # Esta função pode ser importada de um módulo comum no futuro para evitar repetição
 async def _generate_embedding_async(text_to_embed: str) -> list[float]:
+    return await embedding_cache.get_or_create_embedding_async(text_to_embed, EMBEDDING_MODEL, _create_embedding_async)
+
+
+async def _create_embedding_async(text_to_embed: str) -> list[float]:
     _initialize_book_clients()
     try:
-        response = await asyncio.to_thread(
-            _openai_client_books.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=text_to_embed
-        )
-        return response.data[0].embedding
+        return await embedding_batcher.embed_text_async(text_to_embed, EMBEDDING_MODEL)
     except Exception as e:
         print(f"BookSearchService: Erro na geração de embedding: {e}")
         raise
 
 
-# Esta função também poderia ser compartilhada
+# A consulta usa o snapshot local (se configurado) ou o pool de conexões compartilhado (vector_search_client)
 async def _query_pinecone_async(vector: list[float], top_k: int) -> list[dict]:
-    _initialize_book_clients()
-    headers = { "Api-Key": _pinecone_api_key_books_loaded, "Content-Type": "application/json" }
-    payload = { "vector": vector, "topK": top_k, "includeMetadata": True }
-    
+    if VECTOR_BACKEND == "local":
+        local_matches = local_vector_index.query(LOCAL_SNAPSHOT_NAME, vector, top_k)
+        if local_matches is not None:
+            return local_matches
+        print("BookSearchService: Snapshot local indisponível, consultando o Pinecone.")
     try:
-        response = await _httpx_client_books.post(f"{PINECONE_ENDPOINT_LIVROS}/query", headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json().get("matches", [])
-    except httpx.HTTPStatusError as e_http:
-        print(f"BookSearchService: Erro HTTP no Pinecone: {e_http.response.text}")
-        raise
+        return await vector_search_client.query_async(
+            PINECONE_ENDPOINT_LIVROS, vector, top_k, timeout=PINECONE_TIMEOUT_SECONDS
+        )
     except Exception as e:
         print(f"BookSearchService: Erro na consulta ao Pinecone: {e}")
         raise
 
 
+def _build_book_context(book_metadata: dict) -> str:
+    return f"""
+    Título do Livro: {book_metadata.get('titulo', 'N/A')}
+    Autor: {book_metadata.get('autor', 'N/A')}
+    Resumo: {book_metadata.get('resumo', 'N/A')}
+    Aplicações Práticas: {book_metadata.get('aplicacoes', 'N/A')}
+    Perfil do Leitor Ideal: {book_metadata.get('perfil_leitor', 'N/A')}
+    """
+
+
 async def _generate_recommendation_reason(user_query: str, book_metadata: dict) -> str:
     print("Metadados do Livro para Justificativa:")
     print(book_metadata)
@@ -88,21 +80,15 @@ async def _generate_recommendation_reason(user_query: str, book_metadata: dict)
     """
     Usa a IA para criar uma justificativa do porquê o livro é recomendado.
     """
-    _initialize_book_clients()
+    openai_client = _initialize_book_clients()
     
     # Monta o contexto com os dados do livro recuperados do Pinecone
-    context = f"""
-    Título do Livro: {book_metadata.get('titulo', 'N/A')}
-    Autor: {book_metadata.get('autor', 'N/A')}
-    Resumo: {book_metadata.get('resumo', 'N/A')}
-    Aplicações Práticas: {book_metadata.get('aplicacoes', 'N/A')}
-    Perfil do Leitor Ideal: {book_metadata.get('perfil_leitor', 'N/A')}
-    """
+    context = _build_book_context(book_metadata)
 
     prompt = f"""
 Você é um bibliotecário e conselheiro teológico experiente. Um usuário descreveu a seguinte situação ou necessidade: "{user_query}"
 
-Com base no CONTEXTO do livro fornecido abaixo, escreva uma justificativa curta, pessoal e convincente (1-2 frases) explicando por que este livro específico é uma excelente recomendação para a situação do usuário. Comece a resposta diretamente, por exemplo: "Este livro é ideal para você porque..." ou "Para o momento que você está vivendo, esta obra oferece...". Evite frases genéricas.
+Com base no CONTEXTO do livro fornecido abaixo, escreva uma justificativa curta, acolhedora e convincente (1-2 frases) explicando por que este livro específico é uma excelente recomendação para essa necessidade. A justificativa será mostrada também a outros usuários com uma necessidade parecida: fale do tema (ex: ansiedade, luto, perdão), sem repetir detalhes pessoais do relato (nomes, pessoas envolvidas, circunstâncias específicas). Comece a resposta diretamente, por exemplo: "Este livro é ideal para quem..." ou "Para quem enfrenta..., esta obra oferece...". Evite frases genéricas.
 
 --- CONTEXTO DO LIVRO ---
 {context}
@@ -111,8 +97,7 @@ Com base no CONTEXTO do livro fornecido abaixo, escreva uma justificativa curta,
 Justificativa da Recomendação:
 """
     try:
-        response = await asyncio.to_thread(
-            _openai_client_books.chat.completions.create,
+        response = await openai_client.chat.completions.create(
             model=CHAT_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7, # Um pouco de criatividade para uma resposta mais natural
@@ -122,12 +107,70 @@ Justificativa da Recomendação:
     except Exception as e:
         print(f"BookSearchService: Erro ao gerar justificativa para {book_metadata.get('titulo')}: {e}")
         # Retorna uma justificativa padrão em caso de erro na API do chat
-        return "Este livro é altamente recomendado por tratar de temas profundos e relevantes relacionados à sua busca."
+        return DEFAULT_RECOMMENDATION_REASON
+
+
+async def _generate_recommendation_reasons_batched(user_query: str, books_metadata: list[dict]) -> list[str]:
+    """
+    Gera as justificativas de todos os livros numa única chamada em modo JSON (o enquadramento e a
+    necessidade do usuário vão uma vez só). Livros sem justificativa válida na resposta, ou todos
+    se a chamada/parse falhar, recorrem a _generate_recommendation_reason individualmente.
+    """
+    openai_client = _initialize_book_clients()
+    books_context = "\n".join(
+        f"--- LIVRO {position} ---\n{_build_book_context(book_metadata)}"
+        for position, book_metadata in enumerate(books_metadata, start=1)
+    )
+    prompt = f"""
+Você é um bibliotecário e conselheiro teológico experiente. Um usuário descreveu a seguinte situação ou necessidade: "{user_query}"
+
+Com base no CONTEXTO de cada livro fornecido abaixo, escreva para CADA livro uma justificativa curta, acolhedora e convincente (1-2 frases) explicando por que aquele livro específico é uma excelente recomendação para essa necessidade. As justificativas serão mostradas também a outros usuários com uma necessidade parecida: fale do tema (ex: ansiedade, luto, perdão), sem repetir detalhes pessoais do relato (nomes, pessoas envolvidas, circunstâncias específicas). Comece cada justificativa diretamente, por exemplo: "Este livro é ideal para quem..." ou "Para quem enfrenta..., esta obra oferece...". Evite frases genéricas e não repita a mesma justificativa entre livros.
+
+{books_context}
+--- FIM DOS LIVROS ---
 
+Retorne APENAS um objeto JSON no formato:
+{{"justifications": [{{"livro": 1, "justificativa": "..."}}, {{"livro": 2, "justificativa": "..."}}]}}
+com exatamente um item para cada um dos {len(books_metadata)} livros.
+"""
+    reasons: list[str | None] = [None] * len(books_metadata)
+    try:
+        response = await openai_client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=JUSTIFICATION_MAX_TOKENS_PER_BOOK * len(books_metadata) + 50,
+            response_format={"type": "json_object"},
+        )
+        items = json.loads(response.choices[0].message.content or "{}").get("justifications")
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                position = int(item.get("livro")) - 1
+            except (TypeError, ValueError):
+                continue
+            reason = item.get("justificativa")
+            if 0 <= position < len(reasons) and isinstance(reason, str) and reason.strip():
+                reasons[position] = reason.strip()
+    except Exception as e:
+        print(f"BookSearchService: Falha na geração em lote das justificativas: {e}")
 
-async def get_book_recommendations(user_query: str, top_k: int = 5) -> list[dict]:
+    missing = [position for position, reason in enumerate(reasons) if reason is None]
+    if missing:
+        print(f"BookSearchService: {len(missing)} de {len(reasons)} justificativas ausentes no lote; gerando individualmente.")
+        fallback_reasons = await asyncio.gather(*(
+            _generate_recommendation_reason(user_query, books_metadata[position]) for position in missing
+        ))
+        for position, reason in zip(missing, fallback_reasons):
+            reasons[position] = reason
+    return reasons
+
+
+async def get_book_recommendations(user_query: str, top_k: int = 5, query_vector: list[float] | None = None) -> list[dict]:
     """
     Orquestra o processo completo: embedding, busca no Pinecone e geração de justificativas.
+    'query_vector' permite reaproveitar um embedding já gerado para a mesma query.
     """
     if not user_query:
         raise ValueError("A query do usuário não pode ser vazia.")
@@ -135,22 +178,42 @@ async def get_book_recommendations(user_query: str, top_k: int = 5) -> list[dict
     print(f"BookSearchService: Iniciando busca de livros para a query: '{user_query}'")
     
     try:
-        # 1. Gerar embedding para a query do usuário
-        query_vector = await _generate_embedding_async(user_query)
+        # 1. Gerar embedding para a query do usuário (se não veio pronto)
+        if query_vector is None:
+            query_vector = await _generate_embedding_async(user_query)
 
         # 2. Buscar no Pinecone pelos livros mais similares
         search_results = await _query_pinecone_async(query_vector, top_k)
         print(f"BookSearchService: {len(search_results)} livros encontrados no Pinecone.")
 
-        # 3. Preparar tarefas para gerar as justificativas em paralelo
-        justification_tasks = []
-        for match in search_results:
-            metadata = match.get('metadata', {})
-            # Adiciona a tarefa de geração à lista
-            justification_tasks.append(_generate_recommendation_reason(user_query, metadata))
-
-        # Executa todas as chamadas à API de chat para as justificativas concorrentemente
-        justifications = await asyncio.gather(*justification_tasks)
+        # 3. Justificativas: primeiro o cache (cluster da query + livro), depois a IA só para as que faltam
+        books_metadata = [match.get('metadata', {}) for match in search_results]
+        book_ids = [match.get('id') for match in search_results]
+        cluster = justification_cache.assign_cluster(user_query, query_vector)
+        cluster_id, is_leader = cluster if cluster else (None, False)
+        cached_reasons = await justification_cache.get_many(cluster_id, [book_id for book_id in book_ids if book_id]) if cluster_id else {}
+        missing = [i for i, book_id in enumerate(book_ids) if book_id not in cached_reasons]
+        print(f"BookSearchService: {len(book_ids) - len(missing)} justificativas vindas do cache, {len(missing)} a gerar.")
+
+        # Uma chamada para todos os livros que faltam (ou uma por livro, em paralelo), sempre com a
+        # query de quem pediu
+        missing_metadata = [books_metadata[i] for i in missing]
+        if JUSTIFICATION_MODE == "batched" and len(missing_metadata) > 1:
+            generated_reasons = await _generate_recommendation_reasons_batched(user_query, missing_metadata)
+        else:
+            generated_reasons = await asyncio.gather(*(
+                _generate_recommendation_reason(user_query, metadata) for metadata in missing_metadata
+            ))
+        if cluster_id and is_leader:
+            # Só a líder grava (é dela que todos os membros estão próximos); a justificativa padrão
+            # (falha na API) não é guardada
+            justification_cache.put_many(cluster_id, {
+                book_ids[i]: reason for i, reason in zip(missing, generated_reasons)
+                if book_ids[i] and reason != DEFAULT_RECOMMENDATION_REASON
+            })
+        justifications = [cached_reasons.get(book_id) for book_id in book_ids]
+        for i, reason in zip(missing, generated_reasons):
+            justifications[i] = reason
 
         # 4. Montar a resposta final combinando os resultados da busca com as justificativas
         recommendations = []
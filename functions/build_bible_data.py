@@ -0,0 +1,59 @@
+# functions/build_bible_data.py
+"""
+Gera functions/bible_data/ a partir de assets/Biblia: copia os mapas de livros e compila
+  - todas as traduções (inclusive os originais) no corpus empacotado bible_corpus.bin
+    (bible_corpus_store) e no índice textual posicional (bible_text_index);
+  - o interlinear grego/hebraico em colunas NumPy (interlinear_store), com as máscaras de traços
+    morfológicos (morphology_features);
+  - os léxicos de Strong no índice compacto (strongs_lexicon).
+Roda no predeploy (firebase.json), pois o deploy envia apenas a pasta functions/.
+
+Uso (de qualquer diretório):
+    python functions/build_bible_data.py
+"""
+import os
+import sys
+import shutil
+import bible_data
+import bible_corpus_store
+import strongs_lexicon
+import interlinear_store
+import morphology_features
+import bible_text_index
+
+DATA_FILES = [
+    "book_variations_map_search.json",
+    os.path.join("completa_traducoes", "abbrev_map.json"),
+]
+
+
+def build(source_dir: str = bible_data.REPO_ASSETS_DIR, output_dir: str = bible_data.BIBLE_DATA_DIR) -> None:
+    if not os.path.isdir(source_dir):
+        raise FileNotFoundError(f"Pasta de assets da Bíblia não encontrada: {source_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    for relative_path in DATA_FILES:
+        destination = os.path.join(output_dir, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(os.path.join(source_dir, relative_path), destination)
+
+    corpus_path = os.path.join(output_dir, bible_corpus_store.CORPUS_FILE_NAME)
+    bible_corpus_store.build_corpus(os.path.join(source_dir, "completa_traducoes"), corpus_path)
+    bible_text_index.build_text_index(corpus_path, output_dir, bible_data.TRANSLATIONS)
+    interlinear_dir = os.path.join(output_dir, interlinear_store.INTERLINEAR_DIR_NAME)
+    for language in interlinear_store.LANGUAGES:
+        meta = interlinear_store.build_interlinear(os.path.join(source_dir, "completa_traducoes"), interlinear_dir, language)
+        morphology_features.write_feature_table(os.path.join(interlinear_dir, language), meta["morph_table"], language)
+    strongs_lexicon.build_lexicon_index(
+        os.path.join(source_dir, "completa_traducoes"),
+        os.path.join(output_dir, strongs_lexicon.LEXICON_INDEX_FILE_NAME),
+    )
+    print(f"Dados bíblicos gravados em {output_dir}")
+
+
+if __name__ == "__main__":
+    try:
+        build()
+    except Exception as e:
+        print(f"ERRO ao gerar os dados bíblicos: {e}")
+        sys.exit(1)
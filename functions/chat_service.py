@@ -2,8 +2,6 @@
 import os
 import traceback
 import asyncio
-from openai import OpenAI
-import httpx # Garanta que httpx>=0.25.0 está nos seus requirements.txt
 
 # Importa as funções de serviço do módulo de sermões
 from sermons_service import (
@@ -60,10 +58,9 @@ Com base na última pergunta, qual ferramenta você deve usar? Responda APENAS c
     
     print("Agente de Roteamento: Decidindo a rota para a query...")
     try:
-        from sermons_service import _openai_client_sermons as openai_client
+        openai_client = _initialize_sermon_clients()
         
-        response = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        response = await openai_client.chat.completions.create(
             model=ROUTING_MODEL,
             messages=[{"role": "user", "content": system_prompt}],
             temperature=0,
@@ -104,9 +101,8 @@ Standalone question:"""
     
     print("Gerando query autônoma com base no histórico...")
     try:
-        from sermons_service import _openai_client_sermons as openai_client
-        response = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        openai_client = _initialize_sermon_clients()
+        response = await openai_client.chat.completions.create(
             model=ROUTING_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0,
@@ -221,9 +217,8 @@ async def get_rag_chat_response(user_query: str, chat_history: list[dict] | None
     # 3. Geração da Resposta Final
     print("Enviando prompt final para o modelo de chat...")
     try:
-        from sermons_service import _openai_client_sermons as openai_client
-        chat_completion = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        openai_client = _initialize_sermon_clients()
+        chat_completion = await openai_client.chat.completions.create(
             model=CHAT_MODEL,
             messages=prompt_messages,
             temperature=0.5,
@@ -2,57 +2,31 @@
 
 import os
 import traceback
-from openai import OpenAI
-import httpx
+import openai_clients
 import asyncio
+import vector_search_client
+import embedding_cache
+import embedding_batcher
+import search_result_cache
 from datetime import datetime, timezone
 
 # --- Configurações ---
 PINECONE_ENDPOINT_COMMUNITY = "https://community-rooms-hqija7a.svc.aped-4627-b74a.pinecone.io"
 EMBEDDING_MODEL = "text-embedding-3-small"
-
-# Clientes globais para reutilização
-_openai_client_community = None
-_httpx_client_community = None
-_pinecone_api_key_community_loaded = None
+PINECONE_TIMEOUT_SECONDS = 10.0
 
 def _initialize_community_clients():
-    """Inicializa os clientes de forma preguiçosa (lazy)."""
-    global _openai_client_community, _httpx_client_community, _pinecone_api_key_community_loaded
-
-    if _openai_client_community and _httpx_client_community and _pinecone_api_key_community_loaded:
-        return
-
-    # OpenAI
-    if _openai_client_community is None:
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            raise ValueError("Secret 'openai-api-key' não configurado.")
-        _openai_client_community = OpenAI(api_key=openai_api_key)
-        print("CommunitySearchService: Cliente OpenAI inicializado.")
-
-    # HTTPX
-    if _httpx_client_community is None:
-        _httpx_client_community = httpx.AsyncClient(timeout=30.0)
-        print("CommunitySearchService: Cliente HTTPX inicializado.")
-    
-    # Pinecone
-    if _pinecone_api_key_community_loaded is None:
-        _pinecone_api_key_community_loaded = os.environ.get("pinecone-api-key")
-        if not _pinecone_api_key_community_loaded:
-            raise ValueError("Secret 'pinecone-api-key' não configurado.")
-        print("CommunitySearchService: Chave API do Pinecone carregada.")
+    """Retorna o cliente AsyncOpenAI compartilhado pelos serviços (um por event loop)."""
+    return openai_clients.get_async_client()
 
 async def generate_embedding_for_post_async(text_to_embed: str) -> list[float]:
-    """Gera o embedding para o conteúdo de um post."""
+    """Gera o embedding para o conteúdo de um post (ou para a query de busca), com cache."""
+    return await embedding_cache.get_or_create_embedding_async(text_to_embed, EMBEDDING_MODEL, _create_embedding_async)
+
+async def _create_embedding_async(text_to_embed: str) -> list[float]:
     _initialize_community_clients()
     try:
-        response = await asyncio.to_thread(
-            _openai_client_community.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=text_to_embed
-        )
-        return response.data[0].embedding
+        return await embedding_batcher.embed_text_async(text_to_embed, EMBEDDING_MODEL)
     except Exception as e:
         print(f"CommunitySearchService: Erro na geração de embedding: {e}")
         raise
@@ -61,77 +35,51 @@ async def upsert_post_to_pinecone_async(post_id: str, vector: list[float], metad
     """
     Insere ou atualiza (upsert) um vetor de post no índice Pinecone da comunidade.
     """
-    _initialize_community_clients()
-    
-    request_url = f"{PINECONE_ENDPOINT_COMMUNITY}/vectors/upsert"
-    headers = {
-        "Api-Key": _pinecone_api_key_community_loaded,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "vectors": [
-            {
-                "id": post_id,
-                "values": vector,
-                "metadata": metadata
-            }
-        ]
+    payload_vector = {
+        "id": post_id,
+        "values": vector,
+        "metadata": metadata
     }
     
     print(f"CommunitySearchService: Enviando upsert para Pinecone para o ID: {post_id}")
     try:
-        response = await _httpx_client_community.post(request_url, headers=headers, json=payload)
-        response.raise_for_status()
+        await vector_search_client.upsert_async(
+            PINECONE_ENDPOINT_COMMUNITY, [payload_vector], timeout=PINECONE_TIMEOUT_SECONDS
+        )
         print(f"CommunitySearchService: Upsert para o ID {post_id} bem-sucedido.")
-    except httpx.HTTPStatusError as e_http:
-        print(f"CommunitySearchService: Erro HTTP no Pinecone: {e_http.response.text}")
-        raise
+        search_result_cache.invalidate("comunidade")
     except Exception as e:
-        print(f"CommunitySearchService: Erro na consulta ao Pinecone: {e}")
+        print(f"CommunitySearchService: Erro no upsert ao Pinecone: {e}")
         raise
 
 async def query_pinecone_community_async(vector: list[float], top_k: int) -> list[dict]:
     """
     Consulta o índice 'community-rooms' do Pinecone de forma assíncrona.
     """
-    _initialize_community_clients()
-    
-    # --- INÍCIO DA CORREÇÃO ---
-    pinecone_api_key = _pinecone_api_key_community_loaded
-
-    if not pinecone_api_key:
-        raise ConnectionError("Falha na inicialização dos clientes para consulta ao Pinecone.")
-
-    request_url = f"{PINECONE_ENDPOINT_COMMUNITY}/query"
-    headers = { "Api-Key": pinecone_api_key, "Content-Type": "application/json" }
-    payload = {
-        "vector": vector,
-        "topK": top_k,
-        "includeMetadata": True,
-        "includeValues": False
-    }
-    
     print(f"CommunitySearchService: Consultando Pinecone com top_k={top_k}")
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(request_url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json().get("matches", [])
-        except Exception as e:
-            print(f"CommunitySearchService: Erro na consulta ao Pinecone: {e}")
-            raise
+    try:
+        return await vector_search_client.query_async(
+            PINECONE_ENDPOINT_COMMUNITY, vector, top_k, timeout=PINECONE_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        print(f"CommunitySearchService: Erro na consulta ao Pinecone: {e}")
+        raise
 
-async def perform_community_search_async(user_query: str, top_k: int = 20) -> list[dict]:
+async def perform_community_search_async(user_query: str, top_k: int = 20, query_vector: list[float] | None = None) -> list[dict]:
     """
-    Orquestra a busca: gera embedding e consulta o Pinecone.
+    Orquestra a busca: gera embedding (ou usa 'query_vector', se fornecido) e consulta o Pinecone.
     """
     if not user_query:
         raise ValueError("A query do usuário não pode ser vazia.")
     
     try:
-        query_vector = await generate_embedding_for_post_async(user_query)
-        search_results = await query_pinecone_community_async(query_vector, top_k)
+        async def _search_uncached() -> list[dict]:
+            vector = query_vector if query_vector is not None else await generate_embedding_for_post_async(user_query)
+            return await query_pinecone_community_async(vector, top_k)
+
+        # TTL curto: o índice muda a cada post (e é invalidado localmente em upsert/delete)
+        cache_key = search_result_cache.make_key(user_query, None, top_k)
+        search_results = await search_result_cache.get_or_compute_async("comunidade", cache_key, _search_uncached)
         
         # Formata os resultados para enviar de volta ao cliente
         formatted_results = []
@@ -157,28 +105,15 @@ async def delete_post_from_pinecone_async(post_id: str) -> None:
     """
     Deleta um vetor do índice Pinecone da comunidade pelo seu ID.
     """
-    _initialize_community_clients()
-    
-    # O endpoint para deletar é diferente do de upsert/query
-    request_url = f"{PINECONE_ENDPOINT_COMMUNITY}/vectors/delete"
-    headers = {
-        "Api-Key": _pinecone_api_key_community_loaded,
-        "Content-Type": "application/json"
-    }
-    # O payload para deleção requer uma lista de IDs
-    payload = {
-        "ids": [post_id]
-    }
-    
     print(f"CommunitySearchService: Enviando DELETE para Pinecone para o ID: {post_id}")
     try:
-        # A API de delete do Pinecone usa o método POST com um corpo específico
-        response = await _httpx_client_community.post(request_url, headers=headers, json=payload)
-        response.raise_for_status()
+        # A API de delete do Pinecone usa o método POST com a lista de IDs no corpo
+        await vector_search_client.delete_async(
+            PINECONE_ENDPOINT_COMMUNITY, [post_id], timeout=PINECONE_TIMEOUT_SECONDS
+        )
         print(f"CommunitySearchService: Delete para o ID {post_id} bem-sucedido.")
-    except httpx.HTTPStatusError as e_http:
+        search_result_cache.invalidate("comunidade")
+    except Exception as e:
         # Em caso de erro, apenas logamos. A falha em deletar do Pinecone
         # não deve impedir a exclusão do post no Firestore.
-        print(f"CommunitySearchService: Erro HTTP no delete do Pinecone: {e_http.response.text}")
-    except Exception as e:
         print(f"CommunitySearchService: Erro na chamada de delete ao Pinecone: {e}")
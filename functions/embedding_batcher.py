@@ -0,0 +1,118 @@
+# functions/embedding_batcher.py
+import os
+import asyncio
+import weakref
+import traceback
+import openai_clients
+
+# Micro-batcher de embeddings: pedidos concorrentes que chegam dentro de uma janela curta
+# (ou até BATCH_MAX_INPUTS textos) viram UMA chamada 'embeddings.create' com lista de inputs.
+# Cada chamador recebe de volta apenas o seu vetor. Isso reduz o número de requisições contra
+# os limites de taxa da OpenAI e a latência de cauda em picos de tráfego.
+
+# --- Configurações ---
+BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", "5"))
+BATCH_MAX_INPUTS = int(os.environ.get("EMBEDDING_BATCH_MAX_INPUTS", "64"))
+
+_stats = {
+    "requests": 0,        # textos pedidos pelos serviços
+    "batches_sent": 0,    # chamadas efetivas à API de embeddings
+    "inputs_sent": 0,     # textos únicos enviados (duplicatas no mesmo lote são enviadas uma vez)
+    "batch_errors": 0,
+}
+
+
+class EmbeddingBatcher:
+    """
+    Acumula textos por até 'window_seconds' (ou 'max_batch_size' textos) e os envia juntos
+    através de 'create_batch(texts) -> list[list[float]]'. Deve ser usado dentro de um único event loop.
+    """
+
+    def __init__(self, create_batch, max_batch_size: int = BATCH_MAX_INPUTS, window_seconds: float = BATCH_WINDOW_MS / 1000.0):
+        self._create_batch = create_batch
+        self._max_batch_size = max(1, max_batch_size)
+        self._window_seconds = max(0.0, window_seconds)
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # Referências fortes aos envios em andamento: o loop guarda só referências fracas às tasks,
+        # e uma task coletada no meio do envio deixaria os chamadores esperando para sempre.
+        self._send_tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        _stats["requests"] += 1
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush(loop)
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window_seconds, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        send_task = loop.create_task(self._send_batch(batch))
+        self._send_tasks.add(send_task)
+        send_task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = await self._create_batch(unique_texts)
+            if len(vectors) != len(unique_texts):
+                raise ValueError(f"A API de embeddings retornou {len(vectors)} vetores para {len(unique_texts)} textos.")
+        except Exception as e:
+            _stats["batch_errors"] += 1
+            print(f"EmbeddingBatcher: Erro ao gerar lote de {len(unique_texts)} embeddings: {e}")
+            traceback.print_exc()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        _stats["batches_sent"] += 1
+        _stats["inputs_sent"] += len(unique_texts)
+        vectors_by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors_by_text[text])
+
+
+# Um batcher por (event loop, modelo): futures e timers pertencem ao loop em que foram criados.
+_batchers_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, EmbeddingBatcher]]" = weakref.WeakKeyDictionary()
+
+
+def _get_batcher(model: str) -> EmbeddingBatcher:
+    loop = asyncio.get_running_loop()
+    batchers = _batchers_by_loop.get(loop)
+    if batchers is None:
+        batchers = {}
+        _batchers_by_loop[loop] = batchers
+
+    batcher = batchers.get(model)
+    if batcher is None:
+        async def create_batch(texts: list[str]) -> list[list[float]]:
+            response = await openai_clients.get_async_client().embeddings.create(model=model, input=texts)
+            # A API devolve um item por input; 'index' garante a ordem original.
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        batcher = EmbeddingBatcher(create_batch)
+        batchers[model] = batcher
+    return batcher
+
+
+async def embed_text_async(text: str, model: str) -> list[float]:
+    """Gera o embedding de um texto, agrupando-o com outros pedidos concorrentes do mesmo modelo."""
+    return await _get_batcher(model).embed(text)
+
+
+def get_batcher_stats() -> dict:
+    stats = dict(_stats)
+    stats["avg_batch_size"] = stats["inputs_sent"] / stats["batches_sent"] if stats["batches_sent"] else 0.0
+    return stats
@@ -0,0 +1,138 @@
+# functions/embedding_cache.py
+import os
+import hashlib
+import threading
+import unicodedata
+import asyncio
+import traceback
+from array import array
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
+
+# Cache de embeddings em duas camadas, compartilhado por todos os serviços:
+#   1. Memória do processo (LRU com TTL) - atende buscas repetidas numa instância "quente".
+#   2. Firestore (coleção EMBEDDING_CACHE_COLLECTION) - sobrevive a cold starts e é
+#      compartilhado entre instâncias.
+# A chave é o hash de (modelo + texto normalizado), então "Ansiedade " e "ansiedade"
+# reutilizam o mesmo vetor.
+
+# --- Configurações ---
+MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+MEMORY_CACHE_TTL_SECONDS = int(os.environ.get("EMBEDDING_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+PERSISTENT_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_PERSISTENT", "1") != "0"
+PERSISTENT_CACHE_TTL_DAYS = 90 # Usado no campo 'expiresAt' (configure a política de TTL do Firestore nele)
+EMBEDDING_CACHE_COLLECTION = "embeddingCache"
+
+_memory_cache = TTLCache(maxsize=MEMORY_CACHE_MAX_ENTRIES, ttl=MEMORY_CACHE_TTL_SECONDS)
+_memory_cache_lock = threading.Lock()
+_db_client = None
+
+_stats = {
+    "memory_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "persistent_errors": 0,
+}
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza o texto para a chave do cache (Unicode NFC, sem caixa e com espaços colapsados)."""
+    normalized = unicodedata.normalize("NFC", text)
+    return " ".join(normalized.casefold().split())
+
+
+def make_cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def get_cache_stats() -> dict:
+    """Retorna uma cópia dos contadores de acertos/falhas do cache."""
+    with _memory_cache_lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory_cache)
+    total = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["persistent_hits"]) / total if total else 0.0
+    return stats
+
+
+def _get_db():
+    global _db_client
+    if _db_client is None:
+        from firebase_admin import firestore
+        _db_client = firestore.client()
+    return _db_client
+
+
+def _read_persistent(cache_key: str) -> list[float] | None:
+    doc = _get_db().collection(EMBEDDING_CACHE_COLLECTION).document(cache_key).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    expires_at = data.get("expiresAt")
+    if expires_at and expires_at < datetime.now(timezone.utc):
+        return None
+    packed = data.get("vector")
+    if not packed:
+        return None
+    vector = array("f")
+    vector.frombytes(bytes(packed))
+    return vector.tolist()
+
+
+def _write_persistent(cache_key: str, model: str, vector: list[float]) -> None:
+    try:
+        _get_db().collection(EMBEDDING_CACHE_COLLECTION).document(cache_key).set({
+            "model": model,
+            "dimensions": len(vector),
+            # float32 empacotado: ~6 KB por vetor de 1536 dimensões, bem abaixo do limite do documento
+            "vector": array("f", vector).tobytes(),
+            "createdAt": datetime.now(timezone.utc),
+            "expiresAt": datetime.now(timezone.utc) + timedelta(days=PERSISTENT_CACHE_TTL_DAYS),
+        })
+    except Exception as e:
+        with _memory_cache_lock:
+            _stats["persistent_errors"] += 1
+        print(f"EmbeddingCache: AVISO - falha ao gravar embedding no Firestore: {e}")
+
+
+async def get_or_create_embedding_async(text: str, model: str, create_embedding) -> list[float]:
+    """
+    Retorna o embedding de 'text' a partir do cache; em caso de falha nas duas camadas,
+    chama 'create_embedding(text)' (corrotina) e armazena o resultado.
+    """
+    cache_key = make_cache_key(model, text)
+
+    with _memory_cache_lock:
+        cached_vector = _memory_cache.get(cache_key)
+        if cached_vector is not None:
+            _stats["memory_hits"] += 1
+            return cached_vector
+
+    if PERSISTENT_CACHE_ENABLED:
+        try:
+            persisted_vector = await asyncio.to_thread(_read_persistent, cache_key)
+        except Exception as e:
+            with _memory_cache_lock:
+                _stats["persistent_errors"] += 1
+            print(f"EmbeddingCache: AVISO - falha ao ler embedding do Firestore: {e}")
+            persisted_vector = None
+        if persisted_vector is not None:
+            with _memory_cache_lock:
+                _stats["persistent_hits"] += 1
+                _memory_cache[cache_key] = persisted_vector
+            return persisted_vector
+
+    with _memory_cache_lock:
+        _stats["misses"] += 1
+
+    vector = await create_embedding(text)
+
+    with _memory_cache_lock:
+        _memory_cache[cache_key] = vector
+    if PERSISTENT_CACHE_ENABLED:
+        # A gravação roda no pool de threads sem bloquear a resposta ao usuário.
+        try:
+            asyncio.get_running_loop().run_in_executor(None, _write_persistent, cache_key, model, vector)
+        except Exception:
+            traceback.print_exc()
+    return vector
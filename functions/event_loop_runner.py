@@ -0,0 +1,82 @@
+# functions/event_loop_runner.py
+import asyncio
+import threading
+import traceback
+import concurrent.futures
+
+# Event loop persistente por instância. Os handlers síncronos (https_fn.on_call, gatilhos)
+# enviam suas corrotinas para um único loop que roda numa thread dedicada, via
+# asyncio.run_coroutine_threadsafe. Assim:
+#   - clientes assíncronos com pool (httpx/AsyncOpenAI) ficam presos a um loop que nunca muda
+#     e suas conexões sobrevivem entre invocações;
+#   - requisições concorrentes na mesma instância intercalam seu I/O no mesmo loop.
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: threading.Thread | None = None
+_loop_lock = threading.Lock()
+
+
+def _run_loop_forever(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+    asyncio.set_event_loop(loop)
+    loop.call_soon(ready.set)
+    try:
+        loop.run_forever()
+    finally:
+        print("EventLoopRunner: Loop em segundo plano foi encerrado.")
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Retorna o loop de segundo plano, iniciando a thread na primeira chamada (ou se ela tiver morrido)."""
+    global _loop, _loop_thread
+    if _loop is not None and _loop_thread is not None and _loop_thread.is_alive():
+        return _loop
+
+    with _loop_lock:
+        if _loop is None or _loop_thread is None or not _loop_thread.is_alive():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=_run_loop_forever,
+                args=(loop, ready),
+                name="background-event-loop",
+                daemon=True,
+            )
+            thread.start()
+            ready.wait()
+            _loop, _loop_thread = loop, thread
+            print("EventLoopRunner: Loop em segundo plano iniciado.")
+    return _loop
+
+
+def run_coroutine_sync(coro, timeout: float | None = None):
+    """
+    Executa a corrotina no loop de segundo plano e bloqueia a thread chamadora até o resultado.
+    Exceções da corrotina (inclusive https_fn.HttpsError) são relançadas na thread chamadora.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_coroutine_sync não pode ser chamado de dentro do próprio loop de segundo plano.")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def submit_background(coro) -> concurrent.futures.Future:
+    """Agenda a corrotina no loop de segundo plano sem esperar o resultado (erros são apenas logados)."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+    def _log_failure(done_future: concurrent.futures.Future) -> None:
+        if done_future.cancelled():
+            return
+        error = done_future.exception()
+        if error is not None:
+            print(f"EventLoopRunner: Tarefa em segundo plano falhou: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    future.add_done_callback(_log_failure)
+    return future
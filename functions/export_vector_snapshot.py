@@ -0,0 +1,120 @@
+# functions/export_vector_snapshot.py
+"""
+Exporta um índice do Pinecone para um snapshot local (usado por local_vector_index.py).
+
+Uso (a partir de functions/, com o secret exportado como variável de ambiente):
+    pinecone-api-key=... python export_vector_snapshot.py livros
+    pinecone-api-key=... python export_vector_snapshot.py frases --output-dir vector_snapshots
+
+Depois, faça o deploy com VECTOR_BACKEND_LIVROS=local / VECTOR_BACKEND_QUOTES=local.
+O índice da comunidade não é exportado: ele muda a cada post e continua no Pinecone.
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import httpx
+import local_vector_index
+
+# Índices exportáveis: nome do snapshot -> host do índice no Pinecone
+SNAPSHOT_ENDPOINTS = {
+    "livros": "https://livros-hqija7a.svc.aped-4627-b74a.pinecone.io",
+    "frases": "https://septima-quotes-hqija7a.svc.aped-4627-b74a.pinecone.io",
+}
+LIST_PAGE_SIZE = 100
+FETCH_BATCH_SIZE = 100
+
+
+def _list_all_ids(client: httpx.Client, namespace: str) -> list[str]:
+    vector_ids = []
+    pagination_token = None
+    while True:
+        params = {"limit": LIST_PAGE_SIZE, "namespace": namespace}
+        if pagination_token:
+            params["paginationToken"] = pagination_token
+        response = client.get("/vectors/list", params=params)
+        response.raise_for_status()
+        page = response.json()
+        vector_ids.extend(item["id"] for item in page.get("vectors", []))
+        pagination_token = (page.get("pagination") or {}).get("next")
+        if not pagination_token:
+            return vector_ids
+
+
+def _fetch_vectors(client: httpx.Client, vector_ids: list[str], namespace: str) -> dict:
+    fetched = {}
+    for start in range(0, len(vector_ids), FETCH_BATCH_SIZE):
+        batch_ids = vector_ids[start:start + FETCH_BATCH_SIZE]
+        response = client.get("/vectors/fetch", params={"ids": batch_ids, "namespace": namespace})
+        response.raise_for_status()
+        fetched.update(response.json().get("vectors", {}))
+        print(f"  {min(start + FETCH_BATCH_SIZE, len(vector_ids))}/{len(vector_ids)} vetores baixados...")
+    return fetched
+
+
+def write_snapshot(name: str, ids: list[str], vectors: np.ndarray, metadata: list[dict], output_dir: str, metric: str = "cosine") -> None:
+    """Grava a matriz (.npy) e os metadados (.json) de forma atômica (arquivos temporários + rename)."""
+    os.makedirs(output_dir, exist_ok=True)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if metric == "cosine":
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+    vectors_path, metadata_path = local_vector_index.snapshot_paths(name, output_dir)
+    with open(vectors_path + ".tmp", "wb") as f:
+        np.save(f, vectors)
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"metric": metric, "dimension": int(vectors.shape[1]), "ids": ids, "metadata": metadata}, f, ensure_ascii=False)
+    os.replace(vectors_path + ".tmp", vectors_path)
+    os.replace(metadata_path + ".tmp", metadata_path)
+
+
+def export_snapshot(name: str, endpoint: str, output_dir: str, namespace: str = "", metric: str = "cosine") -> int:
+    api_key = os.environ.get("pinecone-api-key") or os.environ.get("PINECONE_API_KEY")
+    if not api_key:
+        raise ValueError("Defina a variável de ambiente 'pinecone-api-key' (ou PINECONE_API_KEY).")
+
+    with httpx.Client(base_url=endpoint, headers={"Api-Key": api_key, "Accept": "application/json"}, timeout=60.0) as client:
+        print(f"Listando IDs do índice '{name}' ({endpoint})...")
+        vector_ids = _list_all_ids(client, namespace)
+        print(f"{len(vector_ids)} IDs encontrados. Baixando vetores...")
+        fetched = _fetch_vectors(client, vector_ids, namespace)
+
+    ids, rows, metadata = [], [], []
+    for vector_id in vector_ids:
+        vector_data = fetched.get(vector_id)
+        if not vector_data or not vector_data.get("values"):
+            print(f"AVISO: Vetor '{vector_id}' não retornado pelo fetch, ignorando.")
+            continue
+        ids.append(vector_id)
+        rows.append(vector_data["values"])
+        metadata.append(vector_data.get("metadata") or {})
+
+    if not rows:
+        raise ValueError(f"Nenhum vetor exportado do índice '{name}'.")
+
+    write_snapshot(name, ids, np.asarray(rows, dtype=np.float32), metadata, output_dir, metric)
+    print(f"Snapshot '{name}' gravado em {output_dir} ({len(ids)} vetores).")
+    return len(ids)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Exporta um índice do Pinecone para um snapshot local.")
+    parser.add_argument("name", choices=sorted(SNAPSHOT_ENDPOINTS), help="Nome do snapshot/índice.")
+    parser.add_argument("--endpoint", help="Host do índice (padrão: o configurado para o nome).")
+    parser.add_argument("--output-dir", default=local_vector_index.SNAPSHOT_DIR)
+    parser.add_argument("--namespace", default="")
+    parser.add_argument("--metric", choices=["cosine", "dotproduct"], default="cosine")
+    args = parser.parse_args(argv)
+
+    try:
+        export_snapshot(args.name, args.endpoint or SNAPSHOT_ENDPOINTS[args.name], args.output_dir, args.namespace, args.metric)
+    except Exception as e:
+        print(f"ERRO: Falha ao exportar o snapshot '{args.name}': {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
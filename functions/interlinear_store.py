@@ -0,0 +1,326 @@
+# functions/interlinear_store.py
+import os
+import json
+import shutil
+import threading
+import numpy as np
+
+# Interlinear (grego do NT e hebraico do AT) em formato colunar. Os JSONs de
+# assets/Biblia/completa_traducoes/{greek,hebrew}_original guardam cada palavra como um objeto
+# {text, strong, morph} — ~48 MB de JSON que precisariam ser parseados a cada capítulo. Aqui cada
+# campo vira um array NumPy (uma posição por palavra, na ordem canônica), aberto com mmap:
+#
+#   strong.npy         uint16  número de Strong sem o prefixo G/H (0 = sem número)
+#   strong_extra.npy   uint16  segundo número das palavras compostas ("G2532 G1437"; 0 = nenhum)
+#   morph.npy          uint16  id em morph_table (id 0 = sem morfologia)
+#   text.npy           uint32  id na tabela de palavras (text_offsets.npy + text_blob.bin, UTF-8)
+#   verse_offsets.npy  uint32  primeira palavra de cada versículo (+ sentinela no fim)
+#   verse_refs.npy     uint16  (índice do livro em book_order, capítulo, versículo) de cada versículo
+#   concordance_indptr.npy / concordance_verses.npy (uint32)
+#                              concordância em formato CSR: os versículos (ordenados, sem repetição)
+#                              do Strong n são concordance_verses[indptr[n]:indptr[n + 1]]
+#   meta.json                  idioma, prefixo do Strong, book_order, morph_table e
+#                              translation_verse_counts (capítulos renumerados por VERSE_GAPS)
+#
+# Uma busca por capítulo vira fatias desses arrays, e varreduras (morfologia) rodam como operações
+# vetorizadas sobre as colunas.
+
+INTERLINEAR_DIR_NAME = "interlinear"
+LANGUAGES = {
+    "greek": {"source": "greek_original", "strong_prefix": "G"},
+    "hebrew": {"source": "hebrew_original", "strong_prefix": "H"},
+}
+SOURCE_TO_LANGUAGE = {config["source"]: language for language, config in LANGUAGES.items()}
+FORMAT_VERSION = 2
+_CHAPTER_KEY_BASE = 1000  # Maior que o número de capítulos de qualquer livro
+
+# Versículos da numeração das traduções (todas as de completa_traducoes concordam) que o texto grego
+# não traz: omissões da crítica textual (ex: Jo 5:4) e versículos fundidos ao anterior (At 19:41,
+# 2Co 13:13). Sem o mapa, todo versículo depois da lacuna receberia o número do anterior. Capítulos
+# do hebraico com outra versificação (títulos dos Salmos, Joel, Malaquias...) não são renumerados:
+# quem junta o original a uma tradução deve antes comparar translation_verse_count com o número de
+# versículos do capítulo nela (ver bible_data.get_interlinear_verse_text).
+VERSE_GAPS = {
+    "greek": {
+        ("mt", 17): (21,), ("mt", 18): (11,), ("mt", 23): (14,),
+        ("mc", 7): (16,), ("mc", 9): (44, 46), ("mc", 11): (26,), ("mc", 15): (28,),
+        ("lc", 17): (36,), ("lc", 23): (17,), ("jo", 5): (4,),
+        ("at", 8): (37,), ("at", 15): (34,), ("at", 19): (41,), ("at", 24): (7,), ("at", 28): (29,),
+        ("rm", 16): (25, 26, 27), ("2co", 13): (13,),
+    },
+}
+
+
+def chapter_verse_numbers(language: str, book_abbrev: str, chapter: int, verse_count: int) -> list[int]:
+    """Números, na versificação das traduções, dos verse_count versículos do capítulo no original (pula VERSE_GAPS)."""
+    gaps = VERSE_GAPS.get(language, {}).get((book_abbrev, int(chapter)), ())
+    return [number for number in range(1, verse_count + len(gaps) + 1) if number not in gaps][:verse_count]
+
+
+def _parse_strong_numbers(value, strong_prefix: str) -> tuple[int, int]:
+    """'G26' -> (26, 0); 'G2532 G1437' -> (2532, 1437); '', 'N/A' ou ausente -> (0, 0)."""
+    numbers = []
+    for part in str(value or "").split():
+        part = part.strip().upper().split("/")[-1]
+        if part.startswith(strong_prefix) and part[1:].isdigit():
+            numbers.append(int(part[1:]))
+    numbers += [0, 0]
+    return numbers[0], numbers[1]
+
+
+def build_concordance(strongs: np.ndarray, strong_extras: np.ndarray, verse_offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Índice invertido Strong -> versículos (CSR): retorna (indptr, versículos)."""
+    word_verses = np.repeat(np.arange(len(verse_offsets) - 1, dtype=np.int64), np.diff(verse_offsets.astype(np.int64)))
+    has_extra = strong_extras > 0
+    numbers = np.concatenate([strongs, strong_extras[has_extra]]).astype(np.int64)
+    verses = np.concatenate([word_verses, word_verses[has_extra]])
+    keep = numbers > 0
+    keys = np.unique((numbers[keep] << 32) | verses[keep])  # ordena por (strong, versículo) e remove repetições
+    key_numbers = keys >> 32
+    indptr = np.zeros(int(key_numbers.max(initial=0)) + 2, dtype=np.uint32)
+    indptr[1:] = np.cumsum(np.bincount(key_numbers, minlength=len(indptr) - 1))
+    return indptr, (keys & 0xFFFFFFFF).astype(np.uint32)
+
+
+def build_interlinear(source_dir: str, output_dir: str, language: str) -> dict:
+    """
+    Compila <source_dir>/<idioma>_original/<livro>/<capítulo>.json (source_dir = .../completa_traducoes)
+    em <output_dir>/<idioma>/. Retorna o meta.json gravado.
+    """
+    config = LANGUAGES[language]
+    language_dir = os.path.join(source_dir, config["source"])
+    with open(os.path.join(source_dir, "abbrev_map.json"), "r", encoding="utf-8") as f:
+        all_books = list(json.load(f).keys())
+    book_order = [book for book in all_books if os.path.isdir(os.path.join(language_dir, book))]
+
+    strongs, strong_extras, morph_ids, text_ids = [], [], [], []
+    verse_offsets, verse_refs = [0], []
+    morph_table, morph_index = [""], {"": 0}
+    text_table, text_index = [], {}
+    translation_verse_counts = {}
+
+    for book_index, book_abbrev in enumerate(book_order):
+        book_dir = os.path.join(language_dir, book_abbrev)
+        chapter_numbers = sorted(int(name[:-5]) for name in os.listdir(book_dir) if name.endswith(".json"))
+        for chapter in chapter_numbers:
+            with open(os.path.join(book_dir, f"{chapter}.json"), "r", encoding="utf-8") as f:
+                chapter_verses = json.load(f)
+            gaps = VERSE_GAPS.get(language, {}).get((book_abbrev, chapter), ())
+            if gaps:
+                translation_verse_counts[f"{book_abbrev} {chapter}"] = len(chapter_verses) + len(gaps)
+            verse_numbers = chapter_verse_numbers(language, book_abbrev, chapter, len(chapter_verses))
+            for verse_number, verse in zip(verse_numbers, chapter_verses):
+                for word in verse:
+                    if not isinstance(word, dict):
+                        continue
+                    strong, strong_extra = _parse_strong_numbers(word.get("strong"), config["strong_prefix"])
+                    morph = word.get("morph") or ""
+                    if morph not in morph_index:
+                        morph_index[morph] = len(morph_table)
+                        morph_table.append(morph)
+                    text = word.get("text") or ""
+                    if text not in text_index:
+                        text_index[text] = len(text_table)
+                        text_table.append(text)
+                    strongs.append(strong)
+                    strong_extras.append(strong_extra)
+                    morph_ids.append(morph_index[morph])
+                    text_ids.append(text_index[text])
+                verse_offsets.append(len(strongs))
+                verse_refs.append((book_index, chapter, verse_number))
+
+    encoded_texts = [text.encode("utf-8") for text in text_table]
+    text_offsets = np.zeros(len(encoded_texts) + 1, dtype=np.uint32)
+    text_offsets[1:] = np.cumsum([len(encoded) for encoded in encoded_texts], dtype=np.uint64)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "language": language,
+        "strong_prefix": config["strong_prefix"],
+        "book_order": book_order,
+        "word_count": len(strongs),
+        "verse_count": len(verse_refs),
+        "morph_table": morph_table,
+        "translation_verse_counts": translation_verse_counts,
+    }
+
+    final_dir = os.path.join(output_dir, language)
+    temp_dir = final_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    np.save(os.path.join(temp_dir, "strong.npy"), np.asarray(strongs, dtype=np.uint16))
+    np.save(os.path.join(temp_dir, "strong_extra.npy"), np.asarray(strong_extras, dtype=np.uint16))
+    np.save(os.path.join(temp_dir, "morph.npy"), np.asarray(morph_ids, dtype=np.uint16))
+    np.save(os.path.join(temp_dir, "text.npy"), np.asarray(text_ids, dtype=np.uint32))
+    np.save(os.path.join(temp_dir, "verse_offsets.npy"), np.asarray(verse_offsets, dtype=np.uint32))
+    np.save(os.path.join(temp_dir, "verse_refs.npy"), np.asarray(verse_refs, dtype=np.uint16).reshape(-1, 3))
+    np.save(os.path.join(temp_dir, "text_offsets.npy"), text_offsets)
+    concordance_indptr, concordance_verses = build_concordance(
+        np.asarray(strongs, dtype=np.uint16), np.asarray(strong_extras, dtype=np.uint16), np.asarray(verse_offsets, dtype=np.uint32)
+    )
+    np.save(os.path.join(temp_dir, "concordance_indptr.npy"), concordance_indptr)
+    np.save(os.path.join(temp_dir, "concordance_verses.npy"), concordance_verses)
+    with open(os.path.join(temp_dir, "text_blob.bin"), "wb") as f:
+        f.write(b"".join(encoded_texts))
+    with open(os.path.join(temp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(temp_dir, final_dir)
+    print(f"InterlinearStore: '{language}' compilado ({len(strongs)} palavras, {len(verse_refs)} versículos, {len(morph_table)} morfologias).")
+    return meta
+
+
+class InterlinearStore:
+    """Leitor do interlinear colunar de um idioma (somente leitura, seguro para uso entre threads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.language = self.meta["language"]
+        self.strong_prefix = self.meta["strong_prefix"]
+        self.book_order = self.meta["book_order"]
+        self.morph_table = self.meta["morph_table"]
+        self._translation_verse_counts = self.meta.get("translation_verse_counts", {})
+
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.strong = load("strong")
+        self.strong_extra = load("strong_extra")
+        self.morph = load("morph")
+        self.text = load("text")
+        self.verse_offsets = load("verse_offsets")
+        self.verse_refs = load("verse_refs")
+        self._text_offsets = load("text_offsets")
+        self.concordance_indptr = load("concordance_indptr")
+        self.concordance_verses = load("concordance_verses")
+        self._occurrence_counts = None
+        with open(os.path.join(path, "text_blob.bin"), "rb") as f:
+            self._text_blob = f.read()
+
+        # (livro, capítulo) -> (primeiro versículo, versículo seguinte ao último), em índices de verse_refs
+        self._book_index = {book_abbrev: index for index, book_abbrev in enumerate(self.book_order)}
+        self._chapter_bounds: dict[tuple[str, int], tuple[int, int]] = {}
+        refs = np.asarray(self.verse_refs[:, :2], dtype=np.int64)
+        # (livro, capítulo) de cada versículo como uma chave ordenada, para buscas binárias por intervalo
+        self._chapter_keys = keys = refs[:, 0] * _CHAPTER_KEY_BASE + refs[:, 1]
+        if len(refs):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            ends = np.r_[starts[1:], len(keys)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                book_index, chapter = int(refs[start, 0]), int(refs[start, 1])
+                self._chapter_bounds[(self.book_order[book_index], chapter)] = (start, end)
+
+    @property
+    def word_count(self) -> int:
+        return int(self.meta["word_count"])
+
+    @property
+    def verse_count(self) -> int:
+        return int(self.meta["verse_count"])
+
+    def book_index(self, book_abbrev: str) -> int | None:
+        return self._book_index.get(book_abbrev)
+
+    def chapter_verse_bounds(self, book_abbrev: str, chapter: int) -> tuple[int, int] | None:
+        """Intervalo [início, fim) dos versículos do capítulo, em índices de verse_refs."""
+        return self._chapter_bounds.get((book_abbrev, int(chapter)))
+
+    def chapters_verse_bounds(self, book_abbrev: str, first_chapter: int, last_chapter: int | None = None) -> tuple[int, int]:
+        """
+        Intervalo [início, fim) dos versículos dos capítulos first_chapter..last_chapter do livro
+        (last_chapter None = até o fim do livro), em índices de verse_refs. Vazio se nenhum existir.
+        """
+        book_index = self._book_index.get(book_abbrev)
+        if book_index is None:
+            return 0, 0
+        # Limitados à faixa de capítulos da chave, para não invadir o livro seguinte
+        first_chapter = min(max(int(first_chapter), 0), _CHAPTER_KEY_BASE)
+        last_chapter = _CHAPTER_KEY_BASE - 1 if last_chapter is None else min(max(int(last_chapter), 0), _CHAPTER_KEY_BASE - 1)
+        start = int(np.searchsorted(self._chapter_keys, book_index * _CHAPTER_KEY_BASE + first_chapter, side="left"))
+        end = int(np.searchsorted(self._chapter_keys, book_index * _CHAPTER_KEY_BASE + last_chapter, side="right"))
+        return start, max(start, end)
+
+    def translation_verse_count(self, book_abbrev: str, chapter: int) -> int | None:
+        """Versículos que o capítulo tem na numeração das traduções (None se não estiver no interlinear)."""
+        count = self._translation_verse_counts.get(f"{book_abbrev} {int(chapter)}")
+        if count is not None:
+            return count
+        bounds = self.chapter_verse_bounds(book_abbrev, chapter)
+        return None if bounds is None else bounds[1] - bounds[0]
+
+    def verse_ref(self, verse_index: int) -> tuple[str, int, int]:
+        book_index, chapter, verse = (int(value) for value in self.verse_refs[verse_index])
+        return self.book_order[book_index], chapter, verse
+
+    def word_texts(self, text_ids) -> list[str]:
+        text_ids = np.asarray(text_ids, dtype=np.int64)
+        starts = self._text_offsets[text_ids].tolist()
+        ends = self._text_offsets[text_ids + 1].tolist()
+        blob = self._text_blob
+        return [blob[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+
+    def format_strong(self, number: int) -> str:
+        return f"{self.strong_prefix}{int(number)}" if number else ""
+
+    def verses_with_strong(self, number: int) -> np.ndarray:
+        """Índices (ordenados) dos versículos em que o Strong aparece."""
+        if not 0 < number < len(self.concordance_indptr) - 1:
+            return np.empty(0, dtype=np.uint32)
+        return self.concordance_verses[self.concordance_indptr[number]:self.concordance_indptr[number + 1]]
+
+    def word_occurrence_count(self, number: int) -> int:
+        """Total de palavras com o Strong (um versículo pode ter várias ocorrências)."""
+        if self._occurrence_counts is None:
+            # Calculado uma vez por instância (corrida entre threads só repete o mesmo bincount)
+            self._occurrence_counts = np.bincount(self.strong, minlength=len(self.concordance_indptr)) + np.bincount(self.strong_extra, minlength=len(self.concordance_indptr))
+            self._occurrence_counts[0] = 0
+        return int(self._occurrence_counts[number]) if 0 <= number < len(self._occurrence_counts) else 0
+
+    def words_with_strong_in_verse(self, verse_index: int, number: int) -> list[str]:
+        start, end = int(self.verse_offsets[verse_index]), int(self.verse_offsets[verse_index + 1])
+        matches = (self.strong[start:end] == number) | (self.strong_extra[start:end] == number)
+        return self.word_texts(self.text[start:end][matches])
+
+    def words_for_verses(self, first_verse_index: int, end_verse_index: int) -> tuple[tuple[tuple[str, str, str], ...], ...]:
+        """(texto, strong, morfologia) de cada palavra, agrupadas por versículo, no formato do JSON original."""
+        word_bounds = self.verse_offsets[first_verse_index:end_verse_index + 1].tolist()
+        if not word_bounds:
+            return ()
+        first_word, end_word = word_bounds[0], word_bounds[-1]
+        words = [
+            (text, " ".join(self.format_strong(number) for number in (strong, strong_extra) if number), self.morph_table[morph_id])
+            for text, strong, strong_extra, morph_id in zip(
+                self.word_texts(self.text[first_word:end_word]),
+                self.strong[first_word:end_word].tolist(),
+                self.strong_extra[first_word:end_word].tolist(),
+                self.morph[first_word:end_word].tolist(),
+            )
+        ]
+        return tuple(
+            tuple(words[start - first_word:end - first_word]) for start, end in zip(word_bounds[:-1], word_bounds[1:])
+        )
+
+    def get_chapter(self, book_abbrev: str, chapter: int) -> dict[int, tuple[tuple[str, str, str], ...]] | None:
+        """Palavras do capítulo por número de versículo (o de verse_refs, já renumerado por VERSE_GAPS)."""
+        bounds = self.chapter_verse_bounds(book_abbrev, chapter)
+        if bounds is None:
+            return None
+        verse_numbers = np.asarray(self.verse_refs[bounds[0]:bounds[1], 2], dtype=np.int64).tolist()
+        return dict(zip(verse_numbers, self.words_for_verses(*bounds)))
+
+
+_store_by_path: dict[str, InterlinearStore] = {}
+_store_lock = threading.Lock()
+
+
+def open_store(path: str) -> InterlinearStore:
+    """Abre (uma vez por instância) o interlinear colunar do diretório informado."""
+    store = _store_by_path.get(path)
+    if store is None:
+        with _store_lock:
+            store = _store_by_path.get(path)
+            if store is None:
+                store = InterlinearStore(path)
+                _store_by_path[path] = store
+                print(f"InterlinearStore: '{store.language}' carregado de {path} ({store.word_count} palavras).")
+    return store
@@ -0,0 +1,222 @@
+# functions/justification_cache.py
+import os
+import hashlib
+import threading
+import asyncio
+import traceback
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from cachetools import TTLCache
+from embedding_cache import normalize_text
+
+# Cache das justificativas de recomendação de livros (book_search_service), indexado por
+# (cluster da query, livro). Necessidades quase idênticas ("ansiedade", "estou ansioso") caem no
+# mesmo cluster e reaproveitam as justificativas já geradas, sem nenhuma chamada ao chat.
+#
+# Clusters: atribuição ao centróide mais próximo, feita online sobre os embeddings das queries
+# (os mesmos do embedding_cache). O centróide é o vetor da primeira query do cluster (líder) e não
+# se desloca. Sem cluster próximo o bastante, a query vira um novo líder (com MAX_CLUSTERS, substitui
+# o cluster usado há mais tempo). O id do cluster é o hash do texto normalizado do líder: instâncias
+# diferentes que virem a mesma query líder compartilham as entradas do Firestore.
+#
+# Uma justificativa guardada é servida a todos os membros do cluster, não só a quem a pediu. Quem
+# erra o cache sempre recebe uma justificativa gerada para a própria query, mas só a do líder é
+# guardada (assign_cluster diz se a query é a líder): cada membro está a no máximo
+# CLUSTER_SIMILARITY_THRESHOLD do líder, enquanto dois membros podem estar mais longe entre si. O
+# prompt (book_search_service) também deixa de fora os detalhes pessoais do relato.
+#
+# O limiar não foi calibrado com pares rotulados de queries reais; por isso é conservador (só
+# paráfrases próximas compartilham justificativas). Para calibrá-lo, get_stats traz o histograma
+# da similaridade com o cluster mais próximo em cada atribuição (faixas de 0.05).
+#
+# Camadas: memória do processo (TTL) e Firestore (JUSTIFICATION_CACHE_COLLECTION, com 'expiresAt';
+# configure a política de TTL do Firestore nesse campo). CACHE_VERSION entra no id do cluster:
+# incrementá-lo (ex: mudança no prompt) invalida todas as justificativas.
+
+CACHE_VERSION = 2
+CLUSTER_SIMILARITY_THRESHOLD = float(os.environ.get("JUSTIFICATION_CLUSTER_THRESHOLD", "0.90"))
+MAX_CLUSTERS = int(os.environ.get("JUSTIFICATION_MAX_CLUSTERS", "2048"))
+MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("JUSTIFICATION_CACHE_MAX_ENTRIES", "8192"))
+MEMORY_CACHE_TTL_SECONDS = int(os.environ.get("JUSTIFICATION_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+PERSISTENT_CACHE_ENABLED = os.environ.get("JUSTIFICATION_CACHE_PERSISTENT", "1") != "0"
+PERSISTENT_CACHE_TTL_DAYS = 30
+STATS_LOG_INTERVAL = int(os.environ.get("JUSTIFICATION_CACHE_STATS_LOG_INTERVAL", "100"))  # Consultas (get_many) entre logs
+JUSTIFICATION_CACHE_COLLECTION = "bookJustificationCache"
+
+_memory_cache = TTLCache(maxsize=MEMORY_CACHE_MAX_ENTRIES, ttl=MEMORY_CACHE_TTL_SECONDS)
+_lock = threading.Lock()
+_db_client = None
+
+# Centróides (float32, normalizados), ids dos clusters e último uso de cada linha
+_centroids: np.ndarray | None = None
+_cluster_ids: list[str] = []
+_cluster_last_used = np.zeros(MAX_CLUSTERS, dtype=np.int64)
+_assignment_clock = 0
+
+SIMILARITY_HISTOGRAM_BUCKETS = 20
+_nearest_similarity_counts = np.zeros(SIMILARITY_HISTOGRAM_BUCKETS, dtype=np.int64)
+
+_stats = {
+    "lookups": 0,
+    "memory_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "persistent_errors": 0,
+    "cluster_matches": 0,
+    "clusters_created": 0,
+}
+
+
+def _get_db():
+    global _db_client
+    if _db_client is None:
+        from firebase_admin import firestore
+        _db_client = firestore.client()
+    return _db_client
+
+
+def _make_cluster_id(user_query: str) -> str:
+    return hashlib.sha256(f"v{CACHE_VERSION}\n{normalize_text(user_query)}".encode("utf-8")).hexdigest()[:24]
+
+
+def _document_id(cluster_id: str, book_id: str) -> str:
+    return f"{cluster_id}_{book_id.replace('/', '_')}"
+
+
+def assign_cluster(user_query: str, query_vector: list[float]) -> tuple[str, bool] | None:
+    """
+    (id, a query é a líder) do cluster mais próximo da query, criando um novo se nenhum for similar
+    o bastante. Só a query líder deve gravar justificativas no cluster (put_many).
+    """
+    global _centroids, _assignment_clock
+    vector = np.asarray(query_vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return None
+    vector = vector / norm
+
+    with _lock:
+        if _centroids is None:
+            _centroids = np.zeros((MAX_CLUSTERS, len(vector)), dtype=np.float32)
+        if len(vector) != _centroids.shape[1]:
+            return None  # Embedding de outro modelo/dimensão: sem cache
+        _assignment_clock += 1
+        cluster_count = len(_cluster_ids)
+        if cluster_count:
+            similarities = _centroids[:cluster_count] @ vector
+            best = int(np.argmax(similarities))
+            bucket = int(np.clip(similarities[best], 0.0, 1.0) * SIMILARITY_HISTOGRAM_BUCKETS)
+            _nearest_similarity_counts[min(bucket, SIMILARITY_HISTOGRAM_BUCKETS - 1)] += 1
+            if similarities[best] >= CLUSTER_SIMILARITY_THRESHOLD:
+                _cluster_last_used[best] = _assignment_clock
+                _stats["cluster_matches"] += 1
+                # A própria líder (mesmo texto normalizado) volta a ser líder, ex: em outra instância
+                return _cluster_ids[best], _cluster_ids[best] == _make_cluster_id(user_query)
+
+        cluster_id = _make_cluster_id(user_query)
+        if cluster_count < MAX_CLUSTERS:
+            row = cluster_count
+            _cluster_ids.append(cluster_id)
+        else:
+            row = int(np.argmin(_cluster_last_used))
+            _cluster_ids[row] = cluster_id
+        _centroids[row] = vector
+        _cluster_last_used[row] = _assignment_clock
+        _stats["clusters_created"] += 1
+        return cluster_id, True
+
+
+def _read_persistent(cluster_id: str, book_ids: list[str]) -> dict[str, str]:
+    db = _get_db()
+    refs = [db.collection(JUSTIFICATION_CACHE_COLLECTION).document(_document_id(cluster_id, book_id)) for book_id in book_ids]
+    ref_to_book = {ref.id: book_id for ref, book_id in zip(refs, book_ids)}
+    found = {}
+    now = datetime.now(timezone.utc)
+    for doc in db.get_all(refs):
+        if not doc.exists:
+            continue
+        data = doc.to_dict() or {}
+        expires_at = data.get("expiresAt")
+        if data.get("justification") and not (expires_at and expires_at < now):
+            found[ref_to_book[doc.id]] = data["justification"]
+    return found
+
+
+def _write_persistent(cluster_id: str, justifications: dict[str, str]) -> None:
+    try:
+        db = _get_db()
+        now = datetime.now(timezone.utc)
+        batch = db.batch()
+        for book_id, justification in justifications.items():
+            batch.set(db.collection(JUSTIFICATION_CACHE_COLLECTION).document(_document_id(cluster_id, book_id)), {
+                "clusterId": cluster_id,
+                "bookId": book_id,
+                "justification": justification,
+                "createdAt": now,
+                "expiresAt": now + timedelta(days=PERSISTENT_CACHE_TTL_DAYS),
+            })
+        batch.commit()
+    except Exception as e:
+        with _lock:
+            _stats["persistent_errors"] += 1
+        print(f"JustificationCache: AVISO - falha ao gravar justificativas no Firestore: {e}")
+
+
+async def get_many(cluster_id: str, book_ids: list[str]) -> dict[str, str]:
+    """Justificativas já conhecidas para os livros no cluster ({book_id: justificativa})."""
+    found = {}
+    with _lock:
+        for book_id in book_ids:
+            justification = _memory_cache.get((cluster_id, book_id))
+            if justification is not None:
+                found[book_id] = justification
+        _stats["memory_hits"] += len(found)
+
+    missing = [book_id for book_id in book_ids if book_id not in found]
+    if missing and PERSISTENT_CACHE_ENABLED:
+        try:
+            persisted = await asyncio.to_thread(_read_persistent, cluster_id, missing)
+        except Exception as e:
+            with _lock:
+                _stats["persistent_errors"] += 1
+            print(f"JustificationCache: AVISO - falha ao ler justificativas do Firestore: {e}")
+            persisted = {}
+        with _lock:
+            for book_id, justification in persisted.items():
+                _memory_cache[(cluster_id, book_id)] = justification
+            _stats["persistent_hits"] += len(persisted)
+        found.update(persisted)
+
+    with _lock:
+        _stats["misses"] += len(book_ids) - len(found)
+        _stats["lookups"] += 1
+        log_stats = STATS_LOG_INTERVAL > 0 and _stats["lookups"] % STATS_LOG_INTERVAL == 0
+    if log_stats:
+        print(f"JustificationCache: estatísticas {get_stats()}")
+    return found
+
+
+def put_many(cluster_id: str, justifications: dict[str, str]) -> None:
+    if not justifications:
+        return
+    with _lock:
+        for book_id, justification in justifications.items():
+            _memory_cache[(cluster_id, book_id)] = justification
+    if PERSISTENT_CACHE_ENABLED:
+        # A gravação roda no pool de threads sem bloquear a resposta ao usuário.
+        try:
+            asyncio.get_running_loop().run_in_executor(None, _write_persistent, cluster_id, justifications)
+        except Exception:
+            traceback.print_exc()
+
+
+def get_stats() -> dict:
+    """Contadores de acertos/falhas (por livro), de atribuição a clusters e o histograma de similaridade."""
+    with _lock:
+        stats = dict(_stats)
+        stats["nearest_similarity_histogram"] = _nearest_similarity_counts.tolist()
+        stats["memory_entries"] = len(_memory_cache)
+        stats["clusters"] = len(_cluster_ids)
+    total = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["persistent_hits"]) / total if total else 0.0
+    return stats
@@ -0,0 +1,195 @@
+# functions/local_vector_index.py
+import os
+import json
+import threading
+import numpy as np
+
+# Índice vetorial exato, em processo, para coleções pequenas (livros, frases).
+# Evita a ida e volta ao Pinecone (fora da região southamerica-east1) quando a coleção inteira
+# cabe em memória: a busca é um produto escalar da query contra a matriz float32 + argpartition.
+#
+# Cada snapshot é gerado por export_vector_snapshot.py e fica em VECTOR_SNAPSHOT_DIR:
+#   <nome>.vectors.npy      -> matriz float32 (N x D), aberta com mmap (não é copiada para o heap)
+#   <nome>.metadata.json    -> {"metric", "dimension", "ids": [...], "metadata": [...]}
+# Os resultados têm o mesmo formato dos 'matches' do Pinecone ({id, score, metadata}).
+
+SNAPSHOT_DIR = os.environ.get(
+    "VECTOR_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_snapshots"),
+)
+
+_indexes: dict[str, "LocalVectorIndex | None"] = {}
+_indexes_lock = threading.Lock()
+
+
+def snapshot_paths(name: str, snapshot_dir: str | None = None) -> tuple[str, str]:
+    base_dir = snapshot_dir or SNAPSHOT_DIR
+    return (
+        os.path.join(base_dir, f"{name}.vectors.npy"),
+        os.path.join(base_dir, f"{name}.metadata.json"),
+    )
+
+
+def _compare(operator: str, actual, expected) -> bool:
+    if operator == "$eq":
+        return actual == expected or (isinstance(actual, list) and expected in actual)
+    if operator == "$ne":
+        return actual != expected and not (isinstance(actual, list) and expected in actual)
+    if operator == "$in":
+        if isinstance(actual, list):
+            return any(item in expected for item in actual)
+        return actual in expected
+    if operator == "$nin":
+        if isinstance(actual, list):
+            return not any(item in expected for item in actual)
+        return actual not in expected
+    if operator == "$exists":
+        return (actual is not None) == bool(expected)
+    if actual is None or isinstance(actual, (list, dict)):
+        return False
+    try:
+        if operator == "$gt":
+            return actual > expected
+        if operator == "$gte":
+            return actual >= expected
+        if operator == "$lt":
+            return actual < expected
+        if operator == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Operador de filtro não suportado: {operator}")
+
+
+def matches_filter(metadata: dict | None, filters: dict | None) -> bool:
+    """
+    Avalia um filtro de metadados no formato do Pinecone contra os metadados de um vetor.
+    Suporta igualdade direta ({"campo": valor}), $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte/$exists,
+    e a combinação com $and/$or.
+    """
+    if not filters:
+        return True
+    metadata = metadata or {}
+    for key, condition in filters.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif isinstance(condition, dict):
+            actual = metadata.get(key)
+            if not all(_compare(operator, actual, expected) for operator, expected in condition.items()):
+                return False
+        elif not _compare("$eq", metadata.get(key), condition):
+            return False
+    return True
+
+
+class LocalVectorIndex:
+    """Matriz de vetores + ids/metadados alinhados por linha, com busca top-k exata."""
+
+    def __init__(self, vectors: np.ndarray, ids: list[str], metadata: list[dict], metric: str = "cosine"):
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids) or len(ids) != len(metadata):
+            raise ValueError("Snapshot inconsistente: matriz, ids e metadados devem ter o mesmo número de linhas.")
+        self.vectors = vectors
+        self.ids = ids
+        self.metadata = metadata
+        self.metric = metric
+        self._ids_position = {vector_id: row for row, vector_id in enumerate(ids)}
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def load(cls, name: str, snapshot_dir: str | None = None) -> "LocalVectorIndex":
+        vectors_path, metadata_path = snapshot_paths(name, snapshot_dir)
+        vectors = np.load(vectors_path, mmap_mode="r")
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            snapshot_info = json.load(f)
+        return cls(vectors, snapshot_info["ids"], snapshot_info["metadata"], snapshot_info.get("metric", "cosine"))
+
+    def _prepare_queries(self, query_vectors) -> np.ndarray:
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        if queries.shape[1] != self.dimension:
+            raise ValueError(f"Dimensão da query ({queries.shape[1]}) difere da do índice ({self.dimension}).")
+        if self.metric == "cosine":
+            # As linhas da matriz já são gravadas normalizadas pelo export; basta normalizar as queries
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.maximum(norms, 1e-12)
+        return queries
+
+    def _filter_rows(self, filters: dict | None) -> np.ndarray | None:
+        if not filters:
+            return None
+        return np.fromiter(
+            (row for row, row_metadata in enumerate(self.metadata) if matches_filter(row_metadata, filters)),
+            dtype=np.int64,
+        )
+
+    def query_batch(self, query_vectors, top_k: int, filters: dict | None = None, include_metadata: bool = True) -> list[list[dict]]:
+        """Top-k para várias queries de uma vez (uma única multiplicação de matrizes)."""
+        queries = self._prepare_queries(query_vectors)
+        candidate_rows = self._filter_rows(filters)
+        candidate_vectors = self.vectors if candidate_rows is None else self.vectors[candidate_rows]
+        candidate_count = candidate_vectors.shape[0]
+        if candidate_count == 0 or top_k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        scores = queries @ candidate_vectors.T  # (Q x N)
+        k = min(top_k, candidate_count)
+        if k < candidate_count:
+            top_columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top_columns = np.broadcast_to(np.arange(candidate_count), (queries.shape[0], candidate_count))
+
+        all_matches = []
+        for query_row in range(queries.shape[0]):
+            columns = top_columns[query_row]
+            row_scores = scores[query_row, columns]
+            order = np.argsort(-row_scores, kind="stable")
+            matches = []
+            for column, score in zip(columns[order], row_scores[order]):
+                index_row = int(column) if candidate_rows is None else int(candidate_rows[column])
+                match = {"id": self.ids[index_row], "score": float(score)}
+                if include_metadata:
+                    match["metadata"] = self.metadata[index_row]
+                matches.append(match)
+            all_matches.append(matches)
+        return all_matches
+
+    def query(self, query_vector, top_k: int, filters: dict | None = None, include_metadata: bool = True) -> list[dict]:
+        return self.query_batch(query_vector, top_k, filters, include_metadata)[0]
+
+
+def get_index(name: str) -> LocalVectorIndex | None:
+    """Carrega (uma vez por instância) o snapshot indicado. Retorna None se ele não existir ou for inválido."""
+    if name in _indexes:
+        return _indexes[name]
+    with _indexes_lock:
+        if name not in _indexes:
+            try:
+                index = LocalVectorIndex.load(name)
+                print(f"LocalVectorIndex: Snapshot '{name}' carregado ({len(index)} vetores, dimensão {index.dimension}).")
+            except FileNotFoundError:
+                print(f"AVISO (LocalVectorIndex): Snapshot '{name}' não encontrado em {SNAPSHOT_DIR}.")
+                index = None
+            except Exception as e:
+                print(f"ERRO (LocalVectorIndex): Falha ao carregar o snapshot '{name}': {e}")
+                index = None
+            _indexes[name] = index
+    return _indexes[name]
+
+
+def query(name: str, vector: list[float], top_k: int, filters: dict | None = None) -> list[dict] | None:
+    """Consulta o snapshot 'name'. Retorna None quando o snapshot não está disponível (o chamador usa o Pinecone)."""
+    index = get_index(name)
+    if index is None:
+        return None
+    return index.query(vector, top_k, filters)
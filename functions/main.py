@@ -21,6 +21,7 @@ from google.cloud.firestore_v1.field_path import FieldPath
 import asyncio
 import httpx
 import traceback
+import event_loop_runner
 from math import pow
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -60,11 +61,19 @@ try:
     import book_search_service
     import community_search_service
     import quote_search_service # <<< ADICIONE ESTE IMPORT
+    import universal_search_service
+    import strongs_concordance_service
+    import morphology_query_service
+    import bible_text_search_service
+    import verse_recommendation_service
+    import verse_recommendation_cache
     print("Módulos de serviço importados com sucesso.")
 except ImportError as e_import:
     print(f"AVISO: Falha na importação de um ou mais módulos de serviço: {e_import}")
     # Definir como None para verificações de segurança
     bible_search_service = sermons_service = chat_service = bible_chat_service = book_search_service = None
+    universal_search_service = strongs_concordance_service = morphology_query_service = None
+    bible_text_search_service = verse_recommendation_service = verse_recommendation_cache = None
 
 
 # --- Inicialização do Firebase Admin ---
@@ -97,33 +106,18 @@ options.set_global_options(region=options.SupportedRegion.SOUTHAMERICA_EAST1)
 # --- Constantes do Google Play ---
 PACKAGE_NAME = "com.septima.septimabiblia" 
 
-ABBREV_TO_FULL_NAME_MAP = {
-    "gn": "Gênesis", "ex": "Êxodo", "lv": "Levítico", "nm": "Números", "dt": "Deuteronômio",
-    "js": "Josué", "jz": "Juízes", "rt": "Rute", "1sm": "1 Samuel", "2sm": "2 Samuel",
-    "1rs": "1 Reis", "2rs": "2 Reis", "1cr": "1 Crônicas", "2cr": "2 Crônicas",
-    "ed": "Esdras", "ne": "Neemias", "et": "Ester", "job": "Jó", "sl": "Salmos",
-    "pv": "Provérbios", "ec": "Eclesiastes", "ct": "Cantares de Salomão", "is": "Isaías",
-    "jr": "Jeremias", "lm": "Lamentações", "ez": "Ezequiel", "dn": "Daniel",
-    "os": "Oseias", "jl": "Joel", "am": "Amós", "ob": "Obadias", "jn": "Jonas",
-    "mq": "Miqueias", "na": "Naum", "hc": "Habacuque", "sf": "Sofonias",
-    "ag": "Ageu", "zc": "Zacarias", "ml": "Malaquias", "mt": "Mateus", "mc": "Marcos",
-    "lc": "Lucas", "jo": "João", "at": "Atos", "rm": "Romanos", "1co": "1 Coríntios",
-    "2co": "2 Coríntios", "gl": "Gálatas", "ef": "Efésios", "fp": "Filipenses",
-    "cl": "Colossenses", "1ts": "1 Tessalonicenses", "2ts": "2 Tessalonicenses",
-    "1tm": "1 Timóteo", "2tm": "2 Timóteo", "tt": "Tito", "fm": "Filemom",
-    "hb": "Hebreus", "tg": "Tiago", "1pe": "1 Pedro", "2pe": "2 Pedro",
-    "1jo": "1 João", "2jo": "2 João", "3jo": "3 João", "jd": "Judas", "ap": "Apocalipse"
-}
+# Mapa abreviação -> nome completo (compartilhado com os serviços em bible_data.py)
+from bible_data import ABBREV_TO_FULL_NAME_MAP
 
 
 # --- Funções Auxiliares (Async) ---
 def _run_async_handler_wrapper(async_func):
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    return loop.run_until_complete(async_func)
+    """
+    Executa a corrotina no event loop persistente da instância (thread dedicada) e espera o resultado.
+    Clientes assíncronos com pool (Pinecone/OpenAI) ficam presos a esse loop e reaproveitam conexões
+    entre invocações; handlers concorrentes na mesma instância intercalam o seu I/O.
+    """
+    return event_loop_runner.run_coroutine_sync(async_func)
 
 # --- CLOUD FUNCTION PARA VALIDAR COMPRAS DO GOOGLE PLAY ---
 @https_fn.on_call(
@@ -223,6 +217,7 @@ def semantic_bible_search(request: https_fn.CallableRequest) -> dict:
     user_query = request.data.get("query")
     filters = request.data.get("filters")
     top_k = request.data.get("topK", 10)
+    mode = request.data.get("mode") or "semantic"  # semantic | lexical | hybrid | hybrid_weighted
 
     if bible_search_service is None:
         raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno do servidor (módulo de busca indisponível).")
@@ -232,9 +227,11 @@ def semantic_bible_search(request: https_fn.CallableRequest) -> dict:
     
     try:
         search_results = _run_async_handler_wrapper(
-            bible_search_service.perform_semantic_search(user_query, filters, top_k)
+            bible_search_service.perform_semantic_search(user_query, filters, top_k, mode=mode)
         )
         return {"results": search_results if isinstance(search_results, list) else []}
+    except ValueError as ve:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message=str(ve))
     except Exception as e:
         print(f"Erro inesperado em semantic_bible_search (main.py): {e}"); traceback.print_exc()
         raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message=f"Erro interno ao processar a busca: {str(e)}")
@@ -2086,50 +2083,15 @@ def verifyPostPassword(req: https_fn.CallableRequest) -> dict:
         print(f"ERRO em verifyPostPassword: {e}")
         raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message=f"Ocorreu um erro: {e}")
 
-# --- NOVA FUNÇÃO AUXILIAR ESPECÍFICA PARA BUSCAR FRASES NO PINECONE ---
+# --- FUNÇÃO AUXILIAR ESPECÍFICA PARA BUSCAR FRASES NO PINECONE ---
 async def _query_pinecone_quotes_async(vector: list[float], top_k: int) -> list[dict]:
     """
     Consulta o índice 'septima-quotes' do Pinecone de forma assíncrona.
+    Delega ao quote_search_service, que usa o pool de conexões compartilhado
+    (vector_search_client) em vez de abrir um cliente HTTP novo por requisição.
     """
-    # --- INÍCIO DA CORREÇÃO ---
-    
-    # Inicializa apenas para garantir que as chaves de API sejam carregadas.
-    # Não usaremos mais o cliente httpx global daqui.
-    sermons_service._initialize_sermon_clients()
-    pinecone_api_key = sermons_service._pinecone_api_key_sermons_loaded
-
-    if not pinecone_api_key:
-        raise ConnectionError("Falha ao carregar configuração da API Pinecone.")
-
-    # !!! ESTA É A MUDANÇA MAIS IMPORTANTE !!!
-    # Substitua pelo endpoint EXATO do seu índice de frases 'septima-quotes'
-    PINECONE_ENDPOINT_QUOTES = "https://septima-quotes-hqija7a.svc.aped-4627-b74a.pinecone.io" 
-    
-    request_url = f"{PINECONE_ENDPOINT_QUOTES}/query"
-    headers = {
-        "Api-Key": pinecone_api_key,
-        "Content-Type": "application/json", "Accept": "application/json"
-    }
-    payload = {
-        "vector": vector, "topK": top_k,
-        "includeMetadata": True, "includeValues": False
-    }
-    
-    print(f"Consultando Pinecone (Frases) em {request_url}")
-    
-    # Cria o cliente HTTPX localmente dentro do escopo da função async
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(request_url, headers=headers, json=payload)
-            response.raise_for_status()
-            result_data = response.json()
-            return result_data.get("matches", [])
-        except httpx.HTTPStatusError as e_http:
-            print(f"Erro HTTP ao consultar Pinecone (Frases): Status {e_http.response.status_code}, Corpo: {e_http.response.text}")
-            raise ConnectionError(f"Falha na comunicação com Pinecone (Frases).")
-        except Exception as e_generic:
-            print(f"Erro inesperado durante a consulta ao Pinecone (Frases): {e_generic}")
-            raise
+    print(f"Consultando Pinecone (Frases) com top_k={top_k}")
+    return await quote_search_service._query_pinecone_quotes_async(vector, top_k)
 
 @https_fn.on_call(
     secrets=["openai-api-key", "pinecone-api-key"],
@@ -2255,12 +2217,9 @@ def generateForumQuestion(req: https_fn.CallableRequest) -> dict:
         )
 
     try:
-        from book_search_service import _openai_client_books as openai_client
-        if openai_client is None:
-            from book_search_service import _initialize_book_clients
-            _initialize_book_clients()
-            from book_search_service import _openai_client_books as openai_client
-    except ImportError:
+        import openai_clients
+        openai_client = openai_clients.get_sync_client()
+    except (ImportError, ValueError):
          raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno do servidor (módulo de IA indisponível).")
 
     system_prompt = """
@@ -3349,6 +3308,153 @@ Você é um bibliotecário e conselheiro teológico especialista. Sua tarefa é
         )
 
 
+def _compute_chapter_verse_recommendations(learning_goal: str, book_abbrev: str, chapter: int, allow_llm: bool = True) -> tuple[list[int], str] | None:
+    """
+    (números dos versículos do capítulo relacionados ao objetivo, origem: 'embeddings' ou 'llm').
+    Tenta primeiro a matriz de embeddings por versículo (verse_recommendation_service) e recorre à
+    OpenAI quando ela não está disponível. Com allow_llm=False (pré-carregamento), retorna None em
+    vez de chamar a OpenAI. Levanta HttpsError/Exception em caso de falha.
+    """
+    # Caminho rápido: similaridade com a matriz de embeddings por versículo, sem chamada ao LLM.
+    # Retorna None quando a matriz não está disponível; nesse caso seguimos para a OpenAI abaixo.
+    if verse_recommendation_service is not None:
+        try:
+            embedding_verses = _run_async_handler_wrapper(
+                verse_recommendation_service.recommend_chapter_verses(learning_goal, book_abbrev, chapter)
+            )
+        except Exception as e:
+            print(f"AVISO: Falha na recomendação por embeddings para '{book_abbrev}_{chapter}': {e}. Usando a IA.")
+            embedding_verses = None
+        if embedding_verses is not None:
+            return embedding_verses, "embeddings"
+    if not allow_llm:
+        return None
+
+    db = get_db()
+    bible_doc_id = f"ARA_{book_abbrev}"
+    bible_doc = db.collection('Bible').document(bible_doc_id).get()
+    if not bible_doc.exists:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.NOT_FOUND, message=f"Texto bíblico não encontrado para '{bible_doc_id}'.")
+
+    bible_data = bible_doc.to_dict()
+    chapter_verses = bible_data.get("chapters", {}).get(str(chapter))
+
+    if not chapter_verses or not isinstance(chapter_verses, list):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.NOT_FOUND, message=f"Capítulo {chapter} não encontrado para o livro '{bible_doc_id}'.")
+
+    chapter_text_formatted = "\n".join([f"Versículo {i+1}: {verse}" for i, verse in enumerate(chapter_verses)])
+
+    openai_api_key = os.environ.get("openai-api-key")
+    if not openai_api_key:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Chave da API OpenAI não configurada.")
+
+    client = OpenAI(api_key=openai_api_key)
+    book_full_name = ABBREV_TO_FULL_NAME_MAP.get(book_abbrev, book_abbrev.upper())
+
+    system_prompt = "Você é um assistente teológico especialista em análise semântica da Bíblia."
+    user_prompt = f"""
+O objetivo de estudo do usuário é: "{learning_goal}"
+
+Abaixo está o texto completo do capítulo {book_full_name} {chapter}.
+Analise cada versículo e identifique quais se relacionam DIRETAMENTE com o objetivo do usuário.
+
+Retorne APENAS um objeto JSON com uma única chave "verses" contendo um array com os NÚMEROS dos versículos relevantes. Não inclua nenhuma outra palavra, explicação ou formatação.
+Se nenhum versículo for relevante, retorne um array vazio [].
+
+Exemplo de saída: {{"verses": [3, 5, 12, 26]}}
+
+Texto do Capítulo:
+---
+{chapter_text_formatted}
+---
+"""
+    print(f"Enviando prompt para a OpenAI ({book_abbrev} {chapter})...")
+
+    chat_completion = client.chat.completions.create(
+        model="gpt-5-nano",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"}
+    )
+
+    response_content = chat_completion.choices[0].message.content
+    print(f"Resposta da OpenAI recebida: {response_content}")
+
+    try:
+        parsed_json = json.loads(response_content)
+        recommended_verses = parsed_json.get("verses", [])
+        if not isinstance(recommended_verses, list):
+            recommended_verses = []
+
+    except (json.JSONDecodeError, TypeError, AttributeError) as e:
+        print(f"ERRO: A resposta da OpenAI não é um JSON válido ou está em formato inesperado: {e}")
+        recommended_verses = []
+
+    return recommended_verses, "llm"
+
+
+def _prefetch_verse_recommendations_sync(user_id: str, book_abbrev: str, chapters: list[int], learning_goal: str | None) -> None:
+    """Calcula (ou liga ao cache compartilhado) as recomendações dos capítulos informados para o usuário."""
+    if learning_goal is None:
+        user_doc = get_db().collection('users').document(user_id).get()
+        learning_goal = (user_doc.to_dict() or {}).get("learningGoal") if user_doc.exists else None
+    if not learning_goal or not learning_goal.strip():
+        return
+    goal_key = verse_recommendation_cache.goal_hash(learning_goal)
+    for chapter in chapters:
+        try:
+            if verse_recommendation_cache.read_for_user(user_id, goal_key, book_abbrev, chapter) is not None:
+                continue
+            if verse_recommendation_cache.read_shared(verse_recommendation_cache.shared_cache_id(goal_key, book_abbrev, chapter)) is not None:
+                verse_recommendation_cache.link_user(user_id, goal_key, book_abbrev, chapter)
+                continue
+            # Sem chamada especulativa ao LLM: se os embeddings falharem, o capítulo fica para a leitura
+            computed = _compute_chapter_verse_recommendations(learning_goal, book_abbrev, chapter, allow_llm=False)
+            if computed is None:
+                print(f"Pré-carregamento de '{book_abbrev}_{chapter}' ignorado: recomendação por embeddings indisponível.")
+                continue
+            recommended_verses, source = computed
+            verse_recommendation_cache.store(goal_key, book_abbrev, chapter, recommended_verses, source, user_id=user_id)
+            print(f"Pré-carregamento ({source}) salvo no cache para '{book_abbrev}_{chapter}'.")
+        except Exception as e:
+            print(f"AVISO: Falha no pré-carregamento de '{book_abbrev}_{chapter}' para {user_id}: {e}")
+
+
+async def _prefetch_verse_recommendations_async(user_id: str, book_abbrev: str, chapters: list[int], learning_goal: str | None) -> None:
+    # Firestore e o caminho com o LLM são síncronos: rodam numa thread para não bloquear o loop compartilhado
+    await asyncio.to_thread(_prefetch_verse_recommendations_sync, user_id, book_abbrev, chapters, learning_goal)
+
+
+def _schedule_verse_prefetch(user_id: str, book_abbrev: str, chapter: int, learning_goal: str | None = None) -> None:
+    """
+    Agenda em segundo plano (event_loop_runner) as recomendações dos próximos capítulos do livro,
+    limitados por bible_sections_count.json. Sem learning_goal, o objetivo é lido do usuário na própria tarefa.
+    Só com a matriz de embeddings: sem ela, cada capítulo pré-carregado seria uma chamada especulativa ao LLM.
+    A tarefa é melhor esforço: depois que a resposta sai, a CPU da instância pode ser reduzida e ela ficar parada.
+    """
+    if verse_recommendation_service is None or verse_recommendation_cache is None or verse_recommendation_service.PREFETCH_CHAPTERS <= 0:
+        return
+    if not verse_recommendation_service.is_available():
+        return
+    book_info = ((_load_bible_metadata() or {}).get("livros") or {}).get(book_abbrev)
+    if not book_info:
+        return
+    chapters = [
+        upcoming_chapter
+        for upcoming_chapter in verse_recommendation_service.upcoming_chapters(chapter, len(book_info.get("capitulos", [])))
+        if verse_recommendation_service.claim_prefetch(user_id, book_abbrev, upcoming_chapter)
+    ]
+    if not chapters:
+        return
+    try:
+        event_loop_runner.submit_background(_prefetch_verse_recommendations_async(user_id, book_abbrev, chapters, learning_goal))
+        print(f"Pré-carregamento agendado para '{book_abbrev}' capítulos {chapters}.")
+    except Exception as e:
+        print(f"AVISO: Não foi possível agendar o pré-carregamento: {e}")
+
+
 @https_fn.on_call(
     secrets=["openai-api-key", "pinecone-api-key"],
     region=options.SupportedRegion.SOUTHAMERICA_EAST1,
@@ -3395,102 +3501,59 @@ def getVerseRecommendationsForChapter(req: https_fn.CallableRequest) -> dict:
     # <<< FIM DA CORREÇÃO >>>
     # ==========================================================
     
-    # 2. Lógica de Cache (sem alterações)
+    # Pré-carregamento dos próximos capítulos em segundo plano (o app pode desligar com prefetch=false)
+    prefetch_enabled = req.data.get("prefetch", True) is not False
+
+    # 2. Cache compartilhado por objetivo (verse_recommendation_cache): o documento do usuário em
+    # users/{uid}/recommendedVerses é só um ponteiro para a entrada do seu 'learningGoal'. O objetivo
+    # atual é lido antes do ponteiro: um ponteiro de um objetivo anterior conta como falha no cache.
     chapter_id_cache = f"{book_abbrev}_{chapter}"
     user_doc_ref = db.collection('users').document(user_id)
-    cache_ref = user_doc_ref.collection('recommendedVerses').document(chapter_id_cache)
-    
-    try:
-        cached_doc = cache_ref.get()
-        if cached_doc.exists:
-            cached_data = cached_doc.to_dict()
-            if 'verses' in cached_data:
-                print(f"Cache HIT para '{chapter_id_cache}'.")
-                return {"verses": cached_data['verses']}
-    except Exception as e:
-        print(f"AVISO: Erro ao ler cache: {e}.")
-
-    print(f"Cache MISS para '{chapter_id_cache}'. Buscando na IA.")
 
-    # O resto da sua função continua exatamente o mesmo...
     try:
         user_doc_snapshot = user_doc_ref.get()
         if not user_doc_snapshot.exists:
             raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.NOT_FOUND, message="Usuário não encontrado.")
-        
-        # ... (lógica para learning_goal, texto da bíblia, chamada à OpenAI, etc.) ...
+
         user_data = user_doc_snapshot.to_dict()
         learning_goal = user_data.get("learningGoal")
-        
+
         if not learning_goal or not learning_goal.strip():
             print(f"Usuário {user_id} não possui um 'learningGoal' definido. Retornando lista vazia.")
-            cache_ref.set({"verses": [], "createdAt": firestore.SERVER_TIMESTAMP})
             return {"verses": []}
 
-        bible_doc_id = f"ARA_{book_abbrev}"
-        bible_doc = db.collection('Bible').document(bible_doc_id).get()
-        if not bible_doc.exists:
-            raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.NOT_FOUND, message=f"Texto bíblico não encontrado para '{bible_doc_id}'.")
-            
-        bible_data = bible_doc.to_dict()
-        chapter_verses = bible_data.get("chapters", {}).get(str(chapter))
-        
-        if not chapter_verses or not isinstance(chapter_verses, list):
-            raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.NOT_FOUND, message=f"Capítulo {chapter} não encontrado para o livro '{bible_doc_id}'.")
-
-        chapter_text_formatted = "\n".join([f"Versículo {i+1}: {verse}" for i, verse in enumerate(chapter_verses)])
-
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Chave da API OpenAI não configurada.")
-        
-        client = OpenAI(api_key=openai_api_key)
-        book_full_name = ABBREV_TO_FULL_NAME_MAP.get(book_abbrev, book_abbrev.upper())
-        
-        system_prompt = "Você é um assistente teológico especialista em análise semântica da Bíblia."
-        user_prompt = f"""
-O objetivo de estudo do usuário é: "{learning_goal}"
-
-Abaixo está o texto completo do capítulo {book_full_name} {chapter}.
-Analise cada versículo e identifique quais se relacionam DIRETAMENTE com o objetivo do usuário.
-
-Retorne APENAS um objeto JSON com uma única chave "verses" contendo um array com os NÚMEROS dos versículos relevantes. Não inclua nenhuma outra palavra, explicação ou formatação.
-Se nenhum versículo for relevante, retorne um array vazio [].
-
-Exemplo de saída: {{"verses": [3, 5, 12, 26]}}
+        goal_key = verse_recommendation_cache.goal_hash(learning_goal)
+        try:
+            cached_verses = verse_recommendation_cache.read_for_user(user_id, goal_key, book_abbrev, chapter)
+            if cached_verses is not None:
+                print(f"Cache HIT (ponteiro) para '{chapter_id_cache}'.")
+                if prefetch_enabled:
+                    _schedule_verse_prefetch(user_id, book_abbrev, chapter, learning_goal)
+                return {"verses": cached_verses}
+        except Exception as e:
+            print(f"AVISO: Erro ao ler cache: {e}.")
 
-Texto do Capítulo:
----
-{chapter_text_formatted}
----
-"""
-        print(f"Enviando prompt para a OpenAI para o usuário {user_id}...")
-        
-        chat_completion = client.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        response_content = chat_completion.choices[0].message.content
-        print(f"Resposta da OpenAI recebida: {response_content}")
-        
         try:
-            parsed_json = json.loads(response_content)
-            recommended_verses = parsed_json.get("verses", []) 
-            if not isinstance(recommended_verses, list):
-                recommended_verses = []
+            shared_verses = verse_recommendation_cache.read_shared(
+                verse_recommendation_cache.shared_cache_id(goal_key, book_abbrev, chapter)
+            )
+            if shared_verses is not None:
+                print(f"Cache HIT (compartilhado) para '{chapter_id_cache}'.")
+                verse_recommendation_cache.link_user(user_id, goal_key, book_abbrev, chapter)
+                if prefetch_enabled:
+                    _schedule_verse_prefetch(user_id, book_abbrev, chapter, learning_goal)
+                return {"verses": shared_verses}
+        except Exception as e:
+            print(f"AVISO: Erro ao ler o cache compartilhado: {e}.")
 
-        except (json.JSONDecodeError, TypeError, AttributeError) as e:
-            print(f"ERRO: A resposta da OpenAI não é um JSON válido ou está em formato inesperado: {e}")
-            recommended_verses = []
+        print(f"Cache MISS para '{chapter_id_cache}'. Calculando recomendações.")
+        recommended_verses, source = _compute_chapter_verse_recommendations(learning_goal, book_abbrev, chapter)
+
+        verse_recommendation_cache.store(goal_key, book_abbrev, chapter, recommended_verses, source, user_id=user_id)
+        print(f"Resultado ({source}) salvo no cache para '{chapter_id_cache}'. Versículos: {recommended_verses}")
+        if prefetch_enabled:
+            _schedule_verse_prefetch(user_id, book_abbrev, chapter, learning_goal)
 
-        cache_ref.set({"verses": recommended_verses, "createdAt": firestore.SERVER_TIMESTAMP})
-        print(f"Resultado salvo no cache para '{chapter_id_cache}'. Versículos: {recommended_verses}")
-        
         return {"verses": recommended_verses}
 
     except Exception as e:
@@ -3499,6 +3562,34 @@ Texto do Capítulo:
         return {"verses": []}
 
 
+@firestore_fn.on_document_updated(
+    document="users/{userId}",
+    region=options.SupportedRegion.SOUTHAMERICA_EAST1,
+    memory=options.MemoryOption.MB_256
+)
+def onLearningGoalChanged(event: Event[Change]) -> None:
+    """
+    Apaga os ponteiros de recomendações de versículos do usuário quando o 'learningGoal' muda.
+    As entradas compartilhadas continuam válidas para quem ainda tem o objetivo anterior.
+    """
+    if event.data is None:
+        return
+    data_before = event.data.before.to_dict() if event.data.before and event.data.before.exists else {}
+    data_after = event.data.after.to_dict() if event.data.after and event.data.after.exists else {}
+    goal_before = (data_before.get("learningGoal") or "").strip()
+    goal_after = (data_after.get("learningGoal") or "").strip()
+    if not goal_before or verse_recommendation_cache.goal_hash(goal_before) == verse_recommendation_cache.goal_hash(goal_after):
+        return
+
+    user_id = event.params["userId"]
+    try:
+        deleted = verse_recommendation_cache.invalidate_user(user_id)
+        print(f"onLearningGoalChanged: {deleted} recomendações de versículos invalidadas para {user_id}.")
+    except Exception as e:
+        print(f"ERRO em onLearningGoalChanged para {user_id}: {e}")
+        traceback.print_exc()
+
+
 
 # ==============================================================================
 # <<< NOVA CLOUD FUNCTION: GET SERMON RECOMMENDATIONS FOR USER >>>
@@ -3620,4 +3711,178 @@ def semanticQuoteSearch(req: https_fn.CallableRequest) -> dict:
         return {"results": search_results}
     except Exception as e:
         print(f"Erro em semanticQuoteSearch: {e}")
-        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao realizar a busca de frases.")
\ No newline at end of file
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao realizar a busca de frases.")
+
+
+@https_fn.on_call(
+    secrets=["openai-api-key", "pinecone-api-key"],
+    region=options.SupportedRegion.SOUTHAMERICA_EAST1,
+    memory=options.MemoryOption.MB_512,
+    timeout_sec=60,
+    cors=cors_options
+)
+def universalSearch(req: https_fn.CallableRequest) -> dict:
+    """
+    Busca a mesma query em todos os índices (bíblia, sermões, livros, frases e comunidade)
+    com um único embedding e consultas em paralelo. Parâmetros opcionais:
+      - sections: lista de seções (padrão: todas)
+      - topK: {secao: topK} (limitado por seção; livros no máximo 5)
+      - filters: filtros da seção bíblia (mesmo formato de semantic_bible_search)
+      - deadlineMs: prazo total; seções que não terminarem a tempo são descartadas
+    Frases e comunidade só são consultadas para usuários autenticados.
+    """
+    if universal_search_service is None:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno: serviço de busca universal indisponível.")
+
+    user_query = req.data.get("query")
+    if not user_query or not isinstance(user_query, str):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'query' (string) é obrigatório.")
+
+    sections = req.data.get("sections")
+    top_k_by_section = req.data.get("topK")
+    bible_filters = req.data.get("filters")
+    deadline_ms = req.data.get("deadlineMs")
+    if sections is not None and not isinstance(sections, list):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'sections' deve ser uma lista.")
+    if top_k_by_section is not None and not isinstance(top_k_by_section, dict):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'topK' deve ser um mapa {seção: número}.")
+
+    deadline_seconds = universal_search_service.DEFAULT_DEADLINE_SECONDS
+    if isinstance(deadline_ms, (int, float)) and deadline_ms > 0:
+        deadline_seconds = deadline_ms / 1000.0
+
+    try:
+        return _run_async_handler_wrapper(
+            universal_search_service.perform_universal_search(
+                user_query,
+                sections=sections,
+                top_k_by_section=top_k_by_section,
+                bible_filters=bible_filters,
+                deadline_seconds=deadline_seconds,
+                authenticated=bool(req.auth and req.auth.uid),
+            )
+        )
+    except ValueError as ve:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message=str(ve))
+    except Exception as e:
+        print(f"Erro em universalSearch: {e}")
+        traceback.print_exc()
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao realizar a busca universal.")
+
+
+@https_fn.on_call(
+    region=options.SupportedRegion.SOUTHAMERICA_EAST1,
+    memory=options.MemoryOption.MB_512,
+    timeout_sec=30,
+    cors=cors_options
+)
+def getStrongsConcordance(req: https_fn.CallableRequest) -> dict:
+    """
+    Concordância de um número de Strong (ex: 'G26', 'H430'): versículos em que ocorre, contagem por
+    livro e o texto da tradução. Parâmetros: strong (obrigatório), page (1..), pageSize (1..100),
+    translation (padrão 'nvi') e book (abreviação, opcional).
+    """
+    if strongs_concordance_service is None:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno: serviço de concordância indisponível.")
+
+    strong = req.data.get("strong")
+    if not strong or not isinstance(strong, str):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'strong' (string) é obrigatório.")
+
+    try:
+        return strongs_concordance_service.get_strongs_concordance(
+            strong,
+            page=req.data.get("page", 1),
+            page_size=req.data.get("pageSize", strongs_concordance_service.DEFAULT_PAGE_SIZE),
+            translation=req.data.get("translation") or "nvi",
+            book_abbrev=req.data.get("book"),
+        )
+    except ValueError as ve:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message=str(ve))
+    except Exception as e:
+        print(f"Erro em getStrongsConcordance: {e}")
+        traceback.print_exc()
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao consultar a concordância.")
+
+
+@https_fn.on_call(
+    region=options.SupportedRegion.SOUTHAMERICA_EAST1,
+    memory=options.MemoryOption.MB_512,
+    timeout_sec=30,
+    cors=cors_options
+)
+def queryBibleMorphology(req: https_fn.CallableRequest) -> dict:
+    """
+    Busca palavras do texto original por morfologia, Strong e trecho. Parâmetros:
+      - features: {categoria: valor ou [valores]} (ex: {"tempo": "aoristo", "modo": "imperativo"})
+      - strong: 'G3056', 'H430'... (opcional)
+      - book, chapterFrom, chapterTo: restringe a um livro/capítulos (opcional)
+      - language: 'greek' ou 'hebrew' (deduzido do strong/livro quando omitido)
+      - page, pageSize, translation (inclui o texto do versículo)
+    Com 'vocabulary': true, retorna apenas as categorias e valores disponíveis do idioma.
+    """
+    if morphology_query_service is None:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno: serviço de morfologia indisponível.")
+
+    data = req.data or {}
+    features = data.get("features")
+    if features is not None and not isinstance(features, dict):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'features' deve ser um mapa {categoria: valor}.")
+
+    try:
+        if data.get("vocabulary"):
+            return {"vocabulary": morphology_query_service.get_feature_vocabulary(data.get("language") or "greek")}
+        return morphology_query_service.query_morphology(
+            language=data.get("language"),
+            features=features,
+            strong=data.get("strong"),
+            book_abbrev=data.get("book"),
+            chapter_from=data.get("chapterFrom"),
+            chapter_to=data.get("chapterTo"),
+            page=data.get("page", 1),
+            page_size=data.get("pageSize", morphology_query_service.DEFAULT_PAGE_SIZE),
+            translation=data.get("translation"),
+        )
+    except ValueError as ve:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message=str(ve))
+    except Exception as e:
+        print(f"Erro em queryBibleMorphology: {e}")
+        traceback.print_exc()
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao consultar a morfologia.")
+
+
+@https_fn.on_call(
+    region=options.SupportedRegion.SOUTHAMERICA_EAST1,
+    memory=options.MemoryOption.MB_512,
+    timeout_sec=30,
+    cors=cors_options
+)
+def searchBibleText(req: https_fn.CallableRequest) -> dict:
+    """
+    Busca textual exata (sem acentos/maiúsculas) nas traduções da Bíblia, ranqueada por BM25.
+    Trechos entre aspas na query são frases obrigatórias. Parâmetros: query (obrigatório),
+    translation (padrão 'nvi'), topK (1..100), book (abreviação, opcional), phrase (query inteira como frase).
+    """
+    if bible_text_search_service is None:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro interno: serviço de busca textual indisponível.")
+
+    data = req.data or {}
+    user_query = data.get("query")
+    if not user_query or not isinstance(user_query, str):
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message="O parâmetro 'query' (string) é obrigatório.")
+
+    try:
+        results = bible_text_search_service.search_bible_text(
+            user_query,
+            translation=data.get("translation") or "nvi",
+            top_k=data.get("topK", bible_text_search_service.DEFAULT_TOP_K),
+            book_abbrev=data.get("book"),
+            phrase=bool(data.get("phrase")),
+        )
+        return {"results": results}
+    except ValueError as ve:
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT, message=str(ve))
+    except Exception as e:
+        print(f"Erro em searchBibleText: {e}")
+        traceback.print_exc()
+        raise https_fn.HttpsError(code=https_fn.FunctionsErrorCode.INTERNAL, message="Erro ao realizar a busca textual.")
@@ -0,0 +1,210 @@
+# functions/morphology_features.py
+import os
+import re
+import json
+import numpy as np
+from unidecode import unidecode
+
+# Traços morfológicos do interlinear como máscaras de bits. Cada código da morph_table do
+# interlinear_store (grego: descrições em português como "Verbo Aoristo Imperativo Ativo 2S";
+# hebraico/aramaico: códigos OSHB como "HC/Vqw3ms") vira um conjunto de pares (categoria, valor),
+# e cada par ocupa um bit. Um filtro ("modo=imperativo e tempo=aoristo") é avaliado uma vez sobre a
+# tabela de códigos (poucos milhares de linhas) e depois aplicado às palavras com um gather.
+#
+# Categorias: classe, tempo, modo, voz, caso, numero, genero, pessoa, estado (hebraico: absoluto,
+# construto, determinado), tronco (hebraico: qal, niphal...), forma (hebraico: qatal, wayyiqtol...),
+# tipo (subtipo: pessoal, relativo, proprio...). Valores em minúsculas e sem acento.
+# Descrições ambíguas ("Nominativo/Acusativo") ligam todos os valores possíveis.
+
+FEATURES_FILE_NAME = "morph_features.npy"
+FEATURES_VOCABULARY_FILE_NAME = "morph_features.json"
+CATEGORIES = ["classe", "tempo", "modo", "voz", "caso", "numero", "genero", "pessoa", "estado", "tronco", "forma", "tipo"]
+
+# --- Grego (descrições em português, com algumas em inglês no meio dos dados) ---
+_GREEK_TOKENS = {
+    "verbo": [("classe", "verbo")], "verbal": [("classe", "verbo")],
+    "participio": [("classe", "verbo"), ("modo", "participio")],
+    "substantivo": [("classe", "substantivo")], "nome": [("classe", "substantivo")],
+    "adjetivo": [("classe", "adjetivo")], "adjective": [("classe", "adjetivo")],
+    "pronome": [("classe", "pronome")], "pronoun": [("classe", "pronome")],
+    "artigo": [("classe", "artigo")],
+    "adverbio": [("classe", "adverbio")], "adverb": [("classe", "adverbio")],
+    "conjuncao": [("classe", "conjuncao")], "preposicao": [("classe", "preposicao")],
+    "particula": [("classe", "particula")], "particle": [("classe", "particula")],
+    "interjeicao": [("classe", "interjeicao")], "numeral": [("classe", "numeral")],
+    "presente": [("tempo", "presente")], "imperfeito": [("tempo", "imperfeito")], "imperfect": [("tempo", "imperfeito")],
+    "futuro": [("tempo", "futuro")], "aoristo": [("tempo", "aoristo")], "perfeito": [("tempo", "perfeito")],
+    "mais-que-perfeito": [("tempo", "mais_que_perfeito")], "plusquamperfeito": [("tempo", "mais_que_perfeito")],
+    "pluperfeito": [("tempo", "mais_que_perfeito")],
+    "indicativo": [("modo", "indicativo")], "subjuntivo": [("modo", "subjuntivo")], "subjunctive": [("modo", "subjuntivo")],
+    "optativo": [("modo", "optativo")], "imperativo": [("modo", "imperativo")], "infinitivo": [("modo", "infinitivo")],
+    "ativo": [("voz", "ativa")], "medio": [("voz", "media")], "passivo": [("voz", "passiva")],
+    "depoente": [("voz", "depoente")],
+    "nominativo": [("caso", "nominativo")], "nominative": [("caso", "nominativo")], "genitivo": [("caso", "genitivo")],
+    "dativo": [("caso", "dativo")], "acusativo": [("caso", "acusativo")], "vocativo": [("caso", "vocativo")],
+    "singular": [("numero", "singular")], "plural": [("numero", "plural")], "dual": [("numero", "dual")],
+    "masculino": [("genero", "masculino")], "feminino": [("genero", "feminino")], "neutro": [("genero", "neutro")],
+    "neutra": [("genero", "neutro")], "neuter": [("genero", "neutro")], "comum": [("genero", "comum")],
+    "pessoal": [("tipo", "pessoal")], "relativo": [("tipo", "relativo")], "relative": [("tipo", "relativo")],
+    "demonstrativo": [("tipo", "demonstrativo")], "interrogativo": [("tipo", "interrogativo")],
+    "indefinido": [("tipo", "indefinido")], "reflexivo": [("tipo", "reflexivo")], "possessivo": [("tipo", "possessivo")],
+    "reciproco": [("tipo", "reciproco")], "proprio": [("tipo", "proprio")], "negativo": [("tipo", "negativo")],
+    "comparativo": [("tipo", "comparativo")], "superlativo": [("tipo", "superlativo")],
+    "indeclinavel": [("tipo", "indeclinavel")],
+}
+_GREEK_PERSON_NUMBER = re.compile(r"^([123])([spc])$")
+_GREEK_PERSON = re.compile(r"^([123])(?:a|o)?$")
+_GREEK_NUMBER_SUFFIX = {"s": "singular", "p": "plural"}
+
+
+def parse_greek_morph(morph: str) -> set[tuple[str, str]]:
+    features = set()
+    normalized = unidecode(morph or "").lower().replace("(", " ").replace(")", " ").replace(",", " ")
+    for token in normalized.split():
+        alternatives = [token] if token in _GREEK_TOKENS else re.split(r"[/-]", token)
+        for alternative in alternatives:
+            if alternative in _GREEK_TOKENS:
+                features.update(_GREEK_TOKENS[alternative])
+                continue
+            person_number = _GREEK_PERSON_NUMBER.match(alternative)
+            if person_number:
+                features.add(("pessoa", person_number.group(1)))
+                if person_number.group(2) in _GREEK_NUMBER_SUFFIX:
+                    features.add(("numero", _GREEK_NUMBER_SUFFIX[person_number.group(2)]))
+                continue
+            person = _GREEK_PERSON.match(alternative)
+            if person:
+                features.add(("pessoa", person.group(1)))
+    return features
+
+
+# --- Hebraico/aramaico (códigos OSHB: idioma + morfemas separados por '/') ---
+_OSHB_HEBREW_STEMS = {
+    "q": "qal", "N": "niphal", "p": "piel", "P": "pual", "h": "hiphil", "H": "hophal", "t": "hithpael",
+    "o": "polel", "O": "polal", "r": "hithpolel", "m": "poel", "M": "poal", "k": "palel", "K": "pulal",
+    "Q": "qal_passivo", "l": "pilpel", "L": "polpal", "f": "hithpalpel", "D": "nithpael", "j": "pealal",
+    "i": "pilel", "u": "hothpaal", "c": "tiphil", "v": "hishtaphel", "w": "nithpalel", "y": "nithpoel", "z": "hithpoel",
+}
+_OSHB_ARAMAIC_STEMS = {
+    "q": "peal", "Q": "peil", "u": "hithpeel", "p": "pael", "P": "ithpaal", "M": "hithpaal", "a": "aphel",
+    "h": "haphel", "s": "saphel", "e": "shaphel", "H": "hophal", "i": "ithpeel", "t": "hishtaphel",
+    "v": "ishtaphel", "w": "hithaphel", "o": "polel", "z": "ithpoel", "r": "hithpolel", "f": "hithpalpel",
+    "b": "hephal", "c": "tiphel", "m": "poel", "l": "palpel", "L": "ithpalpel", "O": "ithpolel", "G": "ittaphal",
+}
+_OSHB_VERB_FORMS = {
+    "p": [("forma", "qatal"), ("tempo", "perfeito")],
+    "q": [("forma", "weqatal"), ("tempo", "perfeito")],
+    "i": [("forma", "yiqtol"), ("tempo", "imperfeito")],
+    "w": [("forma", "wayyiqtol"), ("tempo", "imperfeito")],
+    "h": [("modo", "coortativo")], "j": [("modo", "jussivo")], "v": [("modo", "imperativo")],
+    "r": [("modo", "participio"), ("voz", "ativa")], "s": [("modo", "participio"), ("voz", "passiva")],
+    "a": [("modo", "infinitivo"), ("forma", "infinitivo_absoluto")],
+    "c": [("modo", "infinitivo"), ("forma", "infinitivo_construto")],
+}
+_OSHB_CLASSES = {
+    "A": "adjetivo", "C": "conjuncao", "D": "adverbio", "N": "substantivo", "P": "pronome",
+    "R": "preposicao", "S": "sufixo", "T": "particula", "V": "verbo",
+}
+_OSHB_TYPES = {
+    "A": {"a": "adjetivo", "c": "cardinal", "g": "gentilico", "o": "ordinal"},
+    "N": {"c": "comum", "g": "gentilico", "p": "proprio", "x": "desconhecido"},
+    "P": {"d": "demonstrativo", "f": "indefinido", "i": "interrogativo", "p": "pessoal", "r": "relativo"},
+    "S": {"d": "direcional", "h": "he_paragogico", "n": "nun_paragogico", "p": "pronominal"},
+    "T": {"a": "afirmacao", "d": "artigo", "e": "exortacao", "i": "interrogativo", "j": "interjeicao",
+          "m": "demonstrativo", "n": "negativo", "o": "objeto_direto", "r": "relativo"},
+}
+_OSHB_PERSONS = {"1": "1", "2": "2", "3": "3"}
+_OSHB_GENDERS = {"m": ["masculino"], "f": ["feminino"], "c": ["comum"], "b": ["masculino", "feminino"]}
+_OSHB_NUMBERS = {"s": "singular", "p": "plural", "d": "dual"}
+_OSHB_STATES = {"a": "absoluto", "c": "construto", "d": "determinado"}
+
+
+def _parse_oshb_gender_number_state(code: str, features: set, with_person: bool) -> None:
+    position = 0
+    if with_person and position < len(code) and code[position] in _OSHB_PERSONS:
+        features.add(("pessoa", _OSHB_PERSONS[code[position]]))
+        position += 1
+    if position < len(code) and code[position] in _OSHB_GENDERS:
+        features.update(("genero", gender) for gender in _OSHB_GENDERS[code[position]])
+        position += 1
+    if position < len(code) and code[position] in _OSHB_NUMBERS:
+        features.add(("numero", _OSHB_NUMBERS[code[position]]))
+        position += 1
+    if position < len(code) and code[position] in _OSHB_STATES:
+        features.add(("estado", _OSHB_STATES[code[position]]))
+
+
+def parse_oshb_morph(morph: str) -> set[tuple[str, str]]:
+    """
+    Traços do morfema principal (o último que não é sufixo: em "HC/Vqw3ms", o verbo; em "HR/Sp3mp",
+    a preposição). Prefixos e sufixos não entram, para que "substantivo construto" não case com o 'C/'.
+    """
+    features = set()
+    if not morph or morph[0] not in "HA":
+        return features
+    stems = _OSHB_ARAMAIC_STEMS if morph[0] == "A" else _OSHB_HEBREW_STEMS
+    segments = [segment for segment in morph[1:].split("/") if segment]
+    main_segments = [segment for segment in segments if not segment.startswith("S")] or segments
+    if not main_segments:
+        return features
+    main = main_segments[-1]
+    word_class = main[0]
+    if word_class in _OSHB_CLASSES:
+        features.add(("classe", _OSHB_CLASSES[word_class]))
+    if word_class == "V":
+        if len(main) > 1 and main[1] in stems:
+            features.add(("tronco", stems[main[1]]))
+        if len(main) > 2 and main[2] in _OSHB_VERB_FORMS:
+            features.update(_OSHB_VERB_FORMS[main[2]])
+            # Particípios e infinitivos não têm pessoa; o código segue com gênero/número/estado
+            _parse_oshb_gender_number_state(main[3:], features, with_person=main[2] not in "rsac")
+    elif word_class in ("N", "A"):
+        if len(main) > 1 and main[1] in _OSHB_TYPES[word_class]:
+            features.add(("tipo", _OSHB_TYPES[word_class][main[1]]))
+        _parse_oshb_gender_number_state(main[2:], features, with_person=False)
+    elif word_class in ("P", "T", "S"):
+        if len(main) > 1 and main[1] in _OSHB_TYPES[word_class]:
+            features.add(("tipo", _OSHB_TYPES[word_class][main[1]]))
+        _parse_oshb_gender_number_state(main[2:], features, with_person=True)
+    elif word_class == "R" and main[1:2] == "d":
+        features.add(("tipo", "artigo"))
+    return features
+
+
+def parse_morph(language: str, morph: str) -> set[tuple[str, str]]:
+    return parse_oshb_morph(morph) if language == "hebrew" else parse_greek_morph(morph)
+
+
+def build_feature_table(morph_table: list[str], language: str) -> tuple[np.ndarray, list[list[str]]]:
+    """
+    Retorna (máscaras, vocabulário): máscaras[i] é um vetor uint64 (várias palavras de 64 bits, se
+    necessário) com os traços de morph_table[i]; vocabulário[bit] = [categoria, valor].
+    """
+    parsed = [parse_morph(language, morph) for morph in morph_table]
+    vocabulary = sorted({feature for features in parsed for feature in features}, key=lambda f: (CATEGORIES.index(f[0]) if f[0] in CATEGORIES else len(CATEGORIES), f[1]))
+    bit_by_feature = {feature: bit for bit, feature in enumerate(vocabulary)}
+    masks = np.zeros((len(morph_table), max(1, (len(vocabulary) + 63) // 64)), dtype=np.uint64)
+    for row, features in enumerate(parsed):
+        for feature in features:
+            bit = bit_by_feature[feature]
+            masks[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    return masks, [list(feature) for feature in vocabulary]
+
+
+def write_feature_table(store_dir: str, morph_table: list[str], language: str) -> None:
+    """Grava as máscaras ao lado das colunas do interlinear (chamado no build_bible_data.py)."""
+    masks, vocabulary = build_feature_table(morph_table, language)
+    np.save(os.path.join(store_dir, FEATURES_FILE_NAME), masks)
+    with open(os.path.join(store_dir, FEATURES_VOCABULARY_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, ensure_ascii=False)
+    print(f"MorphologyFeatures: '{language}' {len(morph_table)} códigos, {len(vocabulary)} traços.")
+
+
+def load_feature_table(store_dir: str, morph_table: list[str], language: str) -> tuple[np.ndarray, list[list[str]]]:
+    """Máscaras pré-compiladas, ou calculadas na hora se o build for anterior a elas."""
+    masks_path = os.path.join(store_dir, FEATURES_FILE_NAME)
+    vocabulary_path = os.path.join(store_dir, FEATURES_VOCABULARY_FILE_NAME)
+    if os.path.exists(masks_path) and os.path.exists(vocabulary_path):
+        with open(vocabulary_path, "r", encoding="utf-8") as f:
+            return np.load(masks_path), json.load(f)
+    return build_feature_table(morph_table, language)
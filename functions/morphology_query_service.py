@@ -0,0 +1,190 @@
+# functions/morphology_query_service.py
+import threading
+import numpy as np
+from unidecode import unidecode
+import bible_data
+import strongs_lexicon
+import morphology_features
+
+# Consultas morfológicas sobre o interlinear colunar: "verbos no aoristo imperativo em Mateus",
+# "G3056 no nominativo", "H430 em Gênesis 1-11". O filtro de traços é avaliado com operações de bits
+# sobre a tabela de códigos morfológicos (morphology_features) e aplicado às palavras com um gather;
+# Strong e intervalo de livro/capítulos viram fatias e comparações vetorizadas sobre as colunas.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+LANGUAGES = ["greek", "hebrew"]
+
+_feature_tables: dict[str, tuple[np.ndarray, dict[tuple[str, str], int]]] = {}
+_feature_tables_lock = threading.Lock()
+
+
+def _get_feature_table(language: str, store) -> tuple[np.ndarray, dict[tuple[str, str], int]]:
+    """(máscaras por código morfológico, {(categoria, valor): bit}), carregados uma vez por instância."""
+    table = _feature_tables.get(language)
+    if table is None:
+        with _feature_tables_lock:
+            table = _feature_tables.get(language)
+            if table is None:
+                masks, vocabulary = morphology_features.load_feature_table(store.path, store.morph_table, language)
+                table = (masks, {(category, value): bit for bit, (category, value) in enumerate(vocabulary)})
+                _feature_tables[language] = table
+    return table
+
+
+def _normalize_feature_value(value) -> str:
+    return unidecode(str(value)).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _morph_filter(masks: np.ndarray, bit_by_feature: dict, features: dict | None) -> np.ndarray | None:
+    """
+    Vetor booleano sobre a tabela de códigos: para cada categoria, o código precisa ter ao menos um
+    dos valores pedidos (OU dentro da categoria, E entre categorias). None = sem filtro.
+    Levanta ValueError para categorias desconhecidas.
+    """
+    if not features:
+        return None
+    allowed = np.ones(len(masks), dtype=bool)
+    for category, values in features.items():
+        category = _normalize_feature_value(category)
+        if category not in morphology_features.CATEGORIES:
+            raise ValueError(f"Categoria morfológica desconhecida: '{category}'. Use uma de: {', '.join(morphology_features.CATEGORIES)}.")
+        values = values if isinstance(values, list) else [values]
+        category_mask = np.zeros(masks.shape[1], dtype=np.uint64)
+        for value in values:
+            bit = bit_by_feature.get((category, _normalize_feature_value(value)))
+            if bit is not None:
+                category_mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        # Valor que não existe nos dados não casa com nenhuma palavra (em vez de ser ignorado)
+        allowed &= np.any((masks & category_mask) != 0, axis=1)
+    return allowed
+
+
+def _word_range(store, book_abbrev: str | None, chapter_from: int | None, chapter_to: int | None) -> tuple[int, int]:
+    """Intervalo [início, fim) de palavras do livro/capítulos (o interlinear está em ordem canônica)."""
+    if not book_abbrev:
+        if chapter_from or chapter_to:
+            raise ValueError("Intervalo de capítulos exige o parâmetro 'book'.")
+        return 0, store.word_count
+    if store.book_index(book_abbrev) is None:
+        raise ValueError(f"Livro '{book_abbrev}' não faz parte do texto {store.language} do interlinear.")
+    first_chapter = int(chapter_from or 1)
+    last_chapter = int(chapter_to) if chapter_to else (first_chapter if chapter_from else None)
+    if first_chapter < 1 or (last_chapter is not None and last_chapter < first_chapter):
+        raise ValueError("Intervalo de capítulos inválido.")
+    # Busca binária nas chaves (livro, capítulo): o custo não depende do tamanho do intervalo pedido
+    first_verse, end_verse = store.chapters_verse_bounds(book_abbrev, first_chapter, last_chapter)
+    return int(store.verse_offsets[first_verse]), int(store.verse_offsets[end_verse])
+
+
+def query_morphology(
+    language: str | None = None,
+    features: dict | None = None,
+    strong: str | None = None,
+    book_abbrev: str | None = None,
+    chapter_from: int | None = None,
+    chapter_to: int | None = None,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    translation: str | None = None,
+) -> dict:
+    """
+    Ocorrências (palavra a palavra) que satisfazem todos os filtros, em ordem canônica e paginadas.
+    O idioma é deduzido do Strong ('G'/'H') ou do livro quando não informado.
+    translation inclui o texto do versículo nessa tradução. Levanta ValueError para filtros inválidos.
+    """
+    normalized_strong = None
+    if strong:
+        normalized_strong = strongs_lexicon.normalize_strong(strong)
+        if normalized_strong is None:
+            raise ValueError(f"Número de Strong inválido: '{strong}'. Use o formato 'G26' ou 'H430'.")
+    if book_abbrev:
+        book_abbrev = bible_data.resolve_book_abbrev(book_abbrev) or book_abbrev
+    if language is None:
+        if normalized_strong:
+            language = "greek" if normalized_strong.startswith("G") else "hebrew"
+        elif book_abbrev and bible_data.get_original_language(book_abbrev):
+            language = "greek" if bible_data.get_original_language(book_abbrev) == "greek_original" else "hebrew"
+    if language not in LANGUAGES:
+        raise ValueError("Informe 'language' ('greek' ou 'hebrew'), um 'strong' ou um 'book'.")
+    if normalized_strong and normalized_strong[0] != ("G" if language == "greek" else "H"):
+        raise ValueError(f"O Strong {normalized_strong} não pertence ao texto {language}.")
+    if not features and not normalized_strong and not book_abbrev:
+        raise ValueError("Informe ao menos um filtro: 'features', 'strong' ou 'book'.")
+    if not isinstance(page, int) or page < 1:
+        raise ValueError("O parâmetro 'page' deve ser um inteiro maior ou igual a 1.")
+    if not isinstance(page_size, int) or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"O parâmetro 'pageSize' deve estar entre 1 e {MAX_PAGE_SIZE}.")
+    if translation is not None and translation not in bible_data.TRANSLATIONS:
+        raise ValueError(f"Tradução não suportada: {translation}")
+
+    store = bible_data.get_interlinear_store(language)
+    if store is None:
+        raise RuntimeError("Interlinear compilado indisponível (execute build_bible_data.py).")
+    masks, bit_by_feature = _get_feature_table(language, store)
+    allowed_morphs = _morph_filter(masks, bit_by_feature, features)
+
+    start, end = _word_range(store, book_abbrev, chapter_from, chapter_to)
+    selected = np.ones(end - start, dtype=bool)
+    if normalized_strong:
+        number = int(normalized_strong[1:])
+        selected &= (store.strong[start:end] == number) | (store.strong_extra[start:end] == number)
+    if allowed_morphs is not None:
+        selected &= allowed_morphs[store.morph[start:end]]
+    word_indices = np.flatnonzero(selected) + start
+
+    # Versículo de cada palavra encontrada: busca binária nos offsets (em vez de um array por palavra)
+    verse_indices = np.searchsorted(store.verse_offsets, word_indices, side="right") - 1
+    verse_book_indices = np.asarray(store.verse_refs[verse_indices, 0], dtype=np.int64)
+    counts = np.bincount(verse_book_indices, minlength=len(store.book_order))
+    counts_by_book = [
+        {
+            "livro_curto": store.book_order[book_index],
+            "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(store.book_order[book_index], store.book_order[book_index]),
+            "ocorrencias": int(counts[book_index]),
+        }
+        for book_index in np.flatnonzero(counts).tolist()
+    ]
+
+    page_slice = slice((page - 1) * page_size, page * page_size)
+    page_words, page_verses = word_indices[page_slice], verse_indices[page_slice]
+    page_texts = store.word_texts(store.text[page_words])
+    results = []
+    for word_index, verse_index, word_text in zip(page_words.tolist(), page_verses.tolist(), page_texts):
+        verse_book, chapter, verse = store.verse_ref(verse_index)
+        strong_value = " ".join(store.format_strong(n) for n in (int(store.strong[word_index]), int(store.strong_extra[word_index])) if n)
+        result = {
+            "livro_curto": verse_book,
+            "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(verse_book, verse_book),
+            "capitulo": chapter,
+            "versiculo": verse,
+            "palavra": word_text,
+            "strong": strong_value,
+            "morfologia": store.morph_table[int(store.morph[word_index])],
+        }
+        if translation:
+            result["texto"], result["versificacaoDivergente"] = bible_data.get_interlinear_verse_text(store, translation, verse_book, chapter, verse)
+        results.append(result)
+
+    return {
+        "language": language,
+        "total": len(word_indices),
+        "totalVersiculos": int(len(np.unique(verse_indices))),
+        "contagemPorLivro": counts_by_book,
+        "page": page,
+        "pageSize": page_size,
+        "hasMore": page * page_size < len(word_indices),
+        "results": results,
+    }
+
+
+def get_feature_vocabulary(language: str) -> dict[str, list[str]]:
+    """Valores disponíveis por categoria (para montar os filtros no app)."""
+    store = bible_data.get_interlinear_store(language)
+    if store is None:
+        return {}
+    _, bit_by_feature = _get_feature_table(language, store)
+    vocabulary: dict[str, list[str]] = {}
+    for category, value in bit_by_feature:
+        vocabulary.setdefault(category, []).append(value)
+    return vocabulary
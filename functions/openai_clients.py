@@ -0,0 +1,60 @@
+# functions/openai_clients.py
+import os
+import asyncio
+import weakref
+import httpx
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient
+
+# Cliente AsyncOpenAI compartilhado pelos serviços. As chamadas são nativamente assíncronas
+# (sem asyncio.to_thread), então fan-outs com asyncio.gather não disputam o pool de threads padrão.
+
+# --- Configurações do pool (podem ser ajustadas por variável de ambiente) ---
+OPENAI_POOL_MAX_CONNECTIONS = int(os.environ.get("OPENAI_POOL_MAX_CONNECTIONS", "50"))
+OPENAI_POOL_MAX_KEEPALIVE = int(os.environ.get("OPENAI_POOL_MAX_KEEPALIVE", "20"))
+OPENAI_POOL_KEEPALIVE_EXPIRY = float(os.environ.get("OPENAI_POOL_KEEPALIVE_EXPIRY", "120"))
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get("OPENAI_TIMEOUT_SECONDS", "60"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "2"))
+
+# Um cliente por event loop: as conexões do httpx ficam presas ao loop que as abriu.
+_async_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_sync_client = None
+
+
+def _load_openai_api_key() -> str:
+    openai_api_key = os.environ.get("openai-api-key")
+    if not openai_api_key:
+        print("ERRO CRÍTICO (OpenAIClients): Variável de ambiente/secret 'openai-api-key' não configurada ou não acessível.")
+        raise ValueError("Configuração da API OpenAI ausente (secret 'openai-api-key').")
+    return openai_api_key
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Retorna o cliente AsyncOpenAI do event loop atual, criando-o (e o seu pool) na primeira chamada."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients_by_loop.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=_load_openai_api_key(),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=OPENAI_POOL_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+            ),
+        )
+        _async_clients_by_loop[loop] = client
+        print(f"OpenAIClients: Cliente AsyncOpenAI inicializado (max_connections={OPENAI_POOL_MAX_CONNECTIONS}).")
+    return client
+
+
+def get_sync_client() -> OpenAI:
+    """Cliente síncrono para os handlers de main.py que ainda chamam a OpenAI fora de um event loop."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = OpenAI(api_key=_load_openai_api_key(), max_retries=OPENAI_MAX_RETRIES)
+        print("OpenAIClients: Cliente OpenAI síncrono inicializado.")
+    return _sync_client
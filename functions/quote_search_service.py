@@ -2,81 +2,67 @@
 
 import os
 import traceback
-from openai import OpenAI
-import httpx
+import openai_clients
 import asyncio
+import vector_search_client
+import embedding_cache
+import embedding_batcher
+import local_vector_index
+import search_result_cache
 
 # --- Configurações ---
 # !!! ATENÇÃO: Verifique se este é o endpoint correto do seu índice de FRASES !!!
 PINECONE_ENDPOINT_QUOTES = "https://septima-quotes-hqija7a.svc.aped-4627-b74a.pinecone.io" 
 EMBEDDING_MODEL = "text-embedding-3-small"
-
-# Clientes globais
-_openai_client_quotes = None
-_pinecone_api_key_quotes_loaded = None
+PINECONE_TIMEOUT_SECONDS = 10.0
+# Backend vetorial: "pinecone" (padrão) ou "local" (snapshot em memória gerado por export_vector_snapshot.py)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND_QUOTES", "pinecone")
+LOCAL_SNAPSHOT_NAME = "frases"
 
 def _initialize_quote_clients():
-    """Inicializa clientes de forma preguiçosa para a busca de frases."""
-    global _openai_client_quotes, _pinecone_api_key_quotes_loaded
+    """Inicializa (de forma preguiçosa) e retorna o cliente AsyncOpenAI compartilhado."""
+    return openai_clients.get_async_client()
 
-    if _openai_client_quotes and _pinecone_api_key_quotes_loaded:
-        return
+async def _generate_embedding_async(text_to_embed: str) -> list[float]:
+    return await embedding_cache.get_or_create_embedding_async(text_to_embed, EMBEDDING_MODEL, _create_embedding_async)
 
-    if _openai_client_quotes is None:
-        openai_api_key = os.environ.get("openai-api-key")
-        if not openai_api_key:
-            raise ValueError("Secret 'openai-api-key' não configurado.")
-        _openai_client_quotes = OpenAI(api_key=openai_api_key)
-        print("QuoteSearchService: Cliente OpenAI inicializado.")
-    
-    if _pinecone_api_key_quotes_loaded is None:
-        _pinecone_api_key_quotes_loaded = os.environ.get("pinecone-api-key")
-        if not _pinecone_api_key_quotes_loaded:
-            raise ValueError("Secret 'pinecone-api-key' não configurado.")
-        print("QuoteSearchService: Chave API do Pinecone carregada.")
 
-async def _generate_embedding_async(text_to_embed: str) -> list[float]:
+async def _create_embedding_async(text_to_embed: str) -> list[float]:
     _initialize_quote_clients()
     try:
-        response = await asyncio.to_thread(
-            _openai_client_quotes.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=text_to_embed
-        )
-        return response.data[0].embedding
+        return await embedding_batcher.embed_text_async(text_to_embed, EMBEDDING_MODEL)
     except Exception as e:
         print(f"QuoteSearchService: Erro na geração de embedding: {e}")
         raise
 
 async def _query_pinecone_quotes_async(vector: list[float], top_k: int) -> list[dict]:
-    _initialize_quote_clients()
-    pinecone_api_key = _pinecone_api_key_quotes_loaded
-
-    request_url = f"{PINECONE_ENDPOINT_QUOTES}/query"
-    headers = { "Api-Key": pinecone_api_key, "Content-Type": "application/json" }
-    payload = {
-        "vector": vector, "topK": top_k,
-        "includeMetadata": True, "includeValues": False
-    }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(request_url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json().get("matches", [])
-        except Exception as e:
-            print(f"QuoteSearchService: Erro na consulta ao Pinecone: {e}")
-            raise
+    """Consulta o índice 'septima-quotes' (snapshot local, se configurado, ou Pinecone via pool compartilhado)."""
+    if VECTOR_BACKEND == "local":
+        local_matches = local_vector_index.query(LOCAL_SNAPSHOT_NAME, vector, top_k)
+        if local_matches is not None:
+            return local_matches
+        print("QuoteSearchService: Snapshot local indisponível, consultando o Pinecone.")
+    try:
+        return await vector_search_client.query_async(
+            PINECONE_ENDPOINT_QUOTES, vector, top_k, timeout=PINECONE_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        print(f"QuoteSearchService: Erro na consulta ao Pinecone: {e}")
+        raise
 
-async def perform_quote_search_async(user_query: str, top_k: int = 30) -> list[dict]:
-    """Orquestra a busca: gera embedding e consulta o Pinecone."""
+async def perform_quote_search_async(user_query: str, top_k: int = 30, query_vector: list[float] | None = None) -> list[dict]:
+    """Orquestra a busca: gera embedding (ou usa 'query_vector', se fornecido) e consulta o Pinecone."""
     if not user_query:
         raise ValueError("A query do usuário não pode ser vazia.")
     
     try:
         print(f"QuoteSearchService: Buscando frases para a query: '{user_query}'")
-        query_vector = await _generate_embedding_async(user_query)
-        search_results = await _query_pinecone_quotes_async(query_vector, top_k)
+        async def _search_uncached() -> list[dict]:
+            vector = query_vector if query_vector is not None else await _generate_embedding_async(user_query)
+            return await _query_pinecone_quotes_async(vector, top_k)
+
+        cache_key = search_result_cache.make_key(user_query, None, top_k)
+        search_results = await search_result_cache.get_or_compute_async("frases", cache_key, _search_uncached)
         
         # Formata os resultados para enviar de volta ao cliente
         formatted_results = []
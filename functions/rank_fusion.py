@@ -0,0 +1,58 @@
+# functions/rank_fusion.py
+import numpy as np
+
+# Fusão de rankings (ex: busca vetorial + BM25) sobre o conjunto de candidatos, vetorizada com NumPy:
+# cada ranking vira uma coluna de uma matriz (candidatos x rankings) de posições ou de pontuações.
+
+RRF_K = 60  # Constante usual da Reciprocal Rank Fusion (Cormack et al.)
+
+
+def _candidate_matrix(rankings: list[list[str]], values: list[list[float]] | None) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """(chaves dos candidatos, posições [inf = ausente], valores [nan = ausente]) com uma coluna por ranking."""
+    keys = list(dict.fromkeys(key for ranking in rankings for key in ranking))
+    row_by_key = {key: row for row, key in enumerate(keys)}
+    ranks = np.full((len(keys), len(rankings)), np.inf)
+    scores = np.full((len(keys), len(rankings)), np.nan)
+    for column, ranking in enumerate(rankings):
+        seen = set()
+        for position, key in enumerate(ranking):
+            if key in seen:  # Chave repetida no mesmo ranking: vale a melhor posição
+                continue
+            seen.add(key)
+            ranks[row_by_key[key], column] = position
+            if values is not None:
+                scores[row_by_key[key], column] = values[column][position]
+    return keys, ranks, scores
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], weights: list[float] | None = None, k: int = RRF_K) -> list[tuple[str, float]]:
+    """RRF: soma de peso / (k + posição) em cada ranking (posição a partir de 1). Ordenado do maior ao menor."""
+    keys, ranks, _ = _candidate_matrix(rankings, None)
+    if not keys:
+        return []
+    weight_vector = np.asarray(weights if weights is not None else [1.0] * len(rankings), dtype=np.float64)
+    fused = (weight_vector / (k + ranks + 1.0)).sum(axis=1)  # ausente: 1/inf = 0
+    order = np.argsort(-fused, kind="stable")
+    return [(keys[row], float(fused[row])) for row in order]
+
+
+def weighted_score_fusion(rankings: list[list[str]], scores: list[list[float]], weights: list[float] | None = None) -> list[tuple[str, float]]:
+    """
+    Combinação linear das pontuações normalizadas (min-max por ranking, ausente = 0).
+    Útil quando as pontuações têm escalas diferentes (cosseno x BM25). Ordenado do maior ao menor.
+    """
+    keys, _, score_matrix = _candidate_matrix(rankings, scores)
+    if not keys:
+        return []
+    missing = np.isnan(score_matrix)
+    column_min = np.where(missing, np.inf, score_matrix).min(axis=0)
+    column_max = np.where(missing, -np.inf, score_matrix).max(axis=0)
+    has_spread = column_max > column_min
+    spread = np.where(has_spread, column_max - column_min, 1.0)
+    # Ranking com uma única pontuação distinta: todos os seus candidatos valem 1
+    normalized = np.where(has_spread, (score_matrix - np.where(has_spread, column_min, 0.0)) / spread, 1.0)
+    normalized[missing] = 0.0
+    weight_vector = np.asarray(weights if weights is not None else [1.0] * len(rankings), dtype=np.float64)
+    fused = normalized @ weight_vector
+    order = np.argsort(-fused, kind="stable")
+    return [(keys[row], float(fused[row])) for row in order]
@@ -0,0 +1,155 @@
+# functions/scripture_reference_parser.py
+import re
+import unicodedata
+from functools import lru_cache
+import bible_data
+
+# Reconhece referências bíblicas diretas ("jo 3:16", "Romanos 8", "sl 23.1-4", "1º samuel 3:1,5-7")
+# para que a busca bíblica as resolva localmente, sem embedding nem consulta ao Pinecone.
+# Os nomes de livros vêm de book_variations_map_search.json + ABBREV_TO_FULL_NAME_MAP e ficam
+# numa trie (compilada uma vez por instância): a leitura do nome é uma única passada pela query,
+# sempre preferindo o nome mais longo ("1 joão" antes de "1", "joão" antes de "jo").
+
+_TRIE_TERMINAL = "$"
+# Depois do nome do livro: capítulo, opcionalmente seguido de ':' ou '.' e a seleção de versículos
+_CHAPTER_AND_VERSES_PATTERN = re.compile(r"^\s*(\d{1,3})(?:\s*[:.]\s*(\d{1,3}(?:\s*[-–]\s*\d{1,3})?(?:\s*,\s*\d{1,3}(?:\s*[-–]\s*\d{1,3})?)*))?\s*$")
+_VERSE_PART_PATTERN = re.compile(r"^(\d+)(?:\s*[-–]\s*(\d+))?$")
+# Maior capítulo da Bíblia (Salmo 119): teto das seleções quando o tamanho do capítulo não é informado.
+# A seleção vem do cliente; sem teto, "1-10000000" expandiria milhões de números.
+MAX_VERSE_NUMBER = 176
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas, Unicode NFC e espaços colapsados. Acentos são mantidos ('jó' ≠ 'jo')."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+@lru_cache(maxsize=1)
+def _get_book_trie() -> dict:
+    aliases = {_normalize(alias): abbrev for alias, abbrev in bible_data.load_book_aliases().items()}
+    for abbrev, full_name in bible_data.ABBREV_TO_FULL_NAME_MAP.items():
+        aliases.setdefault(_normalize(full_name), abbrev)
+        aliases.setdefault(abbrev, abbrev)
+
+    trie: dict = {}
+    for alias, abbrev in aliases.items():
+        node = trie
+        for char in alias:
+            node = node.setdefault(char, {})
+        node[_TRIE_TERMINAL] = abbrev
+    return trie
+
+
+def _match_book_prefix(normalized_query: str) -> tuple[str, int] | None:
+    """Maior nome de livro no início da query que termina em fronteira (espaço, dígito ou fim)."""
+    node = _get_book_trie()
+    best_match = None
+    for position, char in enumerate(normalized_query):
+        node = node.get(char)
+        if node is None:
+            break
+        if _TRIE_TERMINAL in node:
+            end = position + 1
+            if end == len(normalized_query) or normalized_query[end] == " " or normalized_query[end].isdigit():
+                best_match = (node[_TRIE_TERMINAL], end)
+    return best_match
+
+
+def parse_verse_selection(verses_str: str, max_verse: int = MAX_VERSE_NUMBER) -> list[int]:
+    """
+    Converte uma seleção de versículos em números ordenados e sem repetição:
+    "16" -> [16], "1-5" -> [1..5], "1,3,5-7" -> [1, 3, 5, 6, 7]. Levanta ValueError se inválida.
+    Números acima de max_verse (ex: o tamanho do capítulo) são descartados antes da expansão.
+    """
+    max_verse = min(max_verse, MAX_VERSE_NUMBER)
+    verse_numbers: set[int] = set()
+    for part in str(verses_str).split(","):
+        match = _VERSE_PART_PATTERN.match(part.strip())
+        if not match:
+            raise ValueError(f"Seleção de versículos inválida: '{verses_str}'")
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        if start <= 0 or end < start:
+            raise ValueError(f"Intervalo de versículos inválido: '{part.strip()}'")
+        verse_numbers.update(range(start, min(end, max_verse) + 1))
+    return sorted(verse_numbers)
+
+
+def group_verse_runs(verse_numbers: list[int]) -> list[tuple[int, int]]:
+    """Agrupa números ordenados em trechos contíguos: [1, 2, 3, 5] -> [(1, 3), (5, 5)]."""
+    runs = []
+    for verse_number in verse_numbers:
+        if runs and verse_number == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], verse_number)
+        else:
+            runs.append((verse_number, verse_number))
+    return runs
+
+
+def parse_reference(user_query: str) -> dict | None:
+    """
+    Retorna {"book_abbrev", "chapter", "verses"} se a query inteira for uma referência válida
+    (livro + capítulo existente, versículos opcionais dentro do capítulo); caso contrário None.
+    'verses' é None quando a referência é ao capítulo inteiro.
+    """
+    if not user_query or not isinstance(user_query, str) or len(user_query) > 80:
+        return None
+    normalized_query = _normalize(user_query)
+    book_match = _match_book_prefix(normalized_query)
+    if book_match is None:
+        return None
+    book_abbrev, book_end = book_match
+
+    chapter_match = _CHAPTER_AND_VERSES_PATTERN.match(normalized_query[book_end:])
+    if not chapter_match:
+        return None
+    chapter = int(chapter_match.group(1))
+    chapter_count = bible_data.get_chapter_count(book_abbrev)
+    if not chapter_count or not 1 <= chapter <= chapter_count:
+        return None
+
+    verses = None
+    if chapter_match.group(2):
+        try:
+            verses = parse_verse_selection(chapter_match.group(2))
+        except ValueError:
+            return None
+        if not verses:
+            return None  # Todos os versículos acima de MAX_VERSE_NUMBER: não é uma referência válida
+    return {"book_abbrev": book_abbrev, "chapter": chapter, "verses": verses}
+
+
+def resolve_reference_results(reference: dict, translation: str = bible_data.DEFAULT_TRANSLATION) -> list[dict] | None:
+    """
+    Monta resultados no mesmo formato dos 'matches' da busca semântica (tipo 'biblia_versiculos'),
+    um por trecho contíguo de versículos, com o texto incluído em metadata['texto'].
+    Retorna None se o capítulo/versículos não existirem no texto empacotado.
+    """
+    book_abbrev, chapter = reference["book_abbrev"], reference["chapter"]
+    chapter_verses = bible_data.get_chapter_verses(translation, book_abbrev, chapter)
+    if not chapter_verses:
+        return None
+
+    verse_numbers = reference["verses"] or list(range(1, len(chapter_verses) + 1))
+    if verse_numbers[-1] > len(chapter_verses):
+        return None
+
+    results = []
+    for start, end in group_verse_runs(verse_numbers):
+        verses_label = str(start) if start == end else f"{start}-{end}"
+        results.append({
+            "id": f"{book_abbrev}_c{chapter}_v{verses_label}",
+            "score": 1.0,
+            "metadata": {
+                "tipo": "biblia_versiculos",
+                "livro_curto": book_abbrev,
+                "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(book_abbrev, book_abbrev.upper()),
+                "capitulo": chapter,
+                "versiculos": verses_label,
+                "testamento": (bible_data.load_abbrev_map().get(book_abbrev) or {}).get("testament"),
+                "texto": " ".join(f"{number} {chapter_verses[number - 1]}" for number in range(start, end + 1)),
+                "traducao": translation,
+                "referencia_direta": True,
+            },
+        })
+    return results
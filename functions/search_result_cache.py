@@ -0,0 +1,124 @@
+# functions/search_result_cache.py
+import copy
+import json
+import threading
+from cachetools import TTLCache
+from embedding_cache import normalize_text
+from singleflight import SingleFlight
+
+# Cache de resultados das buscas semânticas (LRU + TTL, um cache por índice).
+# A chave combina a query normalizada, os filtros canonizados e o topK, então uma query
+# popular repetida é atendida em microssegundos, sem embedding nem consulta ao Pinecone.
+#
+# Os índices de bíblia, sermões e frases são praticamente estáticos e usam TTLs longos.
+# O da comunidade muda a cada post criado/editado/excluído: TTL curto e invalidação explícita
+# (invalidate) chamada pelo community_search_service após upsert/delete. A invalidação é
+# local à instância; nas demais, o TTL curto limita o tempo de resultado desatualizado.
+#
+# Em caso de falha no cache, buscas idênticas que chegam ao mesmo tempo são coalescidas
+# (singleflight): apenas a primeira gera embedding e consulta o índice; as demais aguardam.
+
+INDEX_CACHE_SETTINGS = {
+    "biblia": {"ttl_seconds": 24 * 60 * 60, "max_entries": 2048},
+    "sermoes": {"ttl_seconds": 24 * 60 * 60, "max_entries": 1024},
+    "frases": {"ttl_seconds": 12 * 60 * 60, "max_entries": 1024},
+    "comunidade": {"ttl_seconds": 60, "max_entries": 256},
+}
+
+_caches = {
+    index_name: TTLCache(maxsize=settings["max_entries"], ttl=settings["ttl_seconds"])
+    for index_name, settings in INDEX_CACHE_SETTINGS.items()
+}
+_caches_lock = threading.Lock()
+_stats = {index_name: {"hits": 0, "misses": 0, "invalidations": 0} for index_name in INDEX_CACHE_SETTINGS}
+_search_flight = SingleFlight("busca semântica")
+# Incrementado a cada invalidação: resultados calculados antes dela não são gravados
+_generations = {index_name: 0 for index_name in INDEX_CACHE_SETTINGS}
+
+
+class Uncacheable:
+    """Resultado degradado (ex: um dos lados da busca híbrida falhou): é devolvido, mas não é guardado."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _canonicalize_filters(filters: dict | None) -> dict:
+    """Remove filtros nulos/vazios (como a busca bíblica faz antes de ir ao Pinecone)."""
+    if not filters or not isinstance(filters, dict):
+        return {}
+    return {key: value for key, value in filters.items() if value is not None and value != ""}
+
+
+def make_key(user_query: str, filters: dict | None = None, top_k: int | None = None, **extra) -> str:
+    """Monta a chave do cache: query normalizada + filtros canonizados + topK (+ parâmetros extras)."""
+    key_parts = {
+        "q": normalize_text(user_query),
+        "f": _canonicalize_filters(filters),
+        "k": top_k,
+    }
+    if extra:
+        key_parts["x"] = extra
+    return json.dumps(key_parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def get(index_name: str, cache_key: str):
+    with _caches_lock:
+        cached_value = _caches[index_name].get(cache_key)
+        if cached_value is None:
+            _stats[index_name]["misses"] += 1
+            return None
+        _stats[index_name]["hits"] += 1
+    # Cópia para que o chamador possa alterar o resultado sem corromper o cache
+    return copy.deepcopy(cached_value)
+
+
+def put(index_name: str, cache_key: str, value) -> None:
+    with _caches_lock:
+        _caches[index_name][cache_key] = copy.deepcopy(value)
+
+
+def invalidate(index_name: str) -> None:
+    """Descarta todos os resultados cacheados de um índice (ex: após upsert/delete na comunidade)."""
+    with _caches_lock:
+        _caches[index_name].clear()
+        _generations[index_name] += 1
+        _stats[index_name]["invalidations"] += 1
+
+
+async def get_or_compute_async(index_name: str, cache_key: str, compute):
+    """
+    Retorna o resultado cacheado ou executa 'compute()' (corrotina) e guarda o resultado.
+    Chamadas idênticas concorrentes compartilham uma única execução de 'compute()'. Se 'compute()'
+    retornar Uncacheable(valor), o valor é devolvido a todas elas sem ser guardado.
+    """
+    cached_value = get(index_name, cache_key)
+    if cached_value is not None:
+        print(f"SearchResultCache: HIT no índice '{index_name}'.")
+        return cached_value
+
+    async def _compute_and_store():
+        generation = _generations[index_name]
+        result = await compute()
+        if isinstance(result, Uncacheable):
+            return result.value
+        if _generations[index_name] == generation:
+            put(index_name, cache_key, result)
+        return result
+
+    result = await _search_flight.do(f"{index_name}:{cache_key}:{_generations[index_name]}", _compute_and_store)
+    # Todos os chamadores coalescidos recebem o mesmo objeto; cada um leva a sua cópia
+    return copy.deepcopy(result)
+
+
+def get_stats() -> dict:
+    with _caches_lock:
+        return {
+            index_name: {**index_stats, "entries": len(_caches[index_name])}
+            for index_name, index_stats in _stats.items()
+        }
+
+
+def get_singleflight_stats() -> dict:
+    """Métricas de coalescência: quantas buscas aguardaram uma execução idêntica já em voo."""
+    return _search_flight.get_stats()
@@ -1,9 +1,12 @@
 # functions/sermons_service.py
 import os
 import traceback
-from openai import OpenAI
-import httpx
+import openai_clients
 import asyncio
+import vector_search_client
+import embedding_cache
+import embedding_batcher
+import search_result_cache
 from collections import defaultdict
 
 # Reutilizar a configuração de clientes e as funções de embedding/query do Pinecone
@@ -14,58 +17,27 @@ from collections import defaultdict
 # --- Configuração (Copiar e adaptar de bible_search_service.py) ---
 PINECONE_ENDPOINT_SPURGEON = "https://spurgeonsermoes-hqija7a.svc.aped-4627-b74a.pinecone.io" # SEU ENDPOINT DO PINECONE PARA SERMÕES
 EMBEDDING_MODEL = "text-embedding-3-small" # Ou o modelo que você usou para indexar os sermões
-
-_openai_client_sermons = None
-_httpx_client_sermons = None
-_pinecone_api_key_sermons_loaded = None
-
-
+PINECONE_TIMEOUT_SECONDS = 15.0
 
 def _initialize_sermon_clients():
-    global _openai_client_sermons, _httpx_client_sermons, _pinecone_api_key_sermons_loaded
-    if _openai_client_sermons and _httpx_client_sermons and _pinecone_api_key_sermons_loaded:
-        return # Já inicializado
-
-    openai_api_key = os.environ.get("openai-api-key")
-    if not openai_api_key:
-        raise ValueError("Configuração da API OpenAI ausente (secret 'openai-api-key').")
+    """Cliente AsyncOpenAI compartilhado; também usado pelo chat_service para roteamento e respostas."""
     try:
-        _openai_client_sermons = OpenAI(api_key=openai_api_key)
-        print("Cliente OpenAI inicializado para SermonsService.")
+        return openai_clients.get_async_client()
     except Exception as e_openai_init:
         print(f"ERRO (SermonsService): Falha ao inicializar cliente OpenAI: {e_openai_init}")
-        _openai_client_sermons = None
         raise
 
-    if _httpx_client_sermons is None:
-        try:
-            _httpx_client_sermons = httpx.AsyncClient(timeout=30.0)
-            print("Cliente HTTPX inicializado para SermonsService.")
-        except Exception as e_httpx_init:
-            print(f"ERRO (SermonsService): Falha ao inicializar cliente HTTPX: {e_httpx_init}")
-            _httpx_client_sermons = None
-            raise
-    
-    if _pinecone_api_key_sermons_loaded is None:
-        _pinecone_api_key_sermons_loaded = os.environ.get("pinecone-api-key")
-        if not _pinecone_api_key_sermons_loaded:
-            raise ValueError("Configuração da API Pinecone ausente (secret 'pinecone-api-key').")
-        print("Chave API do Pinecone carregada para SermonsService.")
-
 async def _generate_sermon_embedding_async(text_to_embed: str) -> list[float]:
     _initialize_sermon_clients()
-    if not _openai_client_sermons:
-        raise ConnectionError("Falha na inicialização do cliente OpenAI para Sermons.")
     if not text_to_embed or not isinstance(text_to_embed, str):
         raise ValueError("Texto para embedding (sermão) inválido ou vazio.")
+    return await embedding_cache.get_or_create_embedding_async(text_to_embed, EMBEDDING_MODEL, _create_sermon_embedding_async)
+
+async def _create_sermon_embedding_async(text_to_embed: str) -> list[float]:
     try:
-        response = await asyncio.to_thread(
-            _openai_client_sermons.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=text_to_embed
-        )
-        if response.data and len(response.data) > 0 and hasattr(response.data[0], 'embedding') and response.data[0].embedding:
-            return response.data[0].embedding
+        embedding_vector = await embedding_batcher.embed_text_async(text_to_embed, EMBEDDING_MODEL)
+        if embedding_vector:
+            return embedding_vector
         else:
             raise ValueError("Resposta da API de embedding OpenAI (sermão) não contém dados válidos.")
     except Exception as e:
@@ -74,63 +46,46 @@ async def _generate_sermon_embedding_async(text_to_embed: str) -> list[float]:
         raise
 
 async def _query_pinecone_sermons_async(vector: list[float], top_k: int, filters: dict | None = None) -> list[dict]:
-    _initialize_sermon_clients()
-    
-    # --- INÍCIO DA CORREÇÃO ---
-    pinecone_api_key = _pinecone_api_key_sermons_loaded
-
-    if not pinecone_api_key:
-        raise ConnectionError("Falha ao carregar configuração da API Pinecone para Sermons.")
-
     request_url = f"{PINECONE_ENDPOINT_SPURGEON}/query"
-    headers = {
-        "Api-Key": pinecone_api_key,
-        "Content-Type": "application/json", "Accept": "application/json"
-    }
-    payload: dict[str, any] = {
-        "vector": vector, "topK": top_k,
-        "includeMetadata": True, "includeValues": False
-    }
-    if filters: payload["filter"] = filters
-    
     print(f"Consultando Pinecone (Sermões) em {request_url}...")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(request_url, headers=headers, json=payload)
-            response.raise_for_status()
-            result_data = response.json()
-            matches = result_data.get("matches", [])
-            if not isinstance(matches, list): return []
-            print(f"Consulta ao Pinecone (Sermões) bem-sucedida. {len(matches)} parágrafos encontrados.")
-            return matches
-        except httpx.HTTPStatusError as e_http:
-            error_body_text = e_http.response.text
-            print(f"Erro HTTP ao consultar Pinecone (Sermões): Status {e_http.response.status_code}, Corpo: {error_body_text}")
-            raise ConnectionError(f"Falha na comunicação com Pinecone (Sermões).")
-        except Exception as e_generic:
-            print(f"Erro inesperado durante a consulta ao Pinecone (Sermões): {e_generic}")
-            raise
+    try:
+        matches = await vector_search_client.query_async(
+            PINECONE_ENDPOINT_SPURGEON, vector, top_k, filters=filters, timeout=PINECONE_TIMEOUT_SECONDS
+        )
+        print(f"Consulta ao Pinecone (Sermões) bem-sucedida. {len(matches)} parágrafos encontrados.")
+        return matches
+    except ConnectionError as e_conn:
+        print(f"Erro ao consultar Pinecone (Sermões): {e_conn}")
+        raise ConnectionError(f"Falha na comunicação com Pinecone (Sermões).") from e_conn
+    except Exception as e_generic:
+        print(f"Erro inesperado durante a consulta ao Pinecone (Sermões): {e_generic}")
+        raise
 
 def _extract_sermon_base_id(pinecone_id: str) -> str:
     """Extrai o ID base do sermão do ID do Pinecone (ex: sermon_1000_p25 -> sermon_1000)"""
     parts = pinecone_id.split('_p')
     return parts[0]
 
-async def perform_sermon_semantic_search(user_query: str, top_k_paragraphs: int = 20, top_k_sermons: int = 5) -> list[dict]:
+async def perform_sermon_semantic_search(user_query: str, top_k_paragraphs: int = 20, top_k_sermons: int = 5, query_vector: list[float] | None = None) -> list[dict]:
     """
     Realiza a busca semântica por sermões.
     Retorna uma lista de sermões agrupados, com os parágrafos relevantes e metadados.
+    'query_vector' permite reaproveitar um embedding já gerado para a mesma query.
     """
     if not user_query:
         raise ValueError("A query do usuário não pode ser vazia.")
 
     print(f"Iniciando busca semântica de sermões para query: '{user_query[:100]}...'")
     try:
-        query_vector = await _generate_sermon_embedding_async(user_query)
-        # Buscamos mais parágrafos inicialmente para ter uma boa chance de agrupar
-        # sermões completos. top_k_paragraphs pode ser ajustado.
-        paragraph_results = await _query_pinecone_sermons_async(query_vector, top_k_paragraphs)
+        async def _search_uncached() -> list[dict]:
+            vector = query_vector if query_vector is not None else await _generate_sermon_embedding_async(user_query)
+            # Buscamos mais parágrafos inicialmente para ter uma boa chance de agrupar
+            # sermões completos. top_k_paragraphs pode ser ajustado.
+            return await _query_pinecone_sermons_async(vector, top_k_paragraphs)
+
+        cache_key = search_result_cache.make_key(user_query, None, top_k_paragraphs)
+        paragraph_results = await search_result_cache.get_or_compute_async("sermoes", cache_key, _search_uncached)
 
         if not paragraph_results:
             print("Nenhum parágrafo encontrado no Pinecone para a query.")
@@ -0,0 +1,63 @@
+# functions/singleflight.py
+import asyncio
+import weakref
+
+# Coalescência de requisições idênticas em andamento ("singleflight").
+# Enquanto uma chamada para uma chave está em voo, chamadas idênticas aguardam o mesmo
+# resultado em vez de disparar outro embedding + consulta ao Pinecone. Útil quando um
+# versículo viraliza e muitos usuários buscam a mesma coisa no mesmo segundo.
+
+
+class SingleFlight:
+    """
+    Garante no máximo uma execução em voo por chave (por event loop).
+    O trabalho roda numa task própria: se o chamador que a iniciou for cancelado,
+    os demais que aguardam a mesma chave continuam recebendo o resultado.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self._stats = {
+            "calls": 0,       # total de chamadas a do()
+            "executions": 0,  # chamadas que de fato executaram o trabalho
+            "coalesced": 0,   # chamadas atendidas por uma execução já em voo
+            "errors": 0,      # execuções que terminaram em exceção
+        }
+
+    async def do(self, key: str, factory):
+        """Executa 'factory()' (corrotina) para a chave, ou aguarda a execução idêntica já em voo."""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight_by_loop.get(loop)
+        if inflight is None:
+            inflight = {}
+            self._inflight_by_loop[loop] = inflight
+
+        self._stats["calls"] += 1
+        task = inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            print(f"SingleFlight ({self.name}): Requisição idêntica em andamento, aguardando o mesmo resultado.")
+        else:
+            self._stats["executions"] += 1
+            task = loop.create_task(factory())
+            inflight[key] = task
+
+            def _on_done(done_task: asyncio.Task, key: str = key) -> None:
+                if inflight.get(key) is done_task:
+                    del inflight[key]
+                if not done_task.cancelled() and done_task.exception() is not None:
+                    self._stats["errors"] += 1
+
+            task.add_done_callback(_on_done)
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return sum(len(inflight) for inflight in self._inflight_by_loop.values())
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["in_flight"] = self.in_flight()
+        stats["coalesced_ratio"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
@@ -0,0 +1,89 @@
+# functions/strongs_concordance_service.py
+import numpy as np
+import bible_data
+import strongs_lexicon
+
+# Concordância por número de Strong ("todos os versículos com G26"), servida pelo índice invertido
+# do interlinear colunar (interlinear_store): a lista de versículos é uma fatia do CSR, a contagem por
+# livro um bincount, e só os versículos da página pedida são juntados ao texto da tradução.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+_LANGUAGE_BY_PREFIX = {"G": "greek", "H": "hebrew"}
+
+
+def get_strongs_concordance(
+    strong: str,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    translation: str = bible_data.DEFAULT_TRANSLATION,
+    book_abbrev: str | None = None,
+) -> dict:
+    """
+    Versículos em que o número de Strong ocorre, em ordem canônica e paginados (page começa em 1).
+    book_abbrev restringe os resultados a um livro; as contagens por livro são sempre do texto todo.
+    Levanta ValueError para parâmetros inválidos e RuntimeError se o interlinear não estiver disponível.
+    """
+    normalized_strong = strongs_lexicon.normalize_strong(strong)
+    if normalized_strong is None:
+        raise ValueError(f"Número de Strong inválido: '{strong}'. Use o formato 'G26' ou 'H430'.")
+    if not isinstance(page, int) or page < 1:
+        raise ValueError("O parâmetro 'page' deve ser um inteiro maior ou igual a 1.")
+    if not isinstance(page_size, int) or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"O parâmetro 'pageSize' deve estar entre 1 e {MAX_PAGE_SIZE}.")
+    if translation not in bible_data.TRANSLATIONS:
+        raise ValueError(f"Tradução não suportada: {translation}")
+
+    store = bible_data.get_interlinear_store(_LANGUAGE_BY_PREFIX[normalized_strong[0]])
+    if store is None:
+        raise RuntimeError("Interlinear compilado indisponível (execute build_bible_data.py).")
+    number = int(normalized_strong[1:])
+
+    verse_indices = store.verses_with_strong(number)
+    verse_book_indices = np.asarray(store.verse_refs[verse_indices, 0], dtype=np.int64)
+    counts = np.bincount(verse_book_indices, minlength=len(store.book_order))
+    counts_by_book = [
+        {
+            "livro_curto": store.book_order[book_index],
+            "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(store.book_order[book_index], store.book_order[book_index]),
+            "versiculos": int(counts[book_index]),
+        }
+        for book_index in np.flatnonzero(counts).tolist()
+    ]
+
+    if book_abbrev:
+        book_index = store.book_index(book_abbrev)
+        if book_index is None:
+            raise ValueError(f"Livro '{book_abbrev}' não faz parte do texto {store.language} do interlinear.")
+        verse_indices = verse_indices[verse_book_indices == book_index]
+
+    total = len(verse_indices)
+    page_indices = verse_indices[(page - 1) * page_size:page * page_size].tolist()
+    results = []
+    for verse_index in page_indices:
+        verse_book, chapter, verse = store.verse_ref(verse_index)
+        verse_text, versification_differs = bible_data.get_interlinear_verse_text(store, translation, verse_book, chapter, verse)
+        results.append({
+            "livro_curto": verse_book,
+            "livro_completo": bible_data.ABBREV_TO_FULL_NAME_MAP.get(verse_book, verse_book),
+            "capitulo": chapter,
+            "versiculo": verse,
+            "palavras_originais": store.words_with_strong_in_verse(verse_index, number),
+            "texto": verse_text,
+            # Capítulo com outra versificação no original (ex: Joel, Malaquias): a referência é a do original
+            "versificacaoDivergente": versification_differs,
+        })
+
+    lexicon_entry = strongs_lexicon.lookup(normalized_strong)
+    return {
+        "strong": normalized_strong,
+        "lexico": {"lema": lexicon_entry[0], "transliteracao": lexicon_entry[1], "definicao": lexicon_entry[2]} if lexicon_entry else None,
+        "traducao": translation,
+        "totalVersiculos": total,
+        "totalOcorrencias": store.word_occurrence_count(number),
+        "contagemPorLivro": counts_by_book,
+        "page": page,
+        "pageSize": page_size,
+        "hasMore": page * page_size < total,
+        "results": results,
+    }
@@ -0,0 +1,117 @@
+# functions/strongs_lexicon.py
+import os
+import re
+import json
+from functools import lru_cache
+import bible_data
+
+# Índice compacto dos léxicos de Strong (grego e hebraico) usado pelo chat da Bíblia.
+# Os léxicos do app (assets/Biblia/completa_traducoes/*_strong_lexicon_traduzido.json) guardam
+# notas, definições em inglês e em português e marcadores "TRADUZIR:" — muito mais do que o prompt
+# precisa. O build_bible_data.py compila apenas {strong: [lema, transliteração, definição curta]}
+# em functions/bible_data/strongs_lexicon.json, carregado uma vez por instância.
+
+LEXICON_INDEX_FILE_NAME = "strongs_lexicon.json"
+LEXICON_SOURCE_FILES = {
+    "G": "greek_strong_lexicon_traduzido.json",
+    "H": "hebrew_strong_lexicon_traduzido.json",
+}
+MAX_DEFINITIONS = 3
+MAX_DEFINITION_CHARS = 240
+
+_STRONG_PATTERN = re.compile(r"^([GH])0*(\d{1,5})[a-z]?$")
+
+
+def normalize_strong(value) -> str | None:
+    """'G26', 'g0026', 'H/H430' -> 'G26' / 'H430'. Retorna None para valores vazios ou 'N/A'."""
+    if not value or not isinstance(value, str):
+        return None
+    match = _STRONG_PATTERN.match(value.strip().upper().split("/")[-1])
+    if not match:
+        return None
+    return f"{match.group(1)}{int(match.group(2))}"
+
+
+def split_strongs(value) -> list[str]:
+    """Uma palavra pode ter mais de um número ('G2532 G1437' em crases como κἄν)."""
+    if not value or not isinstance(value, str):
+        return []
+    return [strong for strong in (normalize_strong(part) for part in value.split()) if strong]
+
+
+def _is_untranslated(definitions: list) -> bool:
+    return all(str(definition).strip().upper().startswith("TRADUZIR:") for definition in definitions)
+
+
+def _short_definition(entry: dict) -> str:
+    """Definições em português quando já traduzidas, senão as originais; truncadas para o prompt."""
+    definitions = [d for d in (entry.get("definitions_pt") or []) if str(d).strip()]
+    if not definitions or _is_untranslated(definitions):
+        definitions = [d for d in (entry.get("definitions") or []) if str(d).strip()]
+    text = "; ".join(str(d).strip() for d in definitions[:MAX_DEFINITIONS])
+    if len(text) > MAX_DEFINITION_CHARS:
+        text = text[:MAX_DEFINITION_CHARS - 1].rstrip() + "…"
+    return text
+
+
+def compile_lexicon_entries(raw_lexicon: dict) -> dict[str, list[str]]:
+    """{strong: entrada completa} -> {strong normalizado: [lema, transliteração, definição curta]}."""
+    compiled = {}
+    for key, entry in raw_lexicon.items():
+        strong = normalize_strong(key)
+        if strong is None or not isinstance(entry, dict):
+            continue
+        lemma = entry.get("lemma_greek") or entry.get("lemma_hebrew") or entry.get("lemma") or ""
+        compiled[strong] = [lemma, entry.get("transliteration") or "", _short_definition(entry)]
+    return compiled
+
+
+def build_lexicon_index(source_dir: str, output_path: str) -> int:
+    """
+    Compila os léxicos encontrados em source_dir (= .../completa_traducoes) no índice compacto.
+    Léxicos ausentes são ignorados com aviso. Retorna o número de entradas gravadas.
+    """
+    compiled = {}
+    for prefix, file_name in LEXICON_SOURCE_FILES.items():
+        source_path = os.path.join(source_dir, file_name)
+        if not os.path.exists(source_path):
+            print(f"AVISO (StrongsLexicon): Léxico '{file_name}' não encontrado em {source_dir}, ignorando.")
+            continue
+        with open(source_path, "r", encoding="utf-8") as f:
+            entries = compile_lexicon_entries(json.load(f))
+        compiled.update({strong: entry for strong, entry in entries.items() if strong.startswith(prefix)})
+        print(f"StrongsLexicon: {len(entries)} entradas compiladas de {file_name}.")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(compiled, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_path, output_path)
+    return len(compiled)
+
+
+@lru_cache(maxsize=1)
+def load_lexicon_index() -> dict[str, list[str]]:
+    """
+    Índice compilado (uma vez por instância). Sem ele, compila em memória os léxicos de assets/Biblia
+    (desenvolvimento local); sem nenhum dos dois, retorna {} e o chat segue só com números e morfologia.
+    """
+    index_path = os.path.join(bible_data.BIBLE_DATA_DIR, LEXICON_INDEX_FILE_NAME)
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    compiled = {}
+    for file_name in LEXICON_SOURCE_FILES.values():
+        source_path = bible_data.resolve_data_path("completa_traducoes", file_name)
+        if source_path:
+            with open(source_path, "r", encoding="utf-8") as f:
+                compiled.update(compile_lexicon_entries(json.load(f)))
+    if not compiled:
+        print("AVISO (StrongsLexicon): Nenhum léxico de Strong disponível; definições não serão incluídas.")
+    return compiled
+
+
+def lookup(strong: str) -> list[str] | None:
+    """[lema, transliteração, definição curta] do número de Strong, ou None."""
+    return load_lexicon_index().get(strong)
@@ -0,0 +1,131 @@
+# functions/universal_search_service.py
+import asyncio
+import traceback
+import bible_search_service
+import sermons_service
+import quote_search_service
+import community_search_service
+import book_search_service
+
+# Busca universal: a mesma query em todos os índices com UM único embedding.
+# Todos os índices usam o mesmo modelo (text-embedding-3-small), então o vetor gerado uma vez
+# é repassado aos serviços (parâmetro 'query_vector') e as consultas rodam em paralelo.
+# A latência total passa a ser a da seção mais lenta, limitada por um prazo ('deadline'):
+# seções que não terminarem a tempo são descartadas da resposta.
+
+DEFAULT_DEADLINE_SECONDS = 8.0
+MAX_DEADLINE_SECONDS = 50.0
+
+# Seção -> topK padrão (os mesmos padrões dos endpoints individuais)
+SECTION_DEFAULT_TOP_K = {
+    "biblia": 10,
+    "sermoes": 5,
+    "livros": 5,
+    "frases": 30,
+    "comunidade": 20,
+}
+# Seção -> topK máximo (os limites dos endpoints individuais). 'livros' gera uma justificativa com o
+# LLM por livro retornado, então fica no mesmo limite fixo de semanticBookSearch.
+SECTION_MAX_TOP_K = {
+    "biblia": 50,
+    "sermoes": 10,
+    "livros": 5,
+    "frases": 50,
+    "comunidade": 50,
+}
+ALL_SECTIONS = list(SECTION_DEFAULT_TOP_K)
+# Seções que exigem usuário autenticado (como semanticQuoteSearch e semanticCommunitySearch)
+AUTHENTICATED_SECTIONS = {"frases", "comunidade"}
+
+
+def _section_coroutine(section: str, user_query: str, query_vector: list[float], top_k: int, bible_filters: dict | None):
+    if section == "biblia":
+        return bible_search_service.perform_semantic_search(user_query, bible_filters, top_k, query_vector=query_vector)
+    if section == "sermoes":
+        return sermons_service.perform_sermon_semantic_search(user_query, top_k_sermons=top_k, query_vector=query_vector)
+    if section == "livros":
+        return book_search_service.get_book_recommendations(user_query, top_k=top_k, query_vector=query_vector)
+    if section == "frases":
+        return quote_search_service.perform_quote_search_async(user_query, top_k, query_vector=query_vector)
+    if section == "comunidade":
+        return community_search_service.perform_community_search_async(user_query, top_k, query_vector=query_vector)
+    raise ValueError(f"Seção de busca desconhecida: {section}")
+
+
+def _resolve_top_k(section: str, top_k_by_section: dict | None) -> int:
+    top_k = (top_k_by_section or {}).get(section, SECTION_DEFAULT_TOP_K[section])
+    if not isinstance(top_k, int) or top_k <= 0:
+        print(f"AVISO (UniversalSearch): topK inválido para '{section}' ({top_k}), usando padrão {SECTION_DEFAULT_TOP_K[section]}.")
+        return SECTION_DEFAULT_TOP_K[section]
+    if top_k > SECTION_MAX_TOP_K[section]:
+        print(f"AVISO (UniversalSearch): topK {top_k} acima do máximo para '{section}', usando {SECTION_MAX_TOP_K[section]}.")
+        return SECTION_MAX_TOP_K[section]
+    return top_k
+
+
+async def perform_universal_search(
+    user_query: str,
+    sections: list[str] | None = None,
+    top_k_by_section: dict | None = None,
+    bible_filters: dict | None = None,
+    deadline_seconds: float = DEFAULT_DEADLINE_SECONDS,
+    authenticated: bool = False,
+) -> dict:
+    """
+    Gera o embedding da query uma vez e consulta as seções pedidas em paralelo.
+    Retorna {"sections": {secao: {"status": "ok"|"timeout"|"error"|"unauthenticated", "results": [...]}}}.
+    Levanta ValueError para inputs inválidos; erros de uma seção não derrubam as demais.
+    """
+    if not user_query or not isinstance(user_query, str):
+        raise ValueError("A query do usuário não pode ser vazia.")
+
+    requested_sections = sections or ALL_SECTIONS
+    unknown_sections = [section for section in requested_sections if section not in SECTION_DEFAULT_TOP_K]
+    if unknown_sections:
+        raise ValueError(f"Seções desconhecidas: {', '.join(unknown_sections)}. Válidas: {', '.join(ALL_SECTIONS)}.")
+    if not isinstance(deadline_seconds, (int, float)) or deadline_seconds <= 0:
+        deadline_seconds = DEFAULT_DEADLINE_SECONDS
+    deadline_seconds = min(float(deadline_seconds), MAX_DEADLINE_SECONDS)
+
+    response_sections = {}
+    runnable_sections = []
+    for section in dict.fromkeys(requested_sections):
+        if section in AUTHENTICATED_SECTIONS and not authenticated:
+            response_sections[section] = {"status": "unauthenticated", "results": []}
+        else:
+            runnable_sections.append(section)
+
+    print(f"UniversalSearch: Query '{user_query[:100]}' nas seções {runnable_sections} (prazo {deadline_seconds}s).")
+    # Um único embedding para todas as seções (com cache e batching compartilhados)
+    query_vector = await bible_search_service.generate_embedding_async(user_query)
+
+    tasks = {
+        asyncio.create_task(
+            _section_coroutine(section, user_query, query_vector, _resolve_top_k(section, top_k_by_section), bible_filters)
+        ): section
+        for section in runnable_sections
+    }
+    done, pending = await asyncio.wait(tasks, timeout=deadline_seconds) if tasks else (set(), set())
+
+    for task in pending:
+        # Nas seções com cache de resultados (biblia, sermoes, frases, comunidade) a busca roda numa
+        # task do singleflight, que continua e aquece o cache; 'livros' (sem singleflight) é cancelada
+        # de fato, interrompendo as justificativas pendentes.
+        task.cancel()
+        section = tasks[task]
+        print(f"UniversalSearch: Seção '{section}' excedeu o prazo de {deadline_seconds}s e foi descartada.")
+        response_sections[section] = {"status": "timeout", "results": []}
+
+    for task in done:
+        section = tasks[task]
+        error = task.exception()
+        if error is not None:
+            print(f"UniversalSearch: Erro na seção '{section}': {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            response_sections[section] = {"status": "error", "results": [], "message": str(error)}
+        else:
+            results = task.result()
+            response_sections[section] = {"status": "ok", "results": results if isinstance(results, list) else []}
+
+    # Mantém a ordem pedida pelo cliente
+    return {"sections": {section: response_sections[section] for section in dict.fromkeys(requested_sections)}}
@@ -0,0 +1,157 @@
+# functions/vector_search_client.py
+import os
+import traceback
+import asyncio
+import weakref
+from urllib.parse import urlsplit
+import httpx
+
+# Cliente compartilhado para os índices do Pinecone (bíblia, sermões, livros, frases e comunidade).
+# Mantém um pool de conexões keep-alive (HTTP/2 quando o pacote 'h2' está disponível) por host de índice,
+# para que instâncias "quentes" não paguem um novo handshake TLS a cada busca.
+
+# --- Configurações do pool (podem ser ajustadas por variável de ambiente) ---
+POOL_MAX_CONNECTIONS = int(os.environ.get("VECTOR_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("VECTOR_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("VECTOR_POOL_KEEPALIVE_EXPIRY", "120"))
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("VECTOR_CONNECT_TIMEOUT", "5"))
+DEFAULT_TIMEOUT_SECONDS = 30.0
+# Redireciona todos os índices para o servidor local de benchmarks/testes
+# (benchmarks/pinecone_standin_server.py), ex: PINECONE_STANDIN_URL=http://127.0.0.1:8765
+PINECONE_STANDIN_URL = os.environ.get("PINECONE_STANDIN_URL", "").rstrip("/")
+
+try:
+    import h2  # noqa: F401 (necessário para httpx com http2=True)
+    HTTP2_ENABLED = os.environ.get("VECTOR_HTTP2_ENABLED", "1") != "0"
+except ImportError:
+    HTTP2_ENABLED = False
+
+# Clientes por event loop e por host. Um httpx.AsyncClient fica preso ao loop em que abriu
+# suas conexões, então cada loop vivo recebe seu próprio pool.
+_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_pinecone_api_key_loaded = None
+
+
+def _resolve_base_url(endpoint: str) -> str:
+    """
+    Com PINECONE_STANDIN_URL definido, troca o host do índice pelo servidor local, usando o nome
+    do índice como prefixo (https://livros-hqija7a.svc... -> http://127.0.0.1:8765/livros).
+    """
+    if not PINECONE_STANDIN_URL:
+        return endpoint
+    host_label = (urlsplit(endpoint).hostname or endpoint).split(".")[0]
+    index_name = host_label.rsplit("-", 1)[0] if "-" in host_label else host_label
+    return f"{PINECONE_STANDIN_URL}/{index_name}"
+
+
+def _load_pinecone_api_key() -> str:
+    """Carrega a chave do Pinecone a partir dos secrets (uma vez por instância)."""
+    global _pinecone_api_key_loaded
+    if _pinecone_api_key_loaded is None and PINECONE_STANDIN_URL:
+        # O servidor local não valida a chave
+        _pinecone_api_key_loaded = os.environ.get("pinecone-api-key") or "standin"
+    if _pinecone_api_key_loaded is None:
+        _pinecone_api_key_loaded = os.environ.get("pinecone-api-key")
+        if not _pinecone_api_key_loaded:
+            print("ERRO CRÍTICO (VectorSearchClient): Variável de ambiente/secret 'pinecone-api-key' não configurada ou não acessível.")
+            raise ValueError("Configuração da API Pinecone ausente (secret 'pinecone-api-key').")
+        print("VectorSearchClient: Chave API do Pinecone carregada.")
+    return _pinecone_api_key_loaded
+
+
+def get_client(endpoint: str) -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP de longa duração para o host do índice informado,
+    criando-o na primeira chamada feita dentro do event loop atual.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients_by_loop.get(loop)
+    if clients is None:
+        clients = {}
+        _clients_by_loop[loop] = clients
+
+    client = clients.get(endpoint)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=_resolve_base_url(endpoint),
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=POOL_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+            headers={
+                "Api-Key": _load_pinecone_api_key(),
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+        )
+        clients[endpoint] = client
+        print(f"VectorSearchClient: Pool de conexões criado para {client.base_url} (http2={HTTP2_ENABLED}).")
+    return client
+
+
+async def _post_async(endpoint: str, path: str, payload: dict, timeout: float | None) -> dict:
+    """Envia um POST ao índice e traduz falhas de rede/HTTP em ConnectionError."""
+    client = get_client(endpoint)
+    request_timeout = timeout if timeout is not None else DEFAULT_TIMEOUT_SECONDS
+    try:
+        response = await client.post(
+            path,
+            json=payload,
+            timeout=httpx.Timeout(request_timeout, connect=CONNECT_TIMEOUT_SECONDS),
+        )
+        response.raise_for_status()
+        return response.json() if response.content else {}
+    except httpx.HTTPStatusError as e_http:
+        error_message = f"Falha na comunicação com Pinecone (HTTP {e_http.response.status_code})."
+        print(f"VectorSearchClient: Erro HTTP em {endpoint}{path}: Status {e_http.response.status_code}, Corpo: {e_http.response.text}")
+        try:
+            error_body = e_http.response.json()
+            if isinstance(error_body, dict) and "message" in error_body:
+                error_message += f" Detalhe: {error_body['message']}"
+        except Exception:
+            pass
+        raise ConnectionError(error_message) from e_http
+    except httpx.RequestError as e_req:
+        print(f"VectorSearchClient: Erro de requisição em {endpoint}{path}: {e_req}")
+        traceback.print_exc()
+        raise ConnectionError(f"Erro de rede ao conectar com Pinecone: {e_req}") from e_req
+
+
+async def query_async(
+    endpoint: str,
+    vector: list[float],
+    top_k: int,
+    filters: dict | None = None,
+    include_metadata: bool = True,
+    include_values: bool = False,
+    timeout: float | None = None,
+) -> list[dict]:
+    """Consulta o endpoint /query de um índice e retorna a lista de 'matches'."""
+    payload: dict[str, any] = {
+        "vector": vector,
+        "topK": top_k,
+        "includeMetadata": include_metadata,
+        "includeValues": include_values,
+    }
+    if filters:
+        payload["filter"] = filters
+
+    result_data = await _post_async(endpoint, "/query", payload, timeout)
+    matches = result_data.get("matches", [])
+    if not isinstance(matches, list):
+        print(f"AVISO (VectorSearchClient): 'matches' não é uma lista na resposta de {endpoint}. Recebido: {type(matches)}")
+        return []
+    return matches
+
+
+async def upsert_async(endpoint: str, vectors: list[dict], timeout: float | None = None) -> dict:
+    """Insere ou atualiza vetores ({id, values, metadata}) no índice."""
+    return await _post_async(endpoint, "/vectors/upsert", {"vectors": vectors}, timeout)
+
+
+async def delete_async(endpoint: str, ids: list[str], timeout: float | None = None) -> dict:
+    """Remove vetores do índice pelos seus IDs."""
+    return await _post_async(endpoint, "/vectors/delete", {"ids": ids}, timeout)
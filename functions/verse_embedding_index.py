@@ -0,0 +1,181 @@
+# functions/verse_embedding_index.py
+"""
+Matriz de embeddings por versículo, alinhada ao corpus empacotado (bible_corpus_store).
+
+Gerada uma única vez por este script (a partir de functions/, com o secret exportado):
+    openai-api-key=... python verse_embedding_index.py
+    openai-api-key=... python verse_embedding_index.py --translation nvi --dimensions 512
+
+Arquivos em VECTOR_SNAPSHOT_DIR (mesma pasta dos snapshots de local_vector_index):
+    versiculos_<tradução>.vectors.npy     float16 (N x D), linha i = índice global first_verse + i
+    versiculos_<tradução>.metadata.json   {"model", "dimension", "translation", "first_verse",
+                                           "verse_count", "layout"}
+Os vetores são normalizados, então a similaridade de cosseno é só um produto escalar. Os modelos
+text-embedding-3 aceitam truncamento (Matryoshka): o embedding completo de uma consulta, já
+presente no embedding_cache, vira um vetor compatível cortando as D primeiras dimensões e
+renormalizando, sem nova chamada à OpenAI.
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import numpy as np
+import bible_data
+import local_vector_index
+import openai_clients
+
+EMBEDDING_MODEL = "text-embedding-3-small"  # O mesmo das consultas (bible_search_service)
+DEFAULT_DIMENSIONS = 512
+DEFAULT_TRANSLATION = bible_data.DEFAULT_TRANSLATION
+EMBEDDING_BATCH_SIZE = 512
+
+
+def snapshot_name(translation: str) -> str:
+    return f"versiculos_{translation}"
+
+
+def _corpus_layout(corpus, translation: str) -> str:
+    """Impressão digital da estrutura (livros/capítulos/versículos) da tradução no corpus."""
+    books = corpus.header["translations"][translation]["books"]
+    return hashlib.sha256(json.dumps(books, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_verse_embeddings(
+    translation: str = DEFAULT_TRANSLATION,
+    dimensions: int = DEFAULT_DIMENSIONS,
+    output_dir: str | None = None,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+) -> int:
+    """Gera e grava (de forma atômica) a matriz de embeddings da tradução. Retorna o número de versículos."""
+    corpus = bible_data.get_corpus()
+    if corpus is None:
+        raise FileNotFoundError("Corpus empacotado não encontrado (execute build_bible_data.py antes).")
+    translation_range = corpus.translation_range(translation)
+    if translation_range is None:
+        raise ValueError(f"Tradução '{translation}' não está no corpus.")
+
+    first_verse, end = translation_range
+    client = openai_clients.get_sync_client()
+    vectors = np.zeros((end - first_verse, dimensions), dtype=np.float16)
+    for start in range(first_verse, end, batch_size):
+        batch_end = min(start + batch_size, end)
+        # A API rejeita strings vazias (versículos omitidos em algumas traduções): a linha fica zerada
+        texts = {global_index: corpus.verse_text(global_index).strip() for global_index in range(start, batch_end)}
+        texts = {global_index: text for global_index, text in texts.items() if text}
+        if texts:
+            response = client.embeddings.create(model=EMBEDDING_MODEL, input=list(texts.values()), dimensions=dimensions)
+            batch = _normalize_rows(np.asarray([item.embedding for item in response.data], dtype=np.float32))
+            vectors[np.fromiter(texts, dtype=np.int64) - first_verse] = batch.astype(np.float16)
+        print(f"  {batch_end - first_verse}/{end - first_verse} versículos processados...")
+
+    output_dir = output_dir or local_vector_index.SNAPSHOT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    vectors_path, metadata_path = local_vector_index.snapshot_paths(snapshot_name(translation), output_dir)
+    with open(vectors_path + ".tmp", "wb") as f:
+        np.save(f, vectors)
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "model": EMBEDDING_MODEL,
+            "dimension": dimensions,
+            "translation": translation,
+            "first_verse": first_verse,
+            "verse_count": end - first_verse,
+            "layout": _corpus_layout(corpus, translation),
+        }, f)
+    os.replace(vectors_path + ".tmp", vectors_path)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    print(f"Embeddings de '{translation}' gravados em {vectors_path} ({end - first_verse} x {dimensions}, float16).")
+    return end - first_verse
+
+
+class VerseEmbeddingIndex:
+    """Leitor da matriz de embeddings (somente leitura, seguro para uso entre threads)."""
+
+    def __init__(self, vectors_path: str, metadata_path: str):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self.vectors = np.load(vectors_path, mmap_mode="r")
+        self.translation = self.metadata["translation"]
+        self.model = self.metadata["model"]
+        self.dimension = int(self.metadata["dimension"])
+        self.first_verse = int(self.metadata["first_verse"])
+        if self.vectors.shape != (int(self.metadata["verse_count"]), self.dimension):
+            raise ValueError(f"Matriz de embeddings inconsistente com os metadados: {vectors_path}")
+
+    def is_aligned_with(self, corpus) -> bool:
+        """True se a matriz foi gerada a partir da mesma estrutura de versículos do corpus atual."""
+        translation_range = corpus.translation_range(self.translation)
+        return (
+            translation_range == (self.first_verse, self.first_verse + len(self.vectors))
+            and _corpus_layout(corpus, self.translation) == self.metadata.get("layout")
+        )
+
+    def project_query(self, query_vector: list[float]) -> np.ndarray:
+        """Trunca o embedding completo da consulta para a dimensão da matriz e renormaliza."""
+        vector = np.asarray(query_vector, dtype=np.float32)[:self.dimension]
+        if len(vector) != self.dimension:
+            raise ValueError(f"Embedding da consulta tem {len(vector)} dimensões; a matriz exige {self.dimension}.")
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def score_range(self, query_vector: np.ndarray, global_range: tuple[int, int]) -> np.ndarray:
+        """Similaridade de cosseno da consulta (já projetada) com os versículos [início, fim) do corpus."""
+        start, end = global_range
+        rows = np.asarray(self.vectors[start - self.first_verse:end - self.first_verse], dtype=np.float32)
+        return rows @ query_vector
+
+
+_indexes: dict[str, VerseEmbeddingIndex | None] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(translation: str = DEFAULT_TRANSLATION) -> VerseEmbeddingIndex | None:
+    """Matriz da tradução (carregada uma vez por instância), ou None se não existir ou estiver desatualizada."""
+    if translation in _indexes:
+        return _indexes[translation]
+    with _indexes_lock:
+        if translation not in _indexes:
+            index = None
+            vectors_path, metadata_path = local_vector_index.snapshot_paths(snapshot_name(translation))
+            corpus = bible_data.get_corpus()
+            if not os.path.exists(vectors_path) or not os.path.exists(metadata_path) or corpus is None:
+                print(f"AVISO (VerseEmbeddingIndex): Embeddings de versículos não encontrados em {vectors_path}.")
+            else:
+                try:
+                    index = VerseEmbeddingIndex(vectors_path, metadata_path)
+                    if not index.is_aligned_with(corpus):
+                        print(f"AVISO (VerseEmbeddingIndex): {vectors_path} não corresponde ao corpus atual; gere-o novamente.")
+                        index = None
+                    else:
+                        print(f"VerseEmbeddingIndex: Matriz carregada de {vectors_path} ({len(index.vectors)} x {index.dimension}).")
+                except Exception as e:
+                    print(f"ERRO (VerseEmbeddingIndex): Falha ao carregar {vectors_path}: {e}")
+                    index = None
+            _indexes[translation] = index
+    return _indexes[translation]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera a matriz de embeddings por versículo do corpus da Bíblia.")
+    parser.add_argument("--translation", choices=bible_data.TRANSLATIONS, default=DEFAULT_TRANSLATION)
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--output-dir", default=local_vector_index.SNAPSHOT_DIR)
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        build_verse_embeddings(args.translation, args.dimensions, args.output_dir, args.batch_size)
+    except Exception as e:
+        print(f"ERRO: Falha ao gerar os embeddings de versículos: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
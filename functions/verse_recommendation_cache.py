@@ -0,0 +1,131 @@
+# functions/verse_recommendation_cache.py
+import hashlib
+from datetime import datetime, timedelta, timezone
+from embedding_cache import normalize_text
+
+# Cache das recomendações de versículos por capítulo (getVerseRecommendationsForChapter),
+# compartilhado entre usuários: o resultado depende só do 'learningGoal' e do capítulo, então a
+# chave é o hash do objetivo normalizado + livro + capítulo. Dois usuários com o mesmo objetivo
+# pagam um único cálculo por capítulo.
+#
+#   verseRecommendationCache/{goalHash}_{livro}_{capítulo}
+#       {"verses", "source", "version", "goalHash", "bookAbbrev", "chapter", "createdAt", "expiresAt"}
+#   users/{uid}/recommendedVerses/{livro}_{capítulo}
+#       ponteiro {"sharedCacheId", "goalHash", "version", "createdAt"}
+#
+# Os ponteiros de um usuário são apagados quando o 'learningGoal' muda (gatilho em main.py). Como o
+# gatilho é assíncrono (e um pré-carregamento em voo ainda pode gravar ponteiros do objetivo antigo),
+# a leitura também exige que o 'goalHash' do ponteiro seja o do objetivo atual.
+# CACHE_VERSION entra no hash: incrementá-lo (mudança de prompt, limiar ou matriz de embeddings)
+# invalida todas as entradas de uma vez. 'expiresAt' é verificado na leitura; configure também
+# a política de TTL do Firestore nesse campo para que as entradas antigas sejam removidas.
+
+SHARED_CACHE_COLLECTION = "verseRecommendationCache"
+USER_POINTER_COLLECTION = "recommendedVerses"
+CACHE_VERSION = 1
+CACHE_TTL_DAYS = 30
+DELETE_BATCH_SIZE = 400
+
+_db_client = None
+
+
+def _get_db():
+    global _db_client
+    if _db_client is None:
+        from firebase_admin import firestore
+        _db_client = firestore.client()
+    return _db_client
+
+
+def goal_hash(learning_goal: str) -> str:
+    return hashlib.sha256(f"v{CACHE_VERSION}\n{normalize_text(learning_goal)}".encode("utf-8")).hexdigest()[:32]
+
+
+def chapter_key(book_abbrev: str, chapter: int) -> str:
+    return f"{book_abbrev}_{chapter}"
+
+
+def shared_cache_id(goal_key: str, book_abbrev: str, chapter: int) -> str:
+    return f"{goal_key}_{chapter_key(book_abbrev, chapter)}"
+
+
+def _user_pointer_ref(user_id: str, book_abbrev: str, chapter: int):
+    return _get_db().collection("users").document(user_id).collection(USER_POINTER_COLLECTION).document(chapter_key(book_abbrev, chapter))
+
+
+def read_shared(shared_id: str) -> list[int] | None:
+    """Versículos da entrada compartilhada, ou None se ela não existir, tiver expirado ou for de outra versão."""
+    doc = _get_db().collection(SHARED_CACHE_COLLECTION).document(shared_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    expires_at = data.get("expiresAt")
+    if data.get("version") != CACHE_VERSION or (expires_at and expires_at < datetime.now(timezone.utc)):
+        return None
+    verses = data.get("verses")
+    return verses if isinstance(verses, list) else None
+
+
+def read_for_user(user_id: str, goal_key: str, book_abbrev: str, chapter: int) -> list[int] | None:
+    """Segue o ponteiro do usuário até a entrada compartilhada (None = sem ponteiro válido para goal_key)."""
+    pointer_doc = _user_pointer_ref(user_id, book_abbrev, chapter).get()
+    if not pointer_doc.exists:
+        return None
+    pointer = pointer_doc.to_dict() or {}
+    # Documentos antigos (com a lista 'verses' e sem ponteiro) nunca eram invalidados: recalcula
+    if pointer.get("version") != CACHE_VERSION or not pointer.get("sharedCacheId"):
+        return None
+    if pointer.get("goalHash") != goal_key:
+        return None  # Ponteiro de um 'learningGoal' anterior
+    return read_shared(pointer["sharedCacheId"])
+
+
+def link_user(user_id: str, goal_key: str, book_abbrev: str, chapter: int) -> None:
+    _user_pointer_ref(user_id, book_abbrev, chapter).set({
+        "sharedCacheId": shared_cache_id(goal_key, book_abbrev, chapter),
+        "goalHash": goal_key,
+        "version": CACHE_VERSION,
+        "createdAt": datetime.now(timezone.utc),
+    })
+
+
+def store(goal_key: str, book_abbrev: str, chapter: int, verses: list[int], source: str, user_id: str | None = None) -> None:
+    """Grava a entrada compartilhada e, se informado, o ponteiro do usuário (numa única escrita em lote)."""
+    db = _get_db()
+    now = datetime.now(timezone.utc)
+    shared_id = shared_cache_id(goal_key, book_abbrev, chapter)
+    batch = db.batch()
+    batch.set(db.collection(SHARED_CACHE_COLLECTION).document(shared_id), {
+        "verses": verses,
+        "source": source,
+        "version": CACHE_VERSION,
+        "goalHash": goal_key,
+        "bookAbbrev": book_abbrev,
+        "chapter": chapter,
+        "createdAt": now,
+        "expiresAt": now + timedelta(days=CACHE_TTL_DAYS),
+    })
+    if user_id:
+        batch.set(_user_pointer_ref(user_id, book_abbrev, chapter), {
+            "sharedCacheId": shared_id,
+            "goalHash": goal_key,
+            "version": CACHE_VERSION,
+            "createdAt": now,
+        })
+    batch.commit()
+
+
+def invalidate_user(user_id: str) -> int:
+    """Apaga todos os ponteiros do usuário (ex: o 'learningGoal' mudou). Retorna quantos foram apagados."""
+    db = _get_db()
+    collection_ref = db.collection("users").document(user_id).collection(USER_POINTER_COLLECTION)
+    deleted = 0
+    while True:
+        docs = list(collection_ref.limit(DELETE_BATCH_SIZE).stream())
+        if not docs:
+            return deleted
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
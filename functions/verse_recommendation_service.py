@@ -0,0 +1,78 @@
+# functions/verse_recommendation_service.py
+import os
+import threading
+import numpy as np
+from cachetools import TTLCache
+import bible_data
+import bible_search_service
+import verse_embedding_index
+
+# Recomendação de versículos de um capítulo para o 'learningGoal' do usuário sem chamar o LLM:
+# o objetivo é embutido uma vez (embedding_cache reaproveita o vetor entre capítulos e usuários) e
+# comparado com os versículos do capítulo num único produto escalar contra a matriz pré-computada
+# (verse_embedding_index). Quando a matriz não existe, as funções retornam None e o chamador
+# volta ao caminho com o LLM.
+#
+# Pré-carregamento: quem lê o capítulo N quase sempre abre o N+1 em seguida, então o handler agenda
+# em segundo plano o cálculo dos PREFETCH_CHAPTERS capítulos seguintes (sem passar do fim do livro),
+# apenas quando a matriz está disponível (is_available), para não gerar chamadas especulativas ao LLM.
+# claim_prefetch evita agendar o mesmo (usuário, capítulo) mais de uma vez por instância.
+
+VERSE_SIMILARITY_THRESHOLD = float(os.environ.get("VERSE_RECOMMENDATION_THRESHOLD", "0.35"))
+MAX_RECOMMENDED_VERSES = int(os.environ.get("VERSE_RECOMMENDATION_MAX_VERSES", "8"))
+RECOMMENDATION_TRANSLATION = verse_embedding_index.DEFAULT_TRANSLATION
+PREFETCH_CHAPTERS = int(os.environ.get("VERSE_RECOMMENDATION_PREFETCH_CHAPTERS", "2"))
+PREFETCH_DEDUP_SECONDS = 10 * 60
+
+_prefetch_scheduled = TTLCache(maxsize=4096, ttl=PREFETCH_DEDUP_SECONDS)
+_prefetch_lock = threading.Lock()
+
+
+def is_available() -> bool:
+    return verse_embedding_index.get_index(RECOMMENDATION_TRANSLATION) is not None
+
+
+def score_chapter_verses(query_vector: list[float], book_abbrev: str, chapter: int) -> list[int] | None:
+    """
+    Números dos versículos do capítulo com similaridade >= VERSE_SIMILARITY_THRESHOLD (no máximo
+    MAX_RECOMMENDED_VERSES, os mais similares), em ordem crescente. None se a matriz ou o capítulo
+    não estiverem disponíveis.
+    """
+    index = verse_embedding_index.get_index(RECOMMENDATION_TRANSLATION)
+    corpus = bible_data.get_corpus()
+    resolved_abbrev = bible_data.resolve_book_abbrev(book_abbrev) if book_abbrev else None
+    if index is None or corpus is None or resolved_abbrev is None:
+        return None
+    first_verse = corpus.verse_index(RECOMMENDATION_TRANSLATION, resolved_abbrev, int(chapter), 1)
+    if first_verse is None:
+        return None
+    verse_count = corpus.verse_count(RECOMMENDATION_TRANSLATION, resolved_abbrev, int(chapter))
+
+    scores = index.score_range(index.project_query(query_vector), (first_verse, first_verse + verse_count))
+    candidates = np.flatnonzero(scores >= VERSE_SIMILARITY_THRESHOLD)
+    if len(candidates) > MAX_RECOMMENDED_VERSES:
+        candidates = candidates[np.argpartition(-scores[candidates], MAX_RECOMMENDED_VERSES - 1)[:MAX_RECOMMENDED_VERSES]]
+    return sorted((candidates + 1).tolist())
+
+
+async def recommend_chapter_verses(learning_goal: str, book_abbrev: str, chapter: int) -> list[int] | None:
+    """Versículos recomendados do capítulo para o objetivo, ou None se for preciso recorrer ao LLM."""
+    if not is_available():
+        return None
+    query_vector = await bible_search_service.generate_embedding_async(learning_goal)
+    return score_chapter_verses(query_vector, book_abbrev, chapter)
+
+
+def upcoming_chapters(chapter: int, chapter_count: int, count: int = PREFETCH_CHAPTERS) -> list[int]:
+    """Capítulos N+1..N+count, limitados ao número de capítulos do livro."""
+    return list(range(chapter + 1, min(chapter + count, chapter_count) + 1))
+
+
+def claim_prefetch(user_id: str, book_abbrev: str, chapter: int) -> bool:
+    """True se o pré-carregamento do capítulo ainda não foi agendado recentemente nesta instância."""
+    key = f"{user_id}:{book_abbrev}_{chapter}"
+    with _prefetch_lock:
+        if key in _prefetch_scheduled:
+            return False
+        _prefetch_scheduled[key] = True
+        return True